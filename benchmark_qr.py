@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Benchmark de Códigos QR
+Compara la codificación de qrcode (QRCode.make con fit=True) con la de
+qr_codificador, y mide cada generador, estilo de módulo, gradiente y
+tamaño de carga: códigos/s, latencias p50/p99, pico de memoria y el
+reparto entre codificar, dibujar y guardar. Los resultados se guardan en
+JSON para compararlos entre commits y detectar regresiones. También
+comprueba con -X importtime que las líneas de comandos arrancan sin
+cargar qrcode, Pillow ni NumPy y dentro de un presupuesto de tiempo
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import re
+import resource
+import string
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import qrcode
+from PIL import Image
+
+from qr_codificador import codificar_rapido
+from qr_entrada import perfil_para
+from qr_lote import ejecutar_trabajo
+from qr_renderer import ESTILOS_MODULO, GRADIENTES, obtener_renderer
+from qr_salida import codificar_imagen
+
+
+# Nombre -> datos de ejemplo, de más corto a más largo
+CARGAS = {
+    'url': "https://github.com/naye-gg/qrs_generator",
+    'wifi': "WIFI:T:WPA;S:Oficina-Planta-3;P:c0ntr4seña-MuyL4rga-2024;H:false;;",
+    'vcard': ("BEGIN:VCARD\nVERSION:3.0\nN:Pérez;Juan\nFN:Juan Pérez\n"
+              "ORG:Mi Empresa S.A.\nTITLE:Director de Operaciones\n"
+              "TEL;TYPE=WORK,VOICE:+34 600 000 000\nTEL;TYPE=CELL:+34 611 111 111\n"
+              "EMAIL:juan.perez@miempresa.com\n"
+              "ADR;TYPE=WORK:;;Calle Mayor 1;Madrid;;28001;España\n"
+              "URL:https://miempresa.com\nEND:VCARD"),
+    'texto_largo': "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 20,
+}
+
+# Tamaños de carga en bytes para generar_qr_simple (corrección L), hasta
+# 2953 bytes: la capacidad de la versión 40-L en modo byte
+TAMAÑOS_CARGA = (20, 100, 500, 1000, 2953)
+
+# Muestras mínimas para dar un p99: con menos, el percentil 99 es el máximo
+MIN_MUESTRAS_P99 = 100
+
+# Métricas comparadas con --comparar -> True si un valor mayor es peor
+METRICAS_REGRESION = {
+    'p50_ms': True,
+    'p99_ms': True,
+    'codigos_por_segundo': False,
+    'rss_pico_mb': True,
+}
+
+# Nombre -> argumentos de python de los arranques medidos con --arranque
+ARRANQUES = {
+    'qr_generator --help': ('qr_generator.py', '--help'),
+    'qr_generator_advanced': ('-c', 'import qr_generator_advanced'),
+    'qr_lote --help': ('qr_lote.py', '--help'),
+}
+
+# Paquetes que solo deben cargarse al generar el primer código
+MODULOS_PESADOS = ('numpy', 'PIL', 'qrcode')
+
+# Línea de -X importtime: "import time: propio | acumulado | [sangría]módulo"
+_LINEA_IMPORTTIME = re.compile(r'^import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)$')
+
+CORRECCIONES = {
+    'L': qrcode.constants.ERROR_CORRECT_L,
+    'M': qrcode.constants.ERROR_CORRECT_M,
+    'Q': qrcode.constants.ERROR_CORRECT_Q,
+    'H': qrcode.constants.ERROR_CORRECT_H,
+}
+
+
+def _codificar_qrcode(datos, correccion):
+    qr = qrcode.QRCode(version=1, error_correction=correccion)
+    qr.add_data(datos)
+    qr.make(fit=True)
+    return qr
+
+
+def _medir(funcion, repeticiones):
+    """Devuelve el mejor tiempo por llamada en milisegundos"""
+    funcion()  # calentar cachés
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000
+
+
+def benchmark_codificacion(repeticiones=5, correccion='H'):
+    """
+    Mide la codificación de cada carga con los dos caminos
+
+    Returns:
+        list: Un diccionario por carga con versión, tiempos y si coinciden
+    """
+    nivel = CORRECCIONES[correccion]
+    resultados = []
+    for nombre, datos in CARGAS.items():
+        qr = _codificar_qrcode(datos, nivel)
+        modulos, version, _ = codificar_rapido(datos, nivel)
+        resultados.append({
+            'carga': nombre,
+            'version': version,
+            'coincide': version == qr.version and bool((modulos == np.array(qr.modules)).all()),
+            'qrcode_ms': _medir(lambda: _codificar_qrcode(datos, nivel), repeticiones),
+            'rapido_ms': _medir(lambda: codificar_rapido(datos, nivel), repeticiones),
+            'mascara_fija_ms': _medir(lambda: codificar_rapido(datos, nivel, mascara=0),
+                                      repeticiones),
+        })
+    return resultados
+
+
+def carga_de_tamaño(tamaño):
+    """Texto reproducible de `tamaño` bytes que se codifica en modo byte"""
+    azar = random.Random(tamaño)
+    return ''.join(azar.choices(string.ascii_lowercase + string.digits, k=tamaño))
+
+
+def escenarios(ruta_logo):
+    """
+    Produce (nombre, trabajo) para cada caso del benchmark de generadores
+
+    Los trabajos tienen el formato de qr_lote ('tipo' y los argumentos del
+    generador, sin nombre_archivo).
+    """
+    url = CARGAS['url']
+    yield 'simple', {'tipo': 'simple', 'datos': url}
+    yield 'personalizado', {'tipo': 'personalizado', 'datos': url,
+                            'color_frente': 'darkblue', 'color_fondo': 'lightyellow'}
+    yield 'logo', {'tipo': 'logo', 'datos': url, 'ruta_logo': ruta_logo}
+    for estilo in ESTILOS_MODULO:
+        yield f'estilo_{estilo}', {'tipo': 'estilo', 'datos': url, 'estilo_modulo': estilo}
+    for gradiente in GRADIENTES:
+        yield f'gradiente_{gradiente}', {'tipo': 'gradiente', 'datos': url,
+                                         'tipo_gradiente': gradiente}
+    for tamaño in TAMAÑOS_CARGA:
+        yield f'carga_{tamaño}b', {'tipo': 'simple', 'datos': carga_de_tamaño(tamaño)}
+
+
+def _percentil(tiempos, fraccion):
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    return tiempos[max(0, min(len(tiempos) - 1, int(np.ceil(fraccion * len(tiempos))) - 1))]
+
+
+def _rss_pico_mb():
+    """Pico de memoria residente del proceso en MB (ru_maxrss está en KB en Linux)"""
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def medir_escenario(trabajo, muestras, ruta_salida):
+    """
+    Mide un generador de extremo a extremo y por etapas
+
+    Primero llama al generador `muestras` veces escribiendo en ruta_salida
+    (latencias y códigos/s) y después repite las tres etapas con el mismo
+    perfil de QRRenderer para repartir el tiempo: codificar (datos a
+    MatrizQR), dibujar (MatrizQR a imagen) y guardar (imagen a PNG).
+
+    Returns:
+        dict: Métricas del escenario, con tiempos en milisegundos
+    """
+    trabajo = dict(trabajo, nombre_archivo=ruta_salida)
+    ejecutar_trabajo(trabajo)  # calentar perfiles y cachés
+    if not os.path.exists(ruta_salida):
+        raise RuntimeError("El generador no escribió el archivo de salida")
+
+    latencias = []
+    inicio_total = time.perf_counter()
+    for _ in range(muestras):
+        inicio = time.perf_counter()
+        ejecutar_trabajo(trabajo)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    total = time.perf_counter() - inicio_total
+
+    renderer = obtener_renderer(**perfil_para(trabajo))
+    etapas = {'codificar_ms': 0.0, 'dibujar_ms': 0.0, 'guardar_ms': 0.0}
+    for _ in range(muestras):
+        t0 = time.perf_counter()
+        matriz = renderer.matriz(trabajo['datos'])
+        t1 = time.perf_counter()
+        img = renderer.renderizar(matriz)
+        t2 = time.perf_counter()
+        codificar_imagen(img)
+        t3 = time.perf_counter()
+        etapas['codificar_ms'] += (t1 - t0) * 1000
+        etapas['dibujar_ms'] += (t2 - t1) * 1000
+        etapas['guardar_ms'] += (t3 - t2) * 1000
+
+    latencias.sort()
+    resultado = {
+        'version': matriz.version,
+        'muestras': muestras,
+        'codigos_por_segundo': muestras / total,
+        'p50_ms': _percentil(latencias, 0.50),
+        'p99_ms': (_percentil(latencias, 0.99) if muestras >= MIN_MUESTRAS_P99
+                   else None),
+        'max_ms': latencias[-1],
+        # Marca de agua del proceso: solo es del escenario si se mide en un
+        # intérprete propio (ver medir_en_proceso)
+        'rss_pico_mb': _rss_pico_mb(),
+    }
+    resultado.update({etapa: ms / muestras for etapa, ms in etapas.items()})
+    return resultado
+
+
+def medir_en_proceso(trabajo, muestras, ruta_salida):
+    """
+    Mide un escenario (ver medir_escenario) en un intérprete nuevo
+
+    ru_maxrss solo crece, así que el pico de memoria de un escenario medido
+    después de otros sería el del más exigente hasta ese momento. En un
+    proceso propio es el de ese escenario (más lo que ocupan las
+    importaciones, igual para todos).
+    """
+    codigo = ("import json, logging, sys, benchmark_qr; logging.disable(logging.INFO); "
+              "print(json.dumps(benchmark_qr.medir_escenario(*json.load(sys.stdin))))")
+    proceso = subprocess.run([sys.executable, '-c', codigo],
+                             cwd=os.path.dirname(os.path.abspath(__file__)),
+                             input=json.dumps([trabajo, muestras, ruta_salida]),
+                             capture_output=True, text=True)
+    if proceso.returncode:
+        ultima = (proceso.stderr.strip().splitlines() or ["sin salida de error"])[-1]
+        raise RuntimeError(f"El escenario falló en su proceso: {ultima}")
+    return json.loads(proceso.stdout.splitlines()[-1])
+
+
+def benchmark_generadores(muestras=100, filtro=None, al_medir=None):
+    """
+    Mide todos los escenarios (ver escenarios), cada uno en su propio proceso
+
+    Args:
+        muestras (int): Llamadas al generador por escenario (p99 solo se da
+                        con MIN_MUESTRAS_P99 o más)
+        filtro (str): Expresión regular; solo se miden los escenarios cuyo
+                      nombre la contiene
+        al_medir (callable): Función llamada con (nombre, métricas) al
+                             terminar cada escenario
+
+    Returns:
+        dict: Nombre del escenario -> métricas
+    """
+    resultados = {}
+    nivel_previo = logging.root.manager.disable
+    logging.disable(logging.INFO)
+    try:
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta_logo = os.path.join(carpeta, 'logo.png')
+            Image.new('RGBA', (256, 256), (220, 30, 60, 255)).save(ruta_logo)
+            for nombre, trabajo in escenarios(ruta_logo):
+                if filtro and not re.search(filtro, nombre):
+                    continue
+                resultados[nombre] = medir_en_proceso(
+                    trabajo, muestras, os.path.join(carpeta, f'{nombre}.png'))
+                if al_medir:
+                    al_medir(nombre, resultados[nombre])
+    finally:
+        logging.disable(nivel_previo)
+    return resultados
+
+
+def medir_arranque(argumentos, repeticiones=5):
+    """
+    Arranca un intérprete nuevo con -X importtime y mide las importaciones
+
+    Args:
+        argumentos (tuple): Argumentos de python tras -X importtime
+        repeticiones (int): Arranques medidos (se toma el mejor)
+
+    Returns:
+        dict: 'importacion_ms' (suma de las importaciones de primer nivel),
+              'total_ms' (tiempo de reloj del proceso) y 'pesados' (los
+              MODULOS_PESADOS que se cargaron)
+    """
+    carpeta = os.path.dirname(os.path.abspath(__file__))
+    mejor_importacion = mejor_total = float('inf')
+    pesados = set()
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        proceso = subprocess.run([sys.executable, '-X', 'importtime', *argumentos],
+                                 cwd=carpeta, capture_output=True, text=True,
+                                 stdin=subprocess.DEVNULL)
+        total = (time.perf_counter() - inicio) * 1000
+        importacion = 0
+        for linea in proceso.stderr.splitlines():
+            encontrada = _LINEA_IMPORTTIME.match(linea)
+            if not encontrada:
+                continue
+            acumulado, sangria, modulo = encontrada.groups()
+            if not sangria:
+                importacion += int(acumulado)
+            if modulo.split('.')[0] in MODULOS_PESADOS:
+                pesados.add(modulo.split('.')[0])
+        mejor_importacion = min(mejor_importacion, importacion / 1000)
+        mejor_total = min(mejor_total, total)
+    return {'importacion_ms': mejor_importacion, 'total_ms': mejor_total,
+            'pesados': sorted(pesados)}
+
+
+def _commit_actual():
+    """Commit de git del árbol medido, o None fuera de un repositorio"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar_resultados(base, actual, umbral=0.10):
+    """
+    Compara dos ejecuciones del benchmark escenario a escenario
+
+    Args:
+        base (dict): Resultados de referencia (el JSON de --json)
+        actual (dict): Resultados nuevos
+        umbral (float): Empeoramiento relativo tolerado (0.10 = 10 %)
+
+    Returns:
+        list: (escenario, métrica, valor base, valor actual, cambio relativo)
+              de cada métrica que empeora más que el umbral
+    """
+    regresiones = []
+    for nombre, metricas in actual.get('generadores', {}).items():
+        referencia = base.get('generadores', {}).get(nombre)
+        if referencia is None:
+            continue
+        for metrica, mayor_es_peor in METRICAS_REGRESION.items():
+            anterior, nuevo = referencia.get(metrica), metricas.get(metrica)
+            if not anterior or nuevo is None:
+                continue
+            cambio = (nuevo - anterior) / anterior
+            if (cambio if mayor_es_peor else -cambio) > umbral:
+                regresiones.append((nombre, metrica, anterior, nuevo, cambio))
+    return regresiones
+
+
+def main(argv=None):
+    """
+    Función principal
+    """
+    parser = argparse.ArgumentParser(description="Benchmark de los códigos QR: codificación "
+                                                 "y todos los generadores")
+    parser.add_argument('-n', '--repeticiones', type=int, default=5,
+                        help="Repeticiones por medida de codificación (se toma la mejor)")
+    parser.add_argument('-c', '--correccion', choices=tuple(CORRECCIONES), default='H',
+                        help="Nivel de corrección de errores de la codificación")
+    parser.add_argument('-g', '--generadores', action='store_true',
+                        help="Medir también los generadores, estilos, gradientes y "
+                             "tamaños de carga")
+    parser.add_argument('-m', '--muestras', type=int, default=100,
+                        help=f"Llamadas por escenario de generador (p99 solo con "
+                             f"{MIN_MUESTRAS_P99} o más)")
+    parser.add_argument('-k', '--filtro', default=None, metavar='REGEX',
+                        help="Medir solo los escenarios cuyo nombre coincida")
+    parser.add_argument('-a', '--arranque', action='store_true',
+                        help="Comprobar el arranque de las líneas de comandos con "
+                             "-X importtime")
+    parser.add_argument('--presupuesto-arranque', type=float, default=100, metavar='MS',
+                        help="Tiempo máximo de importación de cada arranque")
+    parser.add_argument('-j', '--json', default=None, metavar='ARCHIVO',
+                        help="Guardar los resultados en JSON")
+    parser.add_argument('--comparar', default=None, metavar='ARCHIVO',
+                        help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument('-u', '--umbral', type=float, default=0.10,
+                        help="Empeoramiento relativo tolerado al comparar (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    print(f"{'carga':<12} {'versión':>7} {'qrcode':>10} {'rápido':>10} "
+          f"{'máscara 0':>10} {'mejora':>7}")
+    correcto = True
+    codificacion = benchmark_codificacion(args.repeticiones, args.correccion)
+    for r in codificacion:
+        mejora = r['qrcode_ms'] / r['rapido_ms']
+        marca = "✓" if r['coincide'] else "✗ matriz distinta"
+        correcto &= r['coincide']
+        print(f"{r['carga']:<12} {r['version']:>7} {r['qrcode_ms']:>8.2f}ms "
+              f"{r['rapido_ms']:>8.2f}ms {r['mascara_fija_ms']:>8.2f}ms "
+              f"{mejora:>6.1f}x {marca}")
+
+    generadores = {}
+    if args.generadores or args.filtro:
+        def mostrar(nombre, r):
+            p99 = "-" if r['p99_ms'] is None else f"{r['p99_ms']:.2f}ms"
+            print(f"{nombre:<24} {r['version']:>7} {r['codigos_por_segundo']:>9.1f} "
+                  f"{r['p50_ms']:>8.2f}ms {p99:>10} {r['max_ms']:>8.2f}ms "
+                  f"{r['codificar_ms']:>8.2f}ms "
+                  f"{r['dibujar_ms']:>8.2f}ms {r['guardar_ms']:>8.2f}ms "
+                  f"{r['rss_pico_mb']:>7.1f}MB")
+
+        print()
+        print(f"{'escenario':<24} {'versión':>7} {'códigos/s':>9} {'p50':>10} {'p99':>10} "
+              f"{'máx':>10} {'codificar':>10} {'dibujar':>10} {'guardar':>10} {'RSS':>9}")
+        generadores = benchmark_generadores(args.muestras, args.filtro, mostrar)
+
+    arranques = {}
+    if args.arranque:
+        print()
+        print(f"{'arranque':<24} {'importación':>12} {'total':>10}  módulos pesados")
+        for nombre, argumentos in ARRANQUES.items():
+            r = arranques[nombre] = medir_arranque(argumentos, args.repeticiones)
+            dentro = (r['importacion_ms'] <= args.presupuesto_arranque
+                      and not r['pesados'])
+            correcto &= dentro
+            marca = "✓" if dentro else f"✗ presupuesto {args.presupuesto_arranque:g} ms"
+            print(f"{nombre:<24} {r['importacion_ms']:>10.1f}ms {r['total_ms']:>8.1f}ms  "
+                  f"{', '.join(r['pesados']) or '-'} {marca}")
+
+    resultados = {
+        'commit': _commit_actual(),
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'correccion': args.correccion,
+        'muestras': args.muestras,
+        'codificacion': codificacion,
+        'generadores': generadores,
+        'arranque': arranques,
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as archivo:
+            json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+        print(f"\n✓ Resultados guardados en: {args.json}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            base = json.load(archivo)
+        regresiones = comparar_resultados(base, resultados, args.umbral)
+        print(f"\nComparación con {args.comparar} (commit {base.get('commit')}, "
+              f"umbral {args.umbral:.0%}):")
+        for nombre, metrica, anterior, nuevo, cambio in regresiones:
+            print(f"✗ {nombre} {metrica}: {anterior:.2f} → {nuevo:.2f} ({cambio:+.0%})")
+        if not regresiones:
+            print("✓ Sin regresiones")
+        correcto &= not regresiones
+    return 0 if correcto else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
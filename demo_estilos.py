@@ -4,11 +4,9 @@ Script de demostración de estilos de QR
 Genera ejemplos de todos los estilos disponibles
 """
 
-from qr_generator_advanced import (
-    generar_qr_con_estilo,
-    generar_qr_gradiente,
-    mostrar_estilos_disponibles
-)
+from qr_matriz import codificar_matriz
+from qr_presets import PRESETS_INCLUIDOS, generar_qr_preset
+import logging
 import os
 
 
@@ -29,52 +27,43 @@ def generar_ejemplos():
     
     texto_ejemplo = "https://github.com/naye-gg/qrs_generator"
     
+    # Todos los ejemplos comparten los mismos datos: codificarlos una sola vez
+    matriz = codificar_matriz(texto_ejemplo)
+    
     # Ejemplos con diferentes estilos de módulos
     print("📐 Generando QR con diferentes estilos de módulos...\n")
     
-    estilos = [
-        ('cuadrado', 'navy', 'lightblue'),
-        ('cuadrado_gap', 'darkgreen', 'lightgreen'),
-        ('circulo', 'darkred', 'lightyellow'),
-        ('redondeado', 'purple', 'lavender'),
-        ('barras_v', 'darkorange', 'lightyellow'),
-        ('barras_h', 'darkblue', 'lightcyan')
-    ]
+    # Los aspectos salen de los presets incluidos, ya compilados
+    estilos = [nombre for nombre in PRESETS_INCLUIDOS if not nombre.startswith('gradiente_')]
+    gradientes = [nombre for nombre in PRESETS_INCLUIDOS if nombre.startswith('gradiente_')]
     
-    for estilo, color_frente, color_fondo in estilos:
-        nombre = f"ejemplo_{estilo}.png"
-        generar_qr_con_estilo(texto_ejemplo, nombre, estilo, color_frente, color_fondo)
+    for preset in estilos:
+        generar_qr_preset(matriz, f"ejemplo_{preset}.png", preset)
     
     print("\n🎨 Generando QR con gradientes...\n")
     
     # Ejemplos con gradientes
-    gradientes = [
-        ('radial', 'blue', 'purple', 'redondeado'),
-        ('horizontal', 'red', 'orange', 'circulo'),
-        ('vertical', 'green', 'yellow', 'redondeado'),
-        ('cuadrado', 'navy', 'cyan', 'cuadrado_gap')
-    ]
-    
-    for tipo_grad, color1, color2, estilo in gradientes:
-        nombre = f"gradiente_{tipo_grad}.png"
-        generar_qr_gradiente(texto_ejemplo, nombre, tipo_grad, color1, color2, 'white', estilo)
+    for preset in gradientes:
+        generar_qr_preset(matriz, f"{preset}.png", preset)
     
     print("\n" + "=" * 60)
     print("✅ ¡Todos los ejemplos generados en la carpeta 'demos'!")
     print("=" * 60)
     print("\n📁 Archivos generados:")
     print("\nEstilos básicos:")
-    for estilo, _, _ in estilos:
-        print(f"  - ejemplo_{estilo}.png")
+    for preset in estilos:
+        print(f"  - ejemplo_{preset}.png")
     
     print("\nGradientes:")
-    for tipo_grad, _, _, _ in gradientes:
-        print(f"  - gradiente_{tipo_grad}.png")
+    for preset in gradientes:
+        print(f"  - {preset}.png")
     
     print("\n💡 Tip: Abre los archivos para ver las diferencias entre estilos")
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
     # Volver a la carpeta qr_codes si existe
     if os.path.exists("../qr_codes"):
         os.chdir("../qr_codes")
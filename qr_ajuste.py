@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Ajuste Automático de la Corrección de Errores y del Logo
+Elige el nivel de corrección más bajo (y con él la versión más pequeña) que
+deja un margen de seguridad después de lo que tapa el logo, en lugar de usar
+siempre ERROR_CORRECT_H. Las decisiones se memorizan por tramo de longitud
+de los datos, estilo y proporción del logo, así que en un lote cuestan lo
+mismo que una consulta a un diccionario
+"""
+
+import logging
+from functools import lru_cache
+
+import numpy as np
+import qrcode
+from qrcode import exceptions, util
+
+from qr_codificador import plantilla_version, version_minima
+from qr_verificacion import bloques_de_codewords, mascara_logo
+
+
+registro = logging.getLogger(__name__)
+
+# Niveles de corrección de menor a mayor
+NIVELES = (qrcode.constants.ERROR_CORRECT_L, qrcode.constants.ERROR_CORRECT_M,
+           qrcode.constants.ERROR_CORRECT_Q, qrcode.constants.ERROR_CORRECT_H)
+
+# Estilo de módulo -> fracción adicional de la corrección que se deja libre.
+# Los estilos con menos tinta por módulo (círculos, huecos) se leen peor con
+# la imagen borrosa o mal impresa
+RESERVA_ESTILO = {
+    None: 0.0,
+    'cuadrado': 0.0,
+    'redondeado': 0.05,
+    'barras_v': 0.05,
+    'barras_h': 0.05,
+    'cuadrado_gap': 0.1,
+    'circulo': 0.15,
+}
+
+# Bytes de datos por tramo de la caché de decisiones
+ANCHO_TRAMO = 8
+
+# Proporción de logo más pequeña a la que se reduce un logo que no cabe
+PROPORCION_MINIMA = 0.1
+PASO_PROPORCION = 0.01
+
+
+@lru_cache(maxsize=4096)
+def codewords_bajo_logo(version, correccion, proporcion, tamaño_caja=10, borde=4):
+    """
+    Codewords de cada bloque Reed-Solomon que tapa el logo
+
+    Returns:
+        tuple: (codewords tapados por bloque, codewords corregibles por bloque)
+    """
+    bloque_de, capacidad = bloques_de_codewords(version, correccion)
+    _, _, filas, columnas, _ = plantilla_version(version)
+    tapados = mascara_logo(version * 4 + 17, tamaño_caja, borde, proporcion)
+    codewords = np.unique(np.flatnonzero(tapados[filas, columnas]) // 8)
+    codewords = codewords[codewords < len(bloque_de)]
+    return tuple(np.bincount(bloque_de[codewords], minlength=len(capacidad)).tolist()), capacidad
+
+
+def cabe_logo(version, correccion, proporcion, reserva, tamaño_caja=10, borde=4):
+    """
+    Indica si el logo deja libre la fracción reserva de la corrección de cada bloque
+
+    Args:
+        version (int): Versión del código
+        correccion (int): Nivel de corrección (qrcode.constants)
+        proporcion (float): Fracción del ancho de la imagen que ocupa el logo;
+                            0 si no hay logo
+        reserva (float): Fracción de los codewords corregibles que debe
+                         quedar libre para daños de impresión y lectura
+    """
+    if not proporcion:
+        return True
+    tapados, capacidad = codewords_bajo_logo(version, correccion, proporcion,
+                                             tamaño_caja, borde)
+    return all(n <= (1 - reserva) * limite for n, limite in zip(tapados, capacidad))
+
+
+def reserva_para(estilo_modulo, margen):
+    """Margen pedido más la reserva del estilo de módulo, como mucho 1"""
+    return min(margen + RESERVA_ESTILO.get(estilo_modulo, 0.0), 1.0)
+
+
+def tramo_de(datos):
+    """Tramo de longitud de los datos (bytes UTF-8 / ANCHO_TRAMO, redondeado hacia arriba)"""
+    longitud = len(datos.encode('utf-8')) if isinstance(datos, str) else len(datos)
+    return -(-longitud // ANCHO_TRAMO)
+
+
+def _versiones_posibles(tramo, correccion):
+    """
+    Versiones en las que pueden caer unos datos del tramo
+
+    La menor es la de los datos más cortos del tramo en modo numérico y la
+    mayor, la de los más largos en modo byte; así la decisión vale para
+    cualquier contenido del tramo. Si en modo byte no caben, la mayor es la
+    40: los datos numéricos o alfanuméricos del tramo aún pueden caber.
+
+    Raises:
+        DataOverflowError: Si ni los datos más cortos del tramo caben con
+                           esa corrección
+    """
+    maximo = tramo * ANCHO_TRAMO
+    minimo = max(maximo - ANCHO_TRAMO + 1, 0)
+    menor = version_minima([util.QRData('1' * minimo, util.MODE_NUMBER)], correccion)
+    try:
+        mayor = version_minima([util.QRData(b'a' * maximo, util.MODE_8BIT_BYTE)], correccion)
+    except exceptions.DataOverflowError:
+        mayor = 40
+    return range(menor, mayor + 1)
+
+
+@lru_cache(maxsize=4096)
+def elegir_correccion(tramo, estilo_modulo=None, proporcion=0.0, margen=0.25,
+                      tamaño_caja=10, borde=4):
+    """
+    Elige el nivel de corrección más bajo que deja libre el margen pedido
+
+    Args:
+        tramo (int): Tramo de longitud de los datos (ver tramo_de)
+        estilo_modulo (str): Estilo de los módulos (ver RESERVA_ESTILO)
+        proporcion (float): Fracción del ancho que ocupa el logo; 0 sin logo
+        margen (float): Fracción de la corrección de cada bloque que debe
+                        quedar libre tras el logo
+        tamaño_caja (int): Píxeles por módulo de la imagen
+        borde (int): Módulos de margen
+
+    Returns:
+        int: Nivel de corrección (qrcode.constants). Si ninguno deja el
+             margen se devuelve el más alto con el que caben los datos (H
+             si caben con todos), y el logo se reduce al dibujarlo (ver
+             proporcion_logo)
+    """
+    reserva = reserva_para(estilo_modulo, margen)
+    mas_alta = qrcode.constants.ERROR_CORRECT_H
+    for correccion in NIVELES:
+        try:
+            versiones = _versiones_posibles(tramo, correccion)
+        except exceptions.DataOverflowError:
+            continue
+        mas_alta = correccion
+        if all(cabe_logo(version, correccion, proporcion, reserva, tamaño_caja, borde)
+               for version in versiones):
+            return correccion
+    return mas_alta
+
+
+@lru_cache(maxsize=4096)
+def proporcion_logo(version, correccion, estilo_modulo=None, proporcion=0.2, margen=0.25,
+                    tamaño_caja=10, borde=4):
+    """
+    Proporción de logo más grande, hasta la pedida, que deja libre el margen
+
+    Returns:
+        float: La proporción pedida si cabe; si no, la mayor que cabe en
+               pasos de PASO_PROPORCION, sin bajar de PROPORCION_MINIMA
+    """
+    reserva = reserva_para(estilo_modulo, margen)
+    candidata = proporcion
+    while candidata > PROPORCION_MINIMA:
+        if cabe_logo(version, correccion, candidata, reserva, tamaño_caja, borde):
+            return candidata
+        candidata = round(candidata - PASO_PROPORCION, 2)
+    registro.warning("El logo no deja el margen pedido ni a %.0f%% del ancho "
+                     "(versión %d)", PROPORCION_MINIMA * 100, version)
+    return PROPORCION_MINIMA
@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""
+Animaciones de Códigos QR
+Escribe secuencias de códigos (uno por idioma, un gradiente por fotograma...)
+como GIF, APNG o WebP animados: todos los fotogramas comparten una paleta y
+cada uno guarda solo los píxeles que cambian respecto al anterior, así que
+los patrones de posición y demás zonas fijas se guardan una sola vez. Los
+fotogramas se escriben a medida que se dibujan
+"""
+
+import argparse
+import io
+import logging
+import os
+import struct
+import sys
+import zlib
+
+import numpy as np
+from PIL import GifImagePlugin, Image
+
+from qr_entrada import detectar_formato, leer_filas, normalizar_fila, renderer_para
+from qr_lote import TrabajoInvalido, tipo_de
+from qr_matriz import MatrizQR, codificar_matriz
+from qr_salida import es_ruta, nombre_destino
+
+
+registro = logging.getLogger(__name__)
+
+# Extensión -> formato animado
+FORMATOS_ANIMADOS = {'.gif': 'GIF', '.png': 'APNG', '.apng': 'APNG', '.webp': 'WEBP'}
+
+# Colores de la paleta compartida: el índice siguiente marca los píxeles
+# que no cambian respecto al fotograma anterior
+COLORES_PALETA = 255
+
+# Fotogramas que se guardan para calcular la paleta antes de escribir nada
+MUESTRAS_PALETA = 8
+
+_FIRMA_PNG = b"\x89PNG\r\n\x1a\n"
+
+
+def _claves(rgb):
+    """Empaqueta cada color RGB de un array (..., 3) en un entero"""
+    rgb = rgb.astype(np.uint32)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+
+def a_rgb(img):
+    """Array (alto, ancho, 3) de la imagen, con la transparencia sobre blanco"""
+    if img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info:
+        fondo = Image.new('RGBA', img.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(fondo, img.convert('RGBA'))
+    return np.asarray(img.convert('RGB'))
+
+
+class PaletaCompartida:
+    """
+    Paleta de hasta COLORES_PALETA colores común a todos los fotogramas
+
+    Si las imágenes de muestra tienen pocos colores (colores sólidos y
+    estilos) la paleta es exacta; si no (gradientes) se cuantiza un mosaico
+    de las muestras. Los colores que no están en la paleta se asignan al más
+    cercano.
+    """
+
+    __slots__ = ('colores', 'transparente', '_claves', '_orden')
+
+    def __init__(self, colores):
+        """
+        Args:
+            colores: Secuencia de tuplas RGB (como mucho COLORES_PALETA)
+        """
+        self.colores = np.array(colores, dtype=np.uint8).reshape(-1, 3)
+        if not 0 < len(self.colores) <= COLORES_PALETA:
+            raise ValueError(f"La paleta debe tener entre 1 y {COLORES_PALETA} colores")
+        # Índice que no usa ningún color, para los píxeles sin cambios
+        self.transparente = len(self.colores)
+        claves = _claves(self.colores)
+        self._orden = np.argsort(claves)
+        self._claves = claves[self._orden]
+
+    @classmethod
+    def desde_muestras(cls, muestras):
+        """
+        Calcula la paleta de unos fotogramas de muestra
+
+        Args:
+            muestras (list): Arrays RGB (alto, ancho, 3)
+        """
+        unicas = np.unique(np.concatenate([_claves(rgb).ravel() for rgb in muestras]))
+        if len(unicas) <= COLORES_PALETA:
+            return cls(np.stack([unicas >> 16, unicas >> 8, unicas], axis=-1) & 0xFF)
+        mosaico = Image.fromarray(np.concatenate(muestras, axis=0))
+        cuantizada = mosaico.quantize(COLORES_PALETA, method=Image.Quantize.MEDIANCUT)
+        usados = sorted(color for _, color in cuantizada.getcolors(256))
+        paleta = cuantizada.getpalette()
+        return cls([paleta[3 * i:3 * i + 3] for i in usados])
+
+    def indices(self, rgb):
+        """Array (alto, ancho) de uint8 con el índice de paleta de cada píxel"""
+        claves = _claves(rgb)
+        posiciones = np.minimum(np.searchsorted(self._claves, claves), len(self._claves) - 1)
+        encontrados = self._claves[posiciones] == claves
+        indices = self._orden[posiciones]
+        if not encontrados.all():
+            # Cada color que falta se busca una sola vez, por distancia euclídea
+            faltan, inversa = np.unique(claves[~encontrados], return_inverse=True)
+            rgb_faltan = (np.stack([faltan >> 16, faltan >> 8, faltan], axis=-1)
+                          & 0xFF).astype(np.int32)
+            distancias = ((rgb_faltan[:, None, :] - self.colores[None].astype(np.int32)) ** 2
+                          ).sum(axis=-1)
+            indices[~encontrados] = distancias.argmin(axis=1)[inversa]
+        return indices.astype(np.uint8)
+
+    def bytes_rgb(self, entradas=None):
+        """Paleta en bytes RGB con el índice transparente en blanco, rellena hasta entradas"""
+        entradas = entradas or self.transparente + 1
+        paleta = self.colores.tobytes() + b"\xff\xff\xff"
+        return paleta + b"\x00" * (3 * entradas - len(paleta))
+
+
+class EscritorAnimacion:
+    """
+    Base de los escritores de animaciones
+
+    Los primeros fotogramas se guardan hasta calcular la paleta compartida
+    (MUESTRAS_PALETA, o ninguno si se pasa la paleta); a partir de ahí cada
+    fotograma se convierte a índices, se compara con el anterior y se
+    escribe solo el rectángulo que cambia, con el índice transparente en los
+    píxeles que siguen igual.
+
+    Las subclases implementan _cabecera(), _fotograma(region, x, y,
+    duracion, delta) y _final().
+    """
+
+    def __init__(self, archivo, duracion=800, bucle=0, paleta=None):
+        """
+        Args:
+            archivo: Objeto binario con write()
+            duracion (int): Milisegundos de cada fotograma que no indique la suya
+            bucle (int): Repeticiones de la animación; 0 para siempre
+            paleta (PaletaCompartida): Paleta fija, o None para calcularla de
+                                       los primeros fotogramas
+        """
+        self.archivo = archivo
+        self.duracion = duracion
+        self.bucle = bucle
+        self.paleta = paleta
+        self.tamaño = None
+        self.fotogramas = 0
+        self.bytes = 0
+        self._muestras = []
+        self._anterior = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        if excepcion[0] is None:
+            self.cerrar()
+
+    def _escribir(self, contenido):
+        self.archivo.write(contenido)
+        self.bytes += len(contenido)
+
+    def añadir(self, img, duracion=None):
+        """
+        Añade un fotograma
+
+        Args:
+            img (PIL.Image): Fotograma; todos deben tener el mismo tamaño
+            duracion (int): Milisegundos que se muestra, o None para el de
+                            por defecto
+        """
+        if self.tamaño is None:
+            self.tamaño = img.size
+        elif img.size != self.tamaño:
+            raise ValueError(f"Todos los fotogramas deben medir {self.tamaño[0]}x"
+                             f"{self.tamaño[1]} px; este mide {img.size[0]}x{img.size[1]}")
+        rgb = a_rgb(img)
+        duracion = self.duracion if duracion is None else int(duracion)
+        if self.paleta is None:
+            self._muestras.append((rgb, duracion))
+            if len(self._muestras) >= MUESTRAS_PALETA:
+                self._vaciar_muestras()
+            return
+        self._escribir_fotograma(rgb, duracion)
+
+    def _vaciar_muestras(self):
+        if self.paleta is None:
+            self.paleta = PaletaCompartida.desde_muestras([rgb for rgb, _ in self._muestras])
+        muestras, self._muestras = self._muestras, []
+        for rgb, duracion in muestras:
+            self._escribir_fotograma(rgb, duracion)
+
+    def _escribir_fotograma(self, rgb, duracion):
+        indices = self.paleta.indices(rgb)
+        if self._anterior is None:
+            self._cabecera()
+            self._fotograma(indices, 0, 0, duracion, delta=False)
+        else:
+            cambios = indices != self._anterior
+            filas = np.flatnonzero(cambios.any(axis=1))
+            if len(filas) == 0:
+                # Fotograma repetido: un píxel transparente que solo aporta su duración
+                self._fotograma(np.full((1, 1), self.paleta.transparente, dtype=np.uint8),
+                                0, 0, duracion, delta=True)
+            else:
+                columnas = np.flatnonzero(cambios.any(axis=0))
+                y0, y1 = filas[0], filas[-1] + 1
+                x0, x1 = columnas[0], columnas[-1] + 1
+                region = indices[y0:y1, x0:x1].copy()
+                region[~cambios[y0:y1, x0:x1]] = self.paleta.transparente
+                self._fotograma(region, int(x0), int(y0), duracion, delta=True)
+        self._anterior = indices
+        self.fotogramas += 1
+
+    def cerrar(self):
+        """Escribe los fotogramas pendientes y el final del archivo"""
+        if self._muestras:
+            self._vaciar_muestras()
+        if not self.fotogramas:
+            raise ValueError("La animación no tiene fotogramas")
+        self._final()
+
+    def _cabecera(self):
+        pass
+
+    def _fotograma(self, region, x, y, duracion, delta):
+        raise NotImplementedError
+
+    def _final(self):
+        pass
+
+
+class EscritorGIF(EscritorAnimacion):
+    """
+    GIF animado con la paleta compartida como tabla global de colores
+
+    Los fotogramas delta se dibujan sobre el anterior (disposal 1) con el
+    índice transparente en los píxeles sin cambios. La compresión LZW de
+    cada región la hace Pillow (GifImagePlugin.getdata).
+    """
+
+    def _cabecera(self):
+        ancho, alto = self.tamaño
+        # Tabla global de 256 colores, resolución de 8 bits
+        self._escribir(b"GIF89a" + struct.pack('<HHBBB', ancho, alto, 0xF7, 0, 0)
+                       + self.paleta.bytes_rgb(256))
+        self._escribir(b"!\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack('<H', self.bucle)
+                       + b"\x00")
+
+    def _fotograma(self, region, x, y, duracion, delta):
+        opciones = {'duration': duracion, 'disposal': 1}
+        if delta:
+            opciones['transparency'] = self.paleta.transparente
+        for parte in GifImagePlugin.getdata(Image.fromarray(region, 'L'), (x, y),
+                                            **opciones):
+            self._escribir(parte)
+
+    def _final(self):
+        self._escribir(b";")
+
+
+class EscritorAPNG(EscritorAnimacion):
+    """
+    PNG animado (APNG) con paleta de 8 bits
+
+    La profundidad de la paleta se ajusta a sus colores (1, 2, 4 u 8 bits;
+    un código en blanco y negro más el índice transparente usa 2). El primer
+    fotograma es la imagen por defecto (IDAT) y los demás son regiones fdAT
+    que se mezclan sobre el anterior (blend_op OVER) con el índice
+    transparente en los píxeles sin cambios. El número de fotogramas va en
+    la cabecera: si el archivo no admite seek hay que indicarlo con total, y
+    si lo admite se corrige al cerrar.
+    """
+
+    def __init__(self, archivo, duracion=800, bucle=0, paleta=None, total=None,
+                 compresion=9):
+        """
+        Args:
+            total (int): Número de fotogramas, obligatorio si el archivo no
+                         admite seek
+            compresion (int): Nivel zlib de los fotogramas (0-9)
+        """
+        super().__init__(archivo, duracion, bucle, paleta)
+        self.total = total
+        self.compresion = compresion
+        self._secuencia = 0
+        self._posicion_actl = None
+        self._bits = 8
+        if total is None and not (hasattr(archivo, 'seekable') and archivo.seekable()):
+            raise ValueError("Un APNG hacia un destino sin seek necesita el número de "
+                             "fotogramas (total)")
+
+    def _fragmento(self, tipo, datos):
+        return (struct.pack('>I', len(datos)) + tipo + datos
+                + struct.pack('>I', zlib.crc32(tipo + datos)))
+
+    def _empaquetar(self, region):
+        """Junta en cada byte los índices de 8 // self._bits píxeles de cada fila"""
+        if self._bits == 8:
+            return region
+        por_byte = 8 // self._bits
+        alto, ancho = region.shape
+        grupos = np.pad(region, ((0, 0), (0, -ancho % por_byte))).reshape(alto, -1, por_byte)
+        desplazamientos = (8 - self._bits - self._bits * np.arange(por_byte)).astype(np.uint8)
+        return np.bitwise_or.reduce(grupos << desplazamientos, axis=2)
+
+    def _cabecera(self):
+        ancho, alto = self.tamaño
+        entradas = self.paleta.transparente + 1
+        self._bits = next(bits for bits in (1, 2, 4, 8) if entradas <= 1 << bits)
+        self._escribir(_FIRMA_PNG)
+        # Tipo de color 3 (paleta)
+        self._escribir(self._fragmento(b"IHDR", struct.pack('>IIBBBBB', ancho, alto,
+                                                           self._bits, 3, 0, 0, 0)))
+        if self.total is None:
+            self._posicion_actl = self.archivo.tell()
+        self._escribir(self._fragmento(b"acTL", struct.pack('>II', self.total or 0,
+                                                           self.bucle)))
+        self._escribir(self._fragmento(b"PLTE", self.paleta.bytes_rgb()))
+        self._escribir(self._fragmento(b"tRNS", b"\xff" * self.paleta.transparente + b"\x00"))
+
+    def _fotograma(self, region, x, y, duracion, delta):
+        alto, ancho = region.shape
+        empaquetada = self._empaquetar(region)
+        # Filtro 0 (ninguno) en cada fila
+        filas = np.zeros((alto, empaquetada.shape[1] + 1), dtype=np.uint8)
+        filas[:, 1:] = empaquetada
+        comprimido = zlib.compress(filas.tobytes(), self.compresion)
+        # dispose_op 0 (nada), blend_op 1 (OVER) en los delta y 0 (SOURCE) en el primero
+        self._escribir(self._fragmento(b"fcTL", struct.pack(
+            '>IIIIIHHBB', self._secuencia, ancho, alto, x, y,
+            min(duracion, 0xFFFF), 1000, 0, 1 if delta else 0)))
+        self._secuencia += 1
+        if not delta:
+            self._escribir(self._fragmento(b"IDAT", comprimido))
+        else:
+            self._escribir(self._fragmento(b"fdAT", struct.pack('>I', self._secuencia)
+                                           + comprimido))
+            self._secuencia += 1
+
+    def _final(self):
+        self._escribir(self._fragmento(b"IEND", b""))
+        if self._posicion_actl is not None:
+            final = self.archivo.tell()
+            self.archivo.seek(self._posicion_actl)
+            self.archivo.write(self._fragmento(b"acTL", struct.pack('>II', self.fotogramas,
+                                                                  self.bucle)))
+            self.archivo.seek(final)
+        elif self.fotogramas != self.total:
+            raise ValueError(f"Se anunciaron {self.total} fotogramas y se escribieron "
+                             f"{self.fotogramas}")
+
+
+class EscritorWebP(EscritorAnimacion):
+    """
+    WebP animado sin pérdida
+
+    El codificador WebP de Pillow necesita la secuencia completa, así que los
+    fotogramas se guardan hasta cerrar, pero como imágenes de paleta (un byte
+    por píxel en lugar de tres). libwebp busca por su cuenta el rectángulo
+    que cambia entre fotogramas.
+    """
+
+    def __init__(self, archivo, duracion=800, bucle=0, paleta=None):
+        super().__init__(archivo, duracion, bucle, paleta)
+        self._imagenes = []
+        self._duraciones = []
+
+    def _fotograma(self, region, x, y, duracion, delta):
+        # Se guarda el fotograma completo (self._escribir_fotograma ya
+        # actualizó la comparación), no la región
+        if delta:
+            completo = self._anterior.copy()
+            y1, x1 = y + region.shape[0], x + region.shape[1]
+            zona = completo[y:y1, x:x1]
+            cambiados = region != self.paleta.transparente
+            zona[cambiados] = region[cambiados]
+            region = completo
+        img = Image.fromarray(region, 'P')
+        img.putpalette(self.paleta.bytes_rgb())
+        self._imagenes.append(img)
+        self._duraciones.append(duracion)
+
+    def _final(self):
+        buffer = io.BytesIO()
+        self._imagenes[0].save(buffer, format='WEBP', save_all=True,
+                               append_images=self._imagenes[1:],
+                               duration=self._duraciones, loop=self.bucle, lossless=True)
+        self._imagenes.clear()
+        self._escribir(buffer.getvalue())
+
+
+def formato_animado(destino):
+    """Formato animado de una ruta u objeto con name ('GIF', 'APNG' o 'WEBP'; GIF por defecto)"""
+    nombre = os.fspath(destino) if es_ruta(destino) else getattr(destino, 'name', None)
+    if not isinstance(nombre, str):
+        return 'GIF'
+    for extension, formato in FORMATOS_ANIMADOS.items():
+        if nombre.lower().endswith(extension):
+            return formato
+    raise ValueError(f"Formato de animación desconocido: {nombre!r} "
+                     f"(se admiten {', '.join(FORMATOS_ANIMADOS)})")
+
+
+def abrir_escritor(archivo, formato='GIF', duracion=800, bucle=0, total=None,
+                   compresion=None):
+    """
+    Crea el escritor del formato pedido
+
+    Args:
+        archivo: Objeto binario con write()
+        formato (str): 'GIF', 'APNG' o 'WEBP'
+        duracion (int): Milisegundos por fotograma por defecto
+        bucle (int): Repeticiones; 0 para siempre
+        total (int): Número de fotogramas (solo lo necesita un APNG sin seek)
+        compresion (int): Nivel zlib del APNG (0-9), o None para 9
+
+    Returns:
+        EscritorAnimacion
+    """
+    if formato == 'GIF':
+        return EscritorGIF(archivo, duracion, bucle)
+    if formato == 'APNG':
+        return EscritorAPNG(archivo, duracion, bucle, total=total,
+                            compresion=9 if compresion is None else compresion)
+    if formato == 'WEBP':
+        return EscritorWebP(archivo, duracion, bucle)
+    raise ValueError(f"Formato de animación desconocido: {formato!r}")
+
+
+def _normalizar_fotograma(fotograma):
+    """Acepta un texto o un trabajo de qr_lote y devuelve un trabajo con 'tipo'"""
+    if not isinstance(fotograma, dict):
+        return {'tipo': 'simple', 'datos': fotograma}
+    if 'tipo' in fotograma:
+        return fotograma
+    return dict(fotograma, tipo=tipo_de(fotograma))
+
+
+def componer_animacion(fotogramas, destino="qr_animado.gif", duracion=800, bucle=0,
+                       compresion=None):
+    """
+    Dibuja una secuencia de códigos y la escribe como animación
+
+    Primero se codifican todos los datos (un MatrizQR ocupa unos pocos KB) y
+    los que caben en una versión menor se vuelven a codificar en la mayor,
+    para que todos los fotogramas midan lo mismo y los patrones fijos
+    coincidan; después cada fotograma se dibuja y se escribe sin guardar
+    las imágenes.
+
+    Args:
+        fotogramas (iterable): Textos o trabajos de qr_lote ('tipo', 'datos' y
+                               las opciones del generador; 'nombre_archivo'
+                               se ignora) con la clave opcional 'duracion' en
+                               milisegundos
+        destino: Ruta .gif, .png / .apng o .webp, u objeto binario con write()
+                 (GIF, salvo que su name tenga otra extensión)
+        duracion (int): Milisegundos de los fotogramas sin 'duracion'
+        bucle (int): Repeticiones; 0 para siempre
+        compresion (int): Nivel zlib del APNG (0-9)
+
+    Returns:
+        int: Fotogramas escritos
+    """
+    if not es_ruta(destino) and not hasattr(destino, 'write'):
+        raise TypeError(f"Destino de animación no válido: {type(destino).__name__}")
+    formato = formato_animado(destino)
+
+    codificados = []
+    for fotograma in fotogramas:
+        trabajo = _normalizar_fotograma(fotograma)
+        renderer = renderer_para(trabajo)
+        datos = trabajo['datos']
+        matriz = datos if isinstance(datos, MatrizQR) else renderer.matriz(datos)
+        codificados.append((trabajo, renderer, matriz))
+    if not codificados:
+        raise ValueError("La animación no tiene fotogramas")
+    version = max(matriz.version for _, _, matriz in codificados)
+
+    # Lado en píxeles de cada fotograma, antes de crear el archivo: si no
+    # coinciden no se deja una animación vacía en el destino
+    lados = {(matriz.lado if isinstance(trabajo['datos'], MatrizQR) else 17 + 4 * version,
+              renderer.borde, renderer.caja_imagen)
+             for trabajo, renderer, matriz in codificados}
+    lados_px = sorted({(lado + 2 * borde) * caja for lado, borde, caja in lados})
+    if len(lados_px) > 1:
+        raise ValueError(f"Todos los fotogramas deben medir lo mismo; miden "
+                         f"{', '.join(f'{lado}x{lado}' for lado in lados_px)} px")
+
+    archivo = open(destino, 'wb') if es_ruta(destino) else destino
+    try:
+        escritor = abrir_escritor(archivo, formato, duracion, bucle, len(codificados),
+                                  compresion)
+        for trabajo, renderer, matriz in codificados:
+            if matriz.version < version and not isinstance(trabajo['datos'], MatrizQR):
+                matriz = codificar_matriz(trabajo['datos'], matriz.correccion, version,
+                                          renderer.mascara_fija,
+                                          'numpy' if renderer.motor == 'numpy' else 'qrcode')
+            escritor.añadir(renderer.renderizar(matriz), trabajo.get('duracion'))
+        escritor.cerrar()
+    except BaseException:
+        if archivo is not destino:
+            # Una animación a medias no se puede reproducir
+            archivo.close()
+            os.unlink(destino)
+        raise
+    finally:
+        if archivo is not destino:
+            archivo.close()
+    registro.info("✓ Animación de %d fotogramas guardada en: %s", escritor.fotogramas,
+                  nombre_destino(destino))
+    return escritor.fotogramas
+
+
+def leer_fotogramas(archivo, formato='csv'):
+    """
+    Lee los fotogramas de un archivo CSV o JSONL como los de qr_generator --entrada
+
+    Además de las columnas de los generadores admite 'duracion', los
+    milisegundos de cada fotograma.
+    """
+    for numero, fila in enumerate(leer_filas(archivo, formato), 1):
+        if isinstance(fila, TrabajoInvalido):
+            # Un fotograma que falta cambiaría la animación: se aborta
+            raise ValueError(fila.error)
+        duracion = fila.pop('duracion', None)
+        trabajo = normalizar_fila(fila, numero)
+        if duracion not in (None, ''):
+            trabajo['duracion'] = int(duracion)
+        yield trabajo
+
+
+def main(argv=None):
+    """
+    Función principal
+    """
+    parser = argparse.ArgumentParser(
+        description="Compone un GIF, APNG o WebP animado con un código QR por fila "
+                    "de un archivo CSV o JSONL")
+    parser.add_argument('entrada', help="Archivo CSV o JSONL de fotogramas ('-' para stdin)")
+    parser.add_argument('-o', '--salida', default="qr_animado.gif",
+                        help="Archivo de salida: .gif, .png / .apng o .webp")
+    parser.add_argument('-f', '--formato', choices=('csv', 'jsonl'), default=None,
+                        help="Formato de la entrada (por defecto según la extensión)")
+    parser.add_argument('-t', '--duracion', type=int, default=800, metavar='MS',
+                        help="Milisegundos por fotograma (si la fila no indica 'duracion')")
+    parser.add_argument('--bucle', type=int, default=0,
+                        help="Repeticiones de la animación (0 = siempre)")
+    parser.add_argument('-z', '--compresion', type=int, choices=range(10), default=None,
+                        metavar='0-9', help="Nivel de compresión del APNG")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    formato = args.formato
+    if formato is None:
+        formato = 'csv' if args.entrada == '-' else detectar_formato(args.entrada)
+    if args.entrada == '-':
+        archivo = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+    else:
+        archivo = open(args.entrada, encoding='utf-8', newline='')
+    try:
+        componer_animacion(leer_fotogramas(archivo, formato), args.salida, args.duracion,
+                           args.bucle, args.compresion)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return 1
+    finally:
+        if args.entrada != '-':
+            archivo.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
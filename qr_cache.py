@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Caché de Resultados de Códigos QR
+Guarda el PNG ya codificado de cada combinación (datos, perfil de
+renderizado) para que los datos repetidos de un lote (la misma URL de tienda
+en muchos productos) no vuelvan a pasar por qr.make ni por el renderizado
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+from qr_matriz import MatrizQR
+
+
+class CacheResultados:
+    """
+    Caché direccionada por contenido de imágenes PNG de códigos QR
+
+    Tiene dos niveles: un LRU en memoria y, opcionalmente, una carpeta en
+    disco con límite de tamaño (se expulsan primero los archivos usados hace
+    más tiempo). Varios procesos pueden compartir la misma carpeta: cada
+    archivo se escribe en uno temporal y se renombra de forma atómica.
+
+        cache = CacheResultados('cache_qr')
+        generar_qr_simple("https://tienda.com", "a.png", cache=cache)
+        generar_qr_simple("https://tienda.com", "b.png", cache=cache)  # acierto
+    """
+
+    def __init__(self, directorio=None, max_bytes_memoria=64 * 1024 * 1024,
+                 max_bytes_disco=1024 * 1024 * 1024, enlazar=False):
+        """
+        Args:
+            directorio (str): Carpeta del nivel en disco, o None para usar
+                              solo memoria
+            max_bytes_memoria (int): Tamaño máximo de los PNG guardados en memoria
+            max_bytes_disco (int): Tamaño máximo de la carpeta en disco (límite
+                                   por proceso si varios procesos la comparten)
+            enlazar (bool): Crear los duplicados como enlaces duros al archivo
+                            de la caché en lugar de copiarlos. Más rápido y sin
+                            ocupar espacio, pero sobrescribir luego uno de esos
+                            archivos en el sitio modificaría también la caché
+        """
+        self.directorio = directorio
+        self.max_bytes_memoria = max_bytes_memoria
+        self.max_bytes_disco = max_bytes_disco
+        self.enlazar = enlazar
+        self.aciertos = 0
+        self.fallos = 0
+        self.bytes_memoria = 0
+        self.bytes_disco = 0
+        self._memoria = OrderedDict()
+        self._disco = None
+        self._cerrojo = threading.Lock()
+
+    @property
+    def opciones(self):
+        """Argumentos para crear una caché equivalente en otro proceso"""
+        return {'directorio': self.directorio,
+                'max_bytes_memoria': self.max_bytes_memoria,
+                'max_bytes_disco': self.max_bytes_disco,
+                'enlazar': self.enlazar}
+
+    def clave(self, datos, perfil, ruta_logo=None):
+        """
+        Calcula la clave de un código QR
+
+        Args:
+            datos (str): Texto o URL codificado, o un MatrizQR
+            perfil (tuple): Perfil de renderizado (ver QRRenderer.perfil):
+                            corrección, versión, estilo, colores, tamaños...
+            ruta_logo (str): Logo del perfil; su fecha de modificación entra
+                             en la clave para no servir PNG con un logo antiguo
+        """
+        if isinstance(datos, MatrizQR):
+            datos = (datos.version, datos.correccion, datos.bits)
+        firma = [repr(datos), repr(perfil)]
+        if ruta_logo:
+            estado = os.stat(ruta_logo)
+            firma.append(f"{estado.st_mtime_ns}:{estado.st_size}")
+        return hashlib.sha256('\0'.join(firma).encode('utf-8')).hexdigest()
+
+    def _ruta_disco(self, clave):
+        return os.path.join(self.directorio, clave[:2], clave + '.png')
+
+    def _indice_disco(self):
+        """Índice clave -> tamaño de la carpeta, del uso más antiguo al más reciente"""
+        if self._disco is None:
+            encontrados = []
+            if os.path.isdir(self.directorio):
+                for entrada in os.scandir(self.directorio):
+                    if not entrada.is_dir():
+                        continue
+                    for archivo in os.scandir(entrada.path):
+                        if archivo.name.endswith('.png'):
+                            estado = archivo.stat()
+                            encontrados.append((estado.st_mtime_ns, archivo.name[:-4],
+                                                estado.st_size))
+            encontrados.sort()
+            self._disco = OrderedDict((clave, tamaño) for _, clave, tamaño in encontrados)
+            self.bytes_disco = sum(self._disco.values())
+        return self._disco
+
+    def _guardar_memoria(self, clave, png):
+        if clave in self._memoria or len(png) > self.max_bytes_memoria:
+            return
+        self._memoria[clave] = png
+        self.bytes_memoria += len(png)
+        while self.bytes_memoria > self.max_bytes_memoria:
+            _, expulsado = self._memoria.popitem(last=False)
+            self.bytes_memoria -= len(expulsado)
+
+    def _guardar_disco(self, clave, png):
+        indice = self._indice_disco()
+        if clave in indice or len(png) > self.max_bytes_disco:
+            return
+        ruta = self._ruta_disco(clave)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as archivo:
+            archivo.write(png)
+        os.replace(temporal, ruta)
+        indice[clave] = len(png)
+        self.bytes_disco += len(png)
+        while self.bytes_disco > self.max_bytes_disco:
+            expulsada, tamaño = indice.popitem(last=False)
+            self.bytes_disco -= tamaño
+            try:
+                os.unlink(self._ruta_disco(expulsada))
+            except FileNotFoundError:
+                pass
+
+    def _buscar(self, clave):
+        """Devuelve (png, ruta_en_disco); cualquiera de los dos puede ser None"""
+        with self._cerrojo:
+            png = self._memoria.get(clave)
+            if png is not None:
+                self._memoria.move_to_end(clave)
+                self.aciertos += 1
+                return png, None
+            if self.directorio:
+                ruta = self._ruta_disco(clave)
+                if os.path.exists(ruta):
+                    # Marcar el uso para que sobreviva a las expulsiones
+                    os.utime(ruta)
+                    indice = self._indice_disco()
+                    if clave in indice:
+                        indice.move_to_end(clave)
+                    else:
+                        indice[clave] = os.path.getsize(ruta)
+                        self.bytes_disco += indice[clave]
+                    self.aciertos += 1
+                    return None, ruta
+            self.fallos += 1
+            return None, None
+
+    def obtener(self, clave):
+        """Devuelve los bytes del PNG guardado, o None si no está en caché"""
+        png, ruta = self._buscar(clave)
+        if ruta is not None:
+            with open(ruta, 'rb') as archivo:
+                png = archivo.read()
+            with self._cerrojo:
+                self._guardar_memoria(clave, png)
+        return png
+
+    def guardar(self, clave, png):
+        """Guarda los bytes de un PNG en memoria y, si hay carpeta, en disco"""
+        with self._cerrojo:
+            self._guardar_memoria(clave, png)
+            if self.directorio:
+                self._guardar_disco(clave, png)
+
+    def escribir(self, clave, nombre_archivo):
+        """
+        Escribe en nombre_archivo el PNG guardado, si lo hay
+
+        Returns:
+            bool: True si la clave estaba en caché y el archivo se escribió
+        """
+        png, ruta = self._buscar(clave)
+        if ruta is not None:
+            if self.enlazar and _enlazar(ruta, nombre_archivo):
+                return True
+            shutil.copyfile(ruta, nombre_archivo)
+            return True
+        if png is not None:
+            with open(nombre_archivo, 'wb') as archivo:
+                archivo.write(png)
+            return True
+        return False
+
+    def estadisticas(self):
+        """Devuelve los contadores de la caché en un diccionario"""
+        with self._cerrojo:
+            consultas = self.aciertos + self.fallos
+            return {'aciertos': self.aciertos,
+                    'fallos': self.fallos,
+                    'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+                    'bytes_memoria': self.bytes_memoria,
+                    'bytes_disco': self.bytes_disco}
+
+    def recoger_contadores(self):
+        """
+        Devuelve (aciertos, fallos) desde la última llamada y los pone a cero
+
+        Pensada para los procesos trabajadores de un lote: el proceso
+        principal los acumula en su caché con sumar_contadores.
+        """
+        with self._cerrojo:
+            contadores = (self.aciertos, self.fallos)
+            self.aciertos = self.fallos = 0
+            return contadores
+
+    def sumar_contadores(self, aciertos, fallos):
+        """Suma los contadores recogidos en otro proceso (ver recoger_contadores)"""
+        with self._cerrojo:
+            self.aciertos += aciertos
+            self.fallos += fallos
+
+    def limpiar(self):
+        """Vacía el nivel en memoria (la carpeta en disco no se toca)"""
+        with self._cerrojo:
+            self._memoria.clear()
+            self.bytes_memoria = 0
+
+
+def _enlazar(origen, destino):
+    """Crea destino como enlace duro a origen; False si el sistema no lo permite"""
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    try:
+        os.link(origen, temporal)
+    except OSError:
+        return False
+    os.replace(temporal, destino)
+    return True
+
+
+# Caché usada por los generadores cuando no reciben una explícita (None: desactivada)
+CACHE_RESULTADOS = None
+
+
+def activar_cache(directorio=None, **opciones):
+    """
+    Activa la caché de resultados para todos los generadores del proceso
+
+    Args:
+        directorio (str): Carpeta del nivel en disco, o None para solo memoria
+        **opciones: Resto de argumentos de CacheResultados
+
+    Returns:
+        CacheResultados: La caché activada
+    """
+    global CACHE_RESULTADOS
+    CACHE_RESULTADOS = CacheResultados(directorio, **opciones)
+    return CACHE_RESULTADOS
+
+
+def desactivar_cache():
+    """Vuelve a generar todos los códigos sin caché"""
+    global CACHE_RESULTADOS
+    CACHE_RESULTADOS = None
+
+
+def cache_activa():
+    """Devuelve la caché activada con activar_cache, o None"""
+    return CACHE_RESULTADOS
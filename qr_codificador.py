@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Codificación Rápida de Códigos QR
+Sustituye las partes lentas de qrcode.QRCode.make(fit=True) por versiones
+directas o vectorizadas con NumPy, produciendo exactamente la misma matriz:
+
+- La versión se calcula contando los bits de cada fragmento, sin escribir
+  el búfer bit a bit en cada intento.
+- Los bytes de corrección Reed-Solomon se calculan con una tabla del
+  polinomio generador, sin la división recursiva de polinomios.
+- Los datos se colocan con índices precalculados por versión y las 8
+  máscaras se puntúan juntas con las mismas reglas que qrcode.util.lost_point.
+"""
+
+from bisect import bisect_left
+from functools import lru_cache
+
+import numpy as np
+import qrcode
+from qrcode import base, exceptions, util
+from qrcode.LUT import rsPoly_LUT
+
+
+def _bits_fragmento(fragmento):
+    """Bits que ocupa el contenido de un fragmento, sin cabeceras"""
+    n = len(fragmento)
+    if fragmento.mode == util.MODE_NUMBER:
+        return 10 * (n // 3) + (util.NUMBER_LENGTH[n % 3] if n % 3 else 0)
+    if fragmento.mode == util.MODE_ALPHA_NUM:
+        return 11 * (n // 2) + 6 * (n % 2)
+    return 8 * n
+
+
+def bits_necesarios(fragmentos, version):
+    """Bits del flujo de datos (modo, longitud y contenido) para una versión"""
+    tamaños = util.mode_sizes_for_version(version)
+    return sum(4 + tamaños[f.mode] + _bits_fragmento(f) for f in fragmentos)
+
+
+def version_minima(fragmentos, correccion, inicio=1):
+    """
+    Calcula la menor versión en la que caben los datos
+
+    Da el mismo resultado que QRCode.best_fit, pero contando los bits en
+    lugar de escribirlos.
+
+    Raises:
+        DataOverflowError: Si los datos no caben ni en la versión 40
+    """
+    limites = util.BIT_LIMIT_TABLE[correccion]
+    version = inicio
+    while True:
+        necesarios = bits_necesarios(fragmentos, version)
+        candidata = bisect_left(limites, necesarios, version)
+        if candidata == 41:
+            raise exceptions.DataOverflowError()
+        if util.mode_sizes_for_version(candidata) is util.mode_sizes_for_version(version):
+            return candidata
+        version = candidata
+
+
+def _escribir_fragmentos(fragmentos, version):
+    """Devuelve (entero, número de bits) con el flujo de datos sin relleno"""
+    tamaños = util.mode_sizes_for_version(version)
+    valor = 0
+    longitud = 0
+
+    def poner(numero, bits):
+        nonlocal valor, longitud
+        valor = (valor << bits) | numero
+        longitud += bits
+
+    for fragmento in fragmentos:
+        datos = fragmento.data
+        poner(fragmento.mode, 4)
+        poner(len(fragmento), tamaños[fragmento.mode])
+        if fragmento.mode == util.MODE_NUMBER:
+            for i in range(0, len(datos), 3):
+                grupo = datos[i:i + 3]
+                poner(int(grupo), util.NUMBER_LENGTH[len(grupo)])
+        elif fragmento.mode == util.MODE_ALPHA_NUM:
+            for i in range(0, len(datos), 2):
+                par = datos[i:i + 2]
+                if len(par) > 1:
+                    poner(util.ALPHA_NUM.find(par[:1]) * 45 + util.ALPHA_NUM.find(par[1:]), 11)
+                else:
+                    poner(util.ALPHA_NUM.find(par), 6)
+        else:
+            poner(int.from_bytes(datos, 'big'), 8 * len(datos))
+    return valor, longitud
+
+
+def bytes_de_datos(fragmentos, version, limite_bits):
+    """
+    Construye los bytes de datos con terminador y relleno, como util.create_data
+
+    Raises:
+        DataOverflowError: Si los datos no caben en limite_bits
+    """
+    valor, longitud = _escribir_fragmentos(fragmentos, version)
+    if longitud > limite_bits:
+        raise exceptions.DataOverflowError(
+            f"Code length overflow. Data size ({longitud}) > size available ({limite_bits})")
+
+    # Terminador (hasta 4 ceros) y ceros hasta completar el byte
+    terminador = min(limite_bits - longitud, 4)
+    longitud += terminador
+    relleno = -longitud % 8
+    valor <<= terminador + relleno
+    longitud += relleno
+
+    datos = valor.to_bytes(longitud // 8, 'big')
+    faltan = (limite_bits - longitud) // 8
+    return datos + (bytes((util.PAD0, util.PAD1)) * (faltan // 2 + 1))[:faltan]
+
+
+@lru_cache(maxsize=None)
+def _tabla_generador(num_correccion):
+    """
+    Producto de cada byte por el polinomio generador, como entero
+
+    tabla[f] tiene num_correccion bytes: los coeficientes de f * g(x) sin
+    el primero, que es lo que se suma al resto en cada paso de la división.
+    """
+    if num_correccion in rsPoly_LUT:
+        coeficientes = rsPoly_LUT[num_correccion]
+    else:
+        polinomio = base.Polynomial([1], 0)
+        for i in range(num_correccion):
+            polinomio = polinomio * base.Polynomial([1, base.gexp(i)], 0)
+        coeficientes = list(polinomio)
+    logaritmos = [base.glog(c) for c in coeficientes[1:]]
+    tabla = [0]
+    for factor in range(1, 256):
+        log_factor = base.glog(factor)
+        producto = bytes(base.gexp(log_factor + l) for l in logaritmos)
+        tabla.append(int.from_bytes(producto, 'big'))
+    return tabla
+
+
+def corregir_bloque(datos, num_correccion):
+    """
+    Calcula los bytes Reed-Solomon de un bloque
+
+    Es la división de qrcode (Polynomial.__mod__) hecha como registro de
+    desplazamiento sobre un entero, un paso por byte de datos.
+
+    Args:
+        datos (bytes): Bytes de datos del bloque
+        num_correccion (int): Bytes de corrección del bloque
+
+    Returns:
+        bytes: Los num_correccion bytes de corrección
+    """
+    tabla = _tabla_generador(num_correccion)
+    desplazamiento = 8 * (num_correccion - 1)
+    limite = (1 << (8 * num_correccion)) - 1
+    resto = 0
+    for byte in datos:
+        factor = byte ^ (resto >> desplazamiento)
+        resto = ((resto << 8) & limite) ^ tabla[factor]
+    return resto.to_bytes(num_correccion, 'big')
+
+
+def crear_codewords(fragmentos, version, correccion):
+    """Devuelve los codewords intercalados (datos y corrección), como util.create_data"""
+    bloques_rs = base.rs_blocks(version, correccion)
+    limite_bits = sum(bloque.data_count * 8 for bloque in bloques_rs)
+    datos = bytes_de_datos(fragmentos, version, limite_bits)
+
+    bloques = []
+    correcciones = []
+    inicio = 0
+    for bloque in bloques_rs:
+        fin = inicio + bloque.data_count
+        bloques.append(datos[inicio:fin])
+        correcciones.append(corregir_bloque(datos[inicio:fin],
+                                            bloque.total_count - bloque.data_count))
+        inicio = fin
+
+    # Intercalar: el byte i de cada bloque, luego los de corrección
+    salida = bytearray()
+    for grupo in (bloques, correcciones):
+        for i in range(max(len(b) for b in grupo)):
+            salida.extend(b[i] for b in grupo if i < len(b))
+    return np.frombuffer(bytes(salida), dtype=np.uint8)
+
+
+def _posiciones_formato(lado):
+    """Casillas de la información de formato en el orden de setup_type_info"""
+    verticales = []
+    horizontales = []
+    for i in range(15):
+        if i < 6:
+            verticales.append((i, 8))
+        elif i < 8:
+            verticales.append((i + 1, 8))
+        else:
+            verticales.append((lado - 15 + i, 8))
+        if i < 8:
+            horizontales.append((8, lado - i - 1))
+        elif i < 9:
+            horizontales.append((8, 15 - i))
+        else:
+            horizontales.append((8, 15 - i - 1))
+    return verticales, horizontales
+
+
+@lru_cache(maxsize=None)
+def plantilla_version(version):
+    """
+    Partes fijas de una versión, calculadas con los métodos de qrcode
+
+    Returns:
+        tuple: (prueba, final, filas, columnas, formato) donde prueba es la
+               matriz de patrones con la información de formato y versión a
+               False (como makeImpl(True, ...)), final la de patrones con la
+               información de versión y el módulo oscuro fijo, filas/columnas
+               las casillas de datos en el orden de map_data y formato los
+               índices de las 30 casillas de formato
+    """
+    lado = version * 4 + 17
+    qr = qrcode.QRCode(version=version)
+    qr.modules_count = lado
+    qr.modules = [[None] * lado for _ in range(lado)]
+    qr.setup_position_probe_pattern(0, 0)
+    qr.setup_position_probe_pattern(lado - 7, 0)
+    qr.setup_position_probe_pattern(0, lado - 7)
+    qr.setup_position_adjust_pattern()
+    qr.setup_timing_pattern()
+    qr.setup_type_info(True, 0)
+    if version >= 7:
+        qr.setup_type_number(True)
+
+    libres = np.array([[celda is None for celda in fila] for fila in qr.modules])
+    prueba = np.array([[bool(celda) for celda in fila] for fila in qr.modules])
+
+    final = prueba.copy()
+    final[lado - 8, 8] = True
+    if version >= 7:
+        bits = util.BCH_type_number(version)
+        for i in range(18):
+            oscuro = (bits >> i) & 1 == 1
+            final[i // 3, i % 3 + lado - 11] = oscuro
+            final[i % 3 + lado - 11, i // 3] = oscuro
+
+    # Recorrido en zigzag de map_data sobre las casillas libres
+    filas = []
+    columnas = []
+    fila = lado - 1
+    paso = -1
+    for columna in range(lado - 1, 0, -2):
+        if columna <= 6:
+            columna -= 1
+        while True:
+            for c in (columna, columna - 1):
+                if libres[fila, c]:
+                    filas.append(fila)
+                    columnas.append(c)
+            fila += paso
+            if fila < 0 or fila >= lado:
+                fila -= paso
+                paso = -paso
+                break
+
+    verticales, horizontales = _posiciones_formato(lado)
+    formato = tuple(np.array(posiciones).T for posiciones in (verticales, horizontales))
+    for array in (prueba, final):
+        array.setflags(write=False)
+    return (prueba, final, np.array(filas, dtype=np.intp),
+            np.array(columnas, dtype=np.intp), formato)
+
+
+@lru_cache(maxsize=None)
+def patrones_mascara(lado):
+    """Array (8, lado, lado) de bool con los 8 patrones de máscara de util.mask_func"""
+    i, j = np.indices((lado, lado))
+    patrones = np.stack([
+        (i + j) % 2 == 0,
+        i % 2 == 0,
+        j % 3 == 0,
+        (i + j) % 3 == 0,
+        (i // 2 + j // 3) % 2 == 0,
+        (i * j) % 2 + (i * j) % 3 == 0,
+        ((i * j) % 2 + (i * j) % 3) % 2 == 0,
+        ((i * j) % 3 + (i + j) % 2) % 2 == 0,
+    ])
+    patrones.setflags(write=False)
+    return patrones
+
+
+# Patrones 1:1:3:1:1 con 4 módulos claros a un lado (regla 3)
+_PATRON_1 = np.array([1, 0, 1, 1, 1, 0, 1, 0, 0, 0, 0], dtype=bool)
+_PATRON_2 = _PATRON_1[::-1]
+
+
+def _penalizacion_filas(matrices):
+    """Reglas 1 y 3 de lost_point sobre las filas de (máscaras, lado, lado)"""
+    lado = matrices.shape[-1]
+
+    # Regla 1: cada racha de L >= 5 módulos iguales suma L - 2. Con
+    # ventanas de 5 iguales: suma (L - 4) + 2 por cada racha
+    iguales = matrices[..., 1:] == matrices[..., :-1]
+    ventanas = iguales[..., :-3] & iguales[..., 1:-2] & iguales[..., 2:-1] & iguales[..., 3:]
+    inicio = np.ones_like(ventanas)
+    inicio[..., 1:] = ~iguales[..., :-4]
+    regla1 = ventanas.sum(axis=(1, 2)) + 2 * (ventanas & inicio).sum(axis=(1, 2))
+
+    # Regla 3: ventanas de 11 módulos con uno de los dos patrones
+    ancho = lado - 10
+    patron1 = np.ones(matrices.shape[:-1] + (ancho,), dtype=bool)
+    patron2 = patron1.copy()
+    for k in range(11):
+        ventana = matrices[..., k:k + ancho]
+        patron1 &= ventana == _PATRON_1[k]
+        patron2 &= ventana == _PATRON_2[k]
+    regla3 = 40 * (patron1.sum(axis=(1, 2)) + patron2.sum(axis=(1, 2)))
+    return regla1 + regla3
+
+
+def penalizaciones(matrices):
+    """
+    Puntúa varias matrices a la vez con las reglas de qrcode.util.lost_point
+
+    Args:
+        matrices (numpy.ndarray): Array (máscaras, lado, lado) de bool
+
+    Returns:
+        list: Penalización de cada matriz (los mismos valores que lost_point)
+    """
+    lado = matrices.shape[-1]
+    total = _penalizacion_filas(matrices) + _penalizacion_filas(matrices.transpose(0, 2, 1))
+
+    # Regla 2: bloques 2x2 del mismo color
+    esquina = matrices[:, :-1, :-1]
+    bloques = ((esquina == matrices[:, :-1, 1:]) & (esquina == matrices[:, 1:, :-1])
+               & (esquina == matrices[:, 1:, 1:]))
+    total = total + 3 * bloques.sum(axis=(1, 2))
+
+    # Regla 4: proporción de módulos oscuros (mismas operaciones que qrcode)
+    resultado = []
+    for puntos, oscuros in zip(total.tolist(), matrices.sum(axis=(1, 2)).tolist()):
+        porcentaje = float(oscuros) / (lado ** 2)
+        resultado.append(puntos + int(abs(porcentaje * 100 - 50) / 5) * 10)
+    return resultado
+
+
+def fragmentos_de(datos):
+    """Divide los datos en fragmentos QRData igual que QRCode.add_data"""
+    if isinstance(datos, util.QRData):
+        return [datos]
+    return list(util.optimal_data_chunks(datos, minimum=20))
+
+
+def codificar_rapido(datos, correccion=qrcode.constants.ERROR_CORRECT_H,
+                     version=None, mascara=None):
+    """
+    Codifica los datos y devuelve la matriz de módulos
+
+    Produce la misma matriz que QRCode(version, correccion,
+    mask_pattern=mascara) con add_data y make(fit=version is None).
+
+    Args:
+        datos (str): Texto o URL para codificar
+        correccion (int): Nivel de corrección de errores (qrcode.constants)
+        version (int): Versión fija, o None para la menor en la que quepan
+        mascara (int): Máscara fija (0-7) para no puntuar las 8, o None
+
+    Returns:
+        tuple: (modulos, version, mascara) con modulos un array (lado, lado) de bool
+    """
+    fragmentos = fragmentos_de(datos)
+    if version is None:
+        version = version_minima(fragmentos, correccion)
+    else:
+        util.check_version(version)
+    codewords = crear_codewords(fragmentos, version, correccion)
+    prueba, final, filas, columnas, formato = plantilla_version(version)
+    patrones = patrones_mascara(version * 4 + 17)
+
+    # Los bits que no llegan a cubrir todas las casillas se quedan claros
+    bits = np.zeros(len(filas), dtype=bool)
+    desempaquetados = np.unpackbits(codewords).view(bool)[:len(filas)]
+    bits[:len(desempaquetados)] = desempaquetados
+
+    if mascara is None:
+        candidatas = np.repeat(prueba[None], 8, axis=0)
+        candidatas[:, filas, columnas] = bits ^ patrones[:, filas, columnas]
+        puntos = penalizaciones(candidatas)
+        mascara = puntos.index(min(puntos))
+
+    modulos = final.copy()
+    modulos[filas, columnas] = bits ^ patrones[mascara, filas, columnas]
+    bits_formato = util.BCH_type_info((correccion << 3) | mascara)
+    valores = [(bits_formato >> i) & 1 == 1 for i in range(15)]
+    for posiciones in formato:
+        modulos[posiciones[0], posiciones[1]] = valores
+    return modulos, version, mascara
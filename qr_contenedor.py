@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Contenedor Binario de Matrices QR
+Guarda muchas matrices ya codificadas en un único archivo .qrm, a 1 bit por
+módulo, para grabadoras láser e impresoras que trabajan con la rejilla de
+módulos en lugar de con imágenes. Un índice de tamaño fijo al final da
+acceso directo a cualquier matriz a través de mmap, sin copiarla
+
+Formato (little-endian):
+
+    cabecera   32 bytes: b"QRMX", versión del formato (u16), tamaño de cada
+               entrada del índice (u16), número de entradas (u64) y posición
+               del índice (u64), más 8 bytes a cero
+    módulos    Los bits de cada matriz uno tras otro, empaquetados fila a
+               fila sin relleno entre filas (como MatrizQR.bits), 1 = oscuro
+    índice     Una entrada de 48 bytes por matriz: posición (u64) y longitud
+               (u32) de sus bits, versión, corrección (1 = L, 0 = M, 3 = Q,
+               2 = H, como qrcode.constants), máscara (255 si se desconoce)
+               y módulos por lado (u8 cada uno), y el SHA-256 de los datos
+               codificados (32 bytes; a cero si no se conocen)
+
+Mientras se escribe, la cabecera está a cero: un archivo que no se llegó a
+cerrar se reconoce como incompleto en lugar de leerse a medias
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from qr_matriz import MatrizQR
+
+
+MAGIA = b"QRMX"
+VERSION_FORMATO = 1
+
+_CABECERA = struct.Struct('<4sHHQQ8x')
+_ENTRADA = struct.Struct('<QIBBBB32s')
+# Lo que envía cada trabajador: la entrada sin posición ni longitud
+_REGISTRO = struct.Struct('<BBBB32s')
+
+# La misma entrada como dtype, para leer el índice sin copiarlo
+DTYPE_ENTRADA = np.dtype([('desplazamiento', '<u8'), ('longitud', '<u4'),
+                          ('version', 'u1'), ('correccion', 'u1'), ('mascara', 'u1'),
+                          ('lado', 'u1'), ('huella', 'V32')])
+
+# Máscara desconocida
+_SIN_MASCARA = 255
+
+
+def huella_datos(datos):
+    """SHA-256 de los datos tal como se codifican (texto en UTF-8)"""
+    if isinstance(datos, str):
+        datos = datos.encode('utf-8')
+    return hashlib.sha256(datos).digest()
+
+
+def registro_matriz(matriz, datos=None):
+    """
+    Serializa una matriz como registro listo para EscritorMatrices.añadir_registro
+
+    Es lo que devuelven los trabajadores de un lote: el proceso que escribe
+    solo tiene que copiar los bytes, sin volver a empaquetar nada.
+
+    Args:
+        matriz (MatrizQR): Matriz codificada
+        datos (str | bytes): Datos codificados, para la huella; None la deja a cero
+
+    Returns:
+        bytes
+    """
+    huella = huella_datos(datos) if isinstance(datos, (str, bytes)) else bytes(32)
+    mascara = _SIN_MASCARA if matriz.mascara is None else matriz.mascara
+    return _REGISTRO.pack(matriz.version, matriz.correccion, mascara, matriz.lado,
+                          huella) + matriz.bits
+
+
+class EscritorMatrices:
+    """
+    Escribe un contenedor .qrm añadiendo matrices al final
+
+    Los bits van directos al archivo y del índice solo se guardan en memoria
+    48 bytes por matriz, que se escriben al cerrar.
+    """
+
+    def __init__(self, ruta):
+        """
+        Args:
+            ruta (str): Archivo .qrm que se crea (o se sobrescribe)
+        """
+        self.ruta = ruta
+        self.escritos = 0
+        self._archivo = open(ruta, 'wb')
+        self._archivo.write(bytes(_CABECERA.size))
+        self._posicion = _CABECERA.size
+        self._indice = bytearray()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def añadir(self, matriz, datos=None):
+        """
+        Añade una matriz
+
+        Args:
+            matriz (MatrizQR): Matriz codificada
+            datos (str | bytes): Datos codificados, para la huella del índice
+
+        Returns:
+            int: Posición de la matriz en el contenedor
+        """
+        return self.añadir_registro(registro_matriz(matriz, datos))
+
+    def añadir_registro(self, registro):
+        """Añade un registro de registro_matriz; devuelve su posición en el contenedor"""
+        bits = memoryview(registro)[_REGISTRO.size:]
+        self._archivo.write(bits)
+        self._indice += _ENTRADA.pack(self._posicion, len(bits),
+                                      *_REGISTRO.unpack_from(registro))
+        self._posicion += len(bits)
+        self.escritos += 1
+        return self.escritos - 1
+
+    def cerrar(self):
+        """Escribe el índice y la cabecera"""
+        if self._archivo is None:
+            return
+        # El índice empieza alineado a 8 bytes
+        relleno = -self._posicion % 8
+        self._archivo.write(bytes(relleno))
+        self._archivo.write(self._indice)
+        self._archivo.seek(0)
+        self._archivo.write(_CABECERA.pack(MAGIA, VERSION_FORMATO, _ENTRADA.size,
+                                           self.escritos, self._posicion + relleno))
+        self._archivo.close()
+        self._archivo = None
+        self._indice = bytearray()
+
+
+class LectorMatrices:
+    """
+    Lee un contenedor .qrm proyectado en memoria con mmap
+
+    El índice es un array estructurado de NumPy (DTYPE_ENTRADA) sobre el
+    propio archivo, así que abrir un contenedor de millones de matrices no
+    lee nada más que la cabecera, y bits() / empaquetados() devuelven vistas
+    de los módulos sin copiarlos. Las vistas siguen siendo válidas después
+    de cerrar() mientras existan.
+    """
+
+    def __init__(self, ruta):
+        """
+        Args:
+            ruta (str): Archivo .qrm
+        """
+        self.ruta = ruta
+        with open(ruta, 'rb') as archivo:
+            if os.fstat(archivo.fileno()).st_size < _CABECERA.size:
+                raise ValueError(f"{ruta} no es un contenedor de matrices")
+            self._mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        magia, formato, tamaño_entrada, entradas, posicion = \
+            _CABECERA.unpack_from(self._mapa)
+        if magia != MAGIA:
+            self._mapa.close()
+            raise ValueError(f"{ruta} no es un contenedor de matrices o está incompleto")
+        if formato != VERSION_FORMATO or tamaño_entrada != _ENTRADA.size:
+            self._mapa.close()
+            raise ValueError(f"Versión del formato no admitida en {ruta}: {formato}")
+        self.indice = np.frombuffer(self._mapa, dtype=DTYPE_ENTRADA, count=entradas,
+                                    offset=posicion)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def __len__(self):
+        return len(self.indice)
+
+    def __getitem__(self, posicion):
+        """Devuelve la matriz de esa posición como MatrizQR"""
+        entrada = self.indice[posicion]
+        mascara = int(entrada['mascara'])
+        return MatrizQR(self.bits(posicion), int(entrada['lado']), int(entrada['version']),
+                        int(entrada['correccion']),
+                        None if mascara == _SIN_MASCARA else mascara)
+
+    def __iter__(self):
+        for posicion in range(len(self)):
+            yield self[posicion]
+
+    def bits(self, posicion):
+        """memoryview de los módulos empaquetados de una matriz, sin copiarlos"""
+        entrada = self.indice[posicion]
+        inicio = int(entrada['desplazamiento'])
+        return memoryview(self._mapa)[inicio:inicio + int(entrada['longitud'])]
+
+    def empaquetados(self, posicion):
+        """Array uint8 de solo lectura con los módulos empaquetados, sin copiarlos"""
+        entrada = self.indice[posicion]
+        return np.frombuffer(self._mapa, dtype=np.uint8, count=int(entrada['longitud']),
+                             offset=int(entrada['desplazamiento']))
+
+    def modulos(self, posicion):
+        """Módulos de una matriz como array (lado, lado) de bool, True en los oscuros"""
+        lado = int(self.indice[posicion]['lado'])
+        return np.unpackbits(self.empaquetados(posicion), count=lado * lado) \
+            .view(bool).reshape(lado, lado)
+
+    def buscar(self, datos):
+        """
+        Posiciones de las matrices que codifican esos datos
+
+        Returns:
+            numpy.ndarray: Posiciones en el contenedor (vacío si no hay ninguna)
+        """
+        return np.flatnonzero(self.indice['huella'] == np.void(huella_datos(datos)))
+
+    def cerrar(self):
+        """Suelta el índice y el mmap (que se libera cuando no quedan vistas)"""
+        if self._mapa is None:
+            return
+        self.indice = None
+        try:
+            self._mapa.close()
+        except BufferError:
+            # Quedan vistas de bits() o empaquetados(): el mmap se cierra
+            # cuando se liberen
+            pass
+        self._mapa = None
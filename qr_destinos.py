@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Destinos de Salida para Lotes de Códigos QR
+Guarda las imágenes ya codificadas de un lote en un ZIP, en un TAR o en una
+carpeta repartida en subcarpetas por prefijo de hash, en lugar de escribir
+millones de archivos pequeños en una sola carpeta; o solo las matrices de
+módulos en un contenedor .qrm (ver qr_contenedor)
+"""
+
+import hashlib
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from collections import deque
+from io import BytesIO
+from queue import Queue
+
+
+# Marca de fin de la cola de escritura
+_FIN = object()
+
+
+class DestinoArchivos:
+    """
+    Base de los destinos: escribe en un hilo propio con una cola acotada
+
+    El lote entrega cada imagen con escribir() y sigue generando mientras
+    el hilo la guarda, así que un disco lento solo frena a los trabajadores
+    cuando hay max_pendientes imágenes esperando. Un error de escritura se
+    vuelve a lanzar en la siguiente llamada a escribir(), sincronizar() o
+    cerrar().
+
+    Las subclases implementan _guardar(nombre, contenido), _cerrar() y
+    ubicacion(nombre).
+    """
+
+    # Si un lote interrumpido puede continuar sobre el mismo destino
+    reanudable = False
+    # Si recibe registros de matrices (qr_contenedor.registro_matriz) en
+    # lugar de imágenes
+    matrices = False
+
+    def __init__(self, max_pendientes=1024):
+        """
+        Args:
+            max_pendientes (int): Imágenes en cola como máximo (la memoria
+                                  usada es este número por el tamaño medio)
+        """
+        self.escritos = 0
+        self.bytes = 0
+        self._cola = Queue(maxsize=max_pendientes)
+        self._confirmados = deque()
+        self._error = None
+        self._hilo = threading.Thread(target=self._escribir_cola, daemon=True)
+        self._hilo.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def _escribir_cola(self):
+        while True:
+            elemento = self._cola.get()
+            try:
+                if elemento is _FIN:
+                    return
+                nombre, contenido, etiqueta = elemento
+                # Tras un error se sigue vaciando la cola para no bloquear el lote
+                if self._error is None:
+                    self._guardar(nombre, contenido)
+                    self.escritos += 1
+                    self.bytes += len(contenido)
+                    if etiqueta is not None:
+                        self._confirmados.append(etiqueta)
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._cola.task_done()
+
+    def _comprobar(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def escribir(self, nombre, contenido, etiqueta=None):
+        """
+        Encola una imagen para escribirla
+
+        Args:
+            nombre (str): Nombre del archivo (el nombre_archivo del trabajo)
+            contenido (bytes): Imagen codificada
+            etiqueta: Valor que confirmados() devuelve una vez escrita la imagen
+        """
+        if not contenido:
+            raise ValueError(f"Contenido vacío para {nombre!r}: no se escribe en el destino")
+        self._comprobar()
+        self._cola.put((nombre, contenido, etiqueta))
+
+    def confirmados(self):
+        """Produce las etiquetas de las imágenes que ya están escritas"""
+        while self._confirmados:
+            yield self._confirmados.popleft()
+
+    def sincronizar(self):
+        """Espera a que se escriban todas las imágenes encoladas"""
+        self._cola.join()
+        self._comprobar()
+
+    def cerrar(self):
+        """Escribe lo pendiente y cierra el destino"""
+        if self._hilo is not None:
+            self._cola.put(_FIN)
+            self._hilo.join()
+            self._hilo = None
+            self._cerrar()
+        self._comprobar()
+
+    def ubicacion(self, nombre):
+        """Describe dónde queda guardado un archivo (para el manifiesto)"""
+        raise NotImplementedError
+
+    def _guardar(self, nombre, contenido):
+        raise NotImplementedError
+
+    def _cerrar(self):
+        pass
+
+
+class DestinoZip(DestinoArchivos):
+    """
+    Archivo ZIP sin compresión (ZIP_STORED): el PNG ya está comprimido
+
+    El ZIP guarda en memoria su directorio central hasta cerrarse (unos
+    cientos de bytes por archivo); para decenas de millones de códigos es
+    mejor un TAR o una carpeta repartida.
+    """
+
+    def __init__(self, ruta, max_pendientes=1024):
+        self.ruta = ruta
+        self._zip = zipfile.ZipFile(ruta, 'w', zipfile.ZIP_STORED, allowZip64=True)
+        self._fecha = time.localtime()[:6]
+        super().__init__(max_pendientes)
+
+    def _guardar(self, nombre, contenido):
+        info = zipfile.ZipInfo(nombre, date_time=self._fecha)
+        info.compress_type = zipfile.ZIP_STORED
+        info.external_attr = 0o644 << 16
+        self._zip.writestr(info, contenido)
+
+    def _cerrar(self):
+        self._zip.close()
+
+    def ubicacion(self, nombre):
+        return f"{os.path.abspath(self.ruta)}:{nombre}"
+
+
+class DestinoTar(DestinoArchivos):
+    """
+    Archivo TAR escrito en flujo (.tar, o .tar.gz / .tgz comprimido)
+
+    No guarda en memoria la lista de archivos, así que sirve para lotes de
+    cualquier tamaño.
+    """
+
+    def __init__(self, ruta, max_pendientes=1024):
+        self.ruta = ruta
+        comprimido = ruta.endswith(('.tar.gz', '.tgz'))
+        self._tar = tarfile.open(ruta, 'w|gz' if comprimido else 'w|')
+        self._fecha = time.time()
+        super().__init__(max_pendientes)
+
+    def _guardar(self, nombre, contenido):
+        info = tarfile.TarInfo(nombre)
+        info.size = len(contenido)
+        info.mtime = self._fecha
+        info.mode = 0o644
+        self._tar.addfile(info, BytesIO(contenido))
+        # TarFile recuerda cada miembro escrito; en un lote de millones
+        # esa lista no hace falta y solo ocuparía memoria
+        self._tar.members.clear()
+
+    def _cerrar(self):
+        self._tar.close()
+
+    def ubicacion(self, nombre):
+        return f"{os.path.abspath(self.ruta)}:{nombre}"
+
+
+class DestinoFragmentado(DestinoArchivos):
+    """
+    Carpeta repartida en subcarpetas por prefijo del hash del nombre
+
+        fragmentado/3f/ticket_1.png
+        fragmentado/a0/ticket_2.png
+
+    Con un nivel hay 256 subcarpetas y con dos, 65536, de modo que ninguna
+    carpeta acumula millones de entradas. Cada archivo se escribe en un
+    temporal y se renombra, así que un lote interrumpido puede reanudarse
+    con un manifiesto (ver qr_manifiesto).
+    """
+
+    reanudable = True
+
+    def __init__(self, carpeta, niveles=1, max_pendientes=1024):
+        """
+        Args:
+            carpeta (str): Carpeta raíz
+            niveles (int): Niveles de subcarpetas (dos caracteres de hash cada uno)
+            max_pendientes (int): Imágenes en cola como máximo
+        """
+        self.carpeta = os.path.abspath(carpeta)
+        self.niveles = niveles
+        self._creadas = set()
+        os.makedirs(self.carpeta, exist_ok=True)
+        super().__init__(max_pendientes)
+
+    def ubicacion(self, nombre):
+        resumen = hashlib.sha256(nombre.encode('utf-8')).hexdigest()
+        prefijos = [resumen[2 * i:2 * i + 2] for i in range(self.niveles)]
+        return os.path.join(self.carpeta, *prefijos, nombre)
+
+    def _guardar(self, nombre, contenido):
+        ruta = self.ubicacion(nombre)
+        carpeta = os.path.dirname(ruta)
+        if carpeta not in self._creadas:
+            os.makedirs(carpeta, exist_ok=True)
+            self._creadas.add(carpeta)
+        temporal = f"{ruta}.{os.getpid()}.parcial"
+        with open(temporal, 'wb') as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+
+
+class DestinoMatrices(DestinoArchivos):
+    """
+    Contenedor .qrm con la matriz de módulos de cada código, sin imágenes
+
+    Los trabajadores solo codifican y envían cada matriz ya empaquetada a
+    1 bit por módulo, así que el lote va tan rápido como la codificación.
+    Las matrices quedan en el orden de los trabajos.
+    """
+
+    matrices = True
+
+    def __init__(self, ruta, max_pendientes=1024):
+        from qr_contenedor import EscritorMatrices
+        self.ruta = ruta
+        self._escritor = EscritorMatrices(ruta)
+        super().__init__(max_pendientes)
+
+    def _guardar(self, nombre, contenido):
+        self._escritor.añadir_registro(contenido)
+
+    def _cerrar(self):
+        self._escritor.cerrar()
+
+    def ubicacion(self, nombre):
+        return f"{os.path.abspath(self.ruta)}:{nombre}"
+
+
+def clase_destino(ruta):
+    """
+    Clase del destino que corresponde a la ruta, sin abrir nada
+
+    Sirve para consultar reanudable y matrices antes de crear (y vaciar) el
+    archivo de salida.
+    """
+    if ruta.endswith('.zip'):
+        return DestinoZip
+    if ruta.endswith(('.tar', '.tar.gz', '.tgz')):
+        return DestinoTar
+    if ruta.endswith('.qrm'):
+        return DestinoMatrices
+    return DestinoFragmentado
+
+
+def abrir_destino(ruta, niveles=1, max_pendientes=1024):
+    """
+    Abre el destino que corresponde a la ruta
+
+    Args:
+        ruta (str): Un .zip, un .tar / .tar.gz / .tgz, un contenedor de
+                    matrices .qrm, o una carpeta, que se reparte en
+                    subcarpetas por prefijo de hash
+        niveles (int): Niveles de subcarpetas de la carpeta repartida
+        max_pendientes (int): Imágenes en cola como máximo
+
+    Returns:
+        DestinoArchivos
+    """
+    clase = clase_destino(ruta)
+    if clase is DestinoFragmentado:
+        return DestinoFragmentado(ruta, niveles, max_pendientes)
+    return clase(ruta, max_pendientes)
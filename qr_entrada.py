@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Entrada No Interactiva de Códigos QR
+Lee los datos y las opciones de cada código desde CSV o JSONL y los hace
+pasar por un pipeline en flujo (leer → codificar → renderizar → escribir)
+con colas acotadas, para que la memoria no crezca con el tamaño del archivo
+"""
+
+import csv
+import io
+import os
+import sys
+import threading
+import time
+from queue import Queue
+
+import qrcode
+
+from qr_cache import cache_activa
+from qr_lote import (ResultadoTrabajo, ResumenLote, TrabajoInvalido, iterar_lote,
+                     leer_trabajos_jsonl)
+from qr_metricas import etapa, registrar_salida
+from qr_presets import PRESETS
+from qr_renderer import ESTILOS_MODULO, GRADIENTES, obtener_renderer
+from qr_salida import codificar_imagen, guardar_imagen
+
+
+# Nombres de columna aceptados -> argumento del generador
+ALIAS_COLUMNAS = {
+    'texto': 'datos',
+    'url': 'datos',
+    'archivo': 'nombre_archivo',
+    'nombre': 'nombre_archivo',
+    'estilo': 'estilo_modulo',
+    'gradiente': 'tipo_gradiente',
+    'logo': 'ruta_logo',
+}
+
+# Argumentos que admite cada tipo de trabajo (además de 'datos' y 'nombre_archivo')
+OPCIONES_POR_TIPO = {
+    'simple': ('compacto', 'escala_nativa'),
+    'personalizado': ('color_fondo', 'color_frente', 'tamaño_caja', 'borde',
+                      'compacto', 'escala_nativa', 'correccion_auto'),
+    'logo': ('ruta_logo', 'compacto', 'correccion_auto', 'proporcion_logo'),
+    'estilo': ('estilo_modulo', 'color_frente', 'color_fondo', 'compacto'),
+    'gradiente': ('tipo_gradiente', 'color_centro', 'color_borde', 'color_fondo',
+                  'estilo_modulo', 'compacto'),
+    'logo_estilo': ('ruta_logo', 'estilo_modulo', 'color_frente', 'color_fondo',
+                    'compacto', 'correccion_auto', 'proporcion_logo'),
+    'preset': ('preset', 'compacto'),
+}
+
+# Valores de texto que activan una opción booleana en CSV
+VERDADEROS = ('1', 'true', 'si', 'sí', 's', 'yes', 'y')
+
+_FIN = object()
+# Valor que recorre el pipeline cuando el archivo ya se escribió desde la caché
+_DESDE_CACHE = object()
+
+
+def _inferir_tipo(fila):
+    """Elige el generador adecuado según las opciones presentes en la fila"""
+    if 'preset' in fila:
+        return 'preset'
+    if 'tipo_gradiente' in fila or 'color_centro' in fila:
+        return 'gradiente'
+    if 'ruta_logo' in fila:
+        return 'logo_estilo' if 'estilo_modulo' in fila else 'logo'
+    if 'estilo_modulo' in fila:
+        return 'estilo'
+    if any(clave in fila
+           for clave in ('color_fondo', 'color_frente', 'tamaño_caja', 'borde')):
+        return 'personalizado'
+    return 'simple'
+
+
+def normalizar_fila(fila, numero, directorio=None):
+    """
+    Convierte una fila leída de CSV/JSONL en un trabajo para los generadores
+
+    Args:
+        fila (dict): Columnas de la fila (admite los alias de ALIAS_COLUMNAS)
+        numero (int): Posición de la fila, usada para el nombre por defecto
+        directorio (str): Carpeta donde escribir el archivo de salida
+    """
+    trabajo = {}
+    for clave, valor in fila.items():
+        if clave is None or valor is None or valor == '':
+            continue
+        clave = clave.strip()
+        trabajo[ALIAS_COLUMNAS.get(clave, clave)] = valor
+
+    if 'datos' not in trabajo:
+        raise ValueError(f"La fila {numero} no tiene columna 'datos'")
+
+    tipo = trabajo.pop('tipo', None) or _inferir_tipo(trabajo)
+    if tipo not in OPCIONES_POR_TIPO:
+        raise ValueError(f"Tipo de trabajo desconocido en la fila {numero}: {tipo!r}")
+    for clave in ('tamaño_caja', 'borde'):
+        if clave in trabajo:
+            trabajo[clave] = int(trabajo[clave])
+    if 'proporcion_logo' in trabajo:
+        trabajo['proporcion_logo'] = float(trabajo['proporcion_logo'])
+    for clave in ('compacto', 'escala_nativa', 'correccion_auto'):
+        if isinstance(trabajo.get(clave), str):
+            trabajo[clave] = trabajo[clave].strip().lower() in VERDADEROS
+
+    nombre = trabajo.get('nombre_archivo') or f"qr_{numero:06d}.png"
+    if not nombre.endswith('.png'):
+        nombre += '.png'
+    if directorio:
+        nombre = os.path.join(directorio, nombre)
+
+    permitidas = OPCIONES_POR_TIPO[tipo]
+    resultado = {clave: valor for clave, valor in trabajo.items() if clave in permitidas}
+    resultado.update(tipo=tipo, datos=trabajo['datos'], nombre_archivo=nombre)
+    return resultado
+
+
+def detectar_formato(ruta):
+    """Deduce el formato a partir de la extensión del archivo"""
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    return 'csv'
+
+
+def leer_filas(archivo, formato='csv'):
+    """
+    Lee filas de un archivo abierto de forma perezosa
+
+    Args:
+        archivo: Archivo de texto abierto (o sys.stdin)
+        formato (str): 'csv' (con cabecera) o 'jsonl'
+    """
+    if formato == 'jsonl':
+        # Las líneas que no son un objeto JSON llegan como TrabajoInvalido
+        yield from leer_trabajos_jsonl(archivo)
+    elif formato == 'csv':
+        yield from csv.DictReader(archivo)
+    else:
+        raise ValueError(f"Formato de entrada desconocido: {formato!r}")
+
+
+def leer_trabajos(archivo, formato='csv', directorio=None):
+    """
+    Lee y normaliza los trabajos de un archivo abierto, uno a uno
+
+    Una fila que no se puede normalizar se produce como TrabajoInvalido, que
+    el pipeline y iterar_lote reportan como trabajo fallido.
+    """
+    for numero, fila in enumerate(leer_filas(archivo, formato), 1):
+        yield normalizar_o_invalidar(fila, numero, directorio)
+
+
+def normalizar_o_invalidar(fila, numero, directorio=None):
+    """Normaliza una fila, o la devuelve como TrabajoInvalido si tiene errores"""
+    if isinstance(fila, TrabajoInvalido):
+        return fila
+    try:
+        return normalizar_fila(fila, numero, directorio)
+    except (ValueError, TypeError) as e:
+        return TrabajoInvalido(fila, e)
+
+
+def perfil_para(trabajo):
+    """
+    Devuelve los argumentos de QRRenderer que usaría el generador del trabajo
+
+    Reproduce los valores por defecto y la corrección de errores de cada
+    función generar_qr_*.
+    """
+    tipo = trabajo['tipo']
+    # Solo se pasan si se piden, igual que en los generadores
+    opciones_salida = {clave: True for clave in ('compacto', 'escala_nativa')
+                       if trabajo.get(clave)}
+    if tipo == 'simple':
+        return dict(opciones_salida, correccion=qrcode.constants.ERROR_CORRECT_L)
+    if tipo == 'preset':
+        return dict(PRESETS.perfil(trabajo['preset']), **opciones_salida)
+
+    perfil = dict(opciones_salida, correccion='auto' if trabajo.get('correccion_auto')
+                  else qrcode.constants.ERROR_CORRECT_H)
+    if 'proporcion_logo' in trabajo:
+        perfil.update(proporcion_logo=trabajo['proporcion_logo'])
+    if tipo == 'personalizado':
+        perfil.update(color_frente=trabajo.get('color_frente', 'black'),
+                      color_fondo=trabajo.get('color_fondo', 'white'),
+                      tamaño_caja=trabajo.get('tamaño_caja', 10),
+                      borde=trabajo.get('borde', 4))
+    elif tipo == 'logo':
+        perfil.update(ruta_logo=trabajo['ruta_logo'])
+    else:
+        por_defecto = 'cuadrado' if tipo == 'estilo' else 'redondeado'
+        estilo = trabajo.get('estilo_modulo', por_defecto)
+        perfil.update(estilo_modulo=estilo if estilo in ESTILOS_MODULO else por_defecto,
+                      color_fondo=trabajo.get('color_fondo', 'white'))
+        if tipo == 'gradiente':
+            gradiente = trabajo.get('tipo_gradiente', 'radial')
+            perfil.update(tipo_gradiente=gradiente if gradiente in GRADIENTES else 'radial',
+                          color_centro=trabajo.get('color_centro', 'blue'),
+                          color_borde=trabajo.get('color_borde', 'purple'))
+        else:
+            perfil.update(color_frente=trabajo.get('color_frente', 'black'))
+        if tipo == 'logo_estilo':
+            perfil.update(ruta_logo=trabajo['ruta_logo'])
+    return perfil
+
+
+def renderer_para(trabajo):
+    """Devuelve el QRRenderer compartido que usaría el generador del trabajo"""
+    return obtener_renderer(**perfil_para(trabajo))
+
+
+def codificar(trabajo):
+    """Etapa de codificación: devuelve la MatrizQR de los datos"""
+    return renderer_para(trabajo).matriz(trabajo['datos'])
+
+
+def renderizar(trabajo, qr):
+    """Etapa de renderizado: devuelve la imagen del QR"""
+    return renderer_para(trabajo).renderizar(qr)
+
+
+def escribir(trabajo, img, compresion=None):
+    """Etapa de escritura: guarda la imagen en disco"""
+    with etapa('guardar'):
+        guardar_imagen(img, trabajo['nombre_archivo'], "PNG", compresion,
+                       ppp=renderer_para(trabajo).ppp)
+    registrar_salida(trabajo['nombre_archivo'])
+
+
+def _etapas_con_cache(cache, compresion=None):
+    """
+    Etapas del pipeline que consultan la caché de resultados antes de codificar
+
+    Un acierto escribe el archivo en la primera etapa y las siguientes dejan
+    pasar el elemento sin tocarlo. Un duplicado de un código que todavía
+    está en el pipeline se copia en la última etapa, cuando el primero ya
+    se ha guardado (las etapas respetan el orden de llegada).
+    """
+    en_vuelo = set()
+
+    def codificar_o_copiar(trabajo, _):
+        renderer = renderer_para(trabajo)
+        clave = cache.clave(trabajo['datos'], renderer.perfil, renderer.ruta_logo)
+        if clave in en_vuelo:
+            return clave, None
+        with etapa('cache'):
+            acierto = cache.escribir(clave, trabajo['nombre_archivo'])
+        if acierto:
+            registrar_salida(trabajo['nombre_archivo'], desde_cache=True)
+            return _DESDE_CACHE
+        en_vuelo.add(clave)
+        return clave, renderer.matriz(trabajo['datos'])
+
+    def renderizar_png(trabajo, valor):
+        if valor is _DESDE_CACHE or valor[1] is None:
+            return valor
+        clave, qr = valor
+        img = renderizar(trabajo, qr)
+        with etapa('guardar'):
+            return clave, codificar_imagen(img, "PNG", compresion,
+                                           ppp=renderer_para(trabajo).ppp)
+
+    def escribir_y_guardar(trabajo, valor):
+        if valor is _DESDE_CACHE:
+            return valor
+        clave, png = valor
+        if png is None:
+            with etapa('cache'):
+                acierto = cache.escribir(clave, trabajo['nombre_archivo'])
+            if acierto:
+                registrar_salida(trabajo['nombre_archivo'], desde_cache=True)
+                return _DESDE_CACHE
+            # El original falló o ya se expulsó: generarlo aquí
+            png = renderizar_png(trabajo, (clave, codificar(trabajo)))[1]
+        with etapa('guardar'):
+            with open(trabajo['nombre_archivo'], 'wb') as archivo:
+                archivo.write(png)
+            cache.guardar(clave, png)
+        registrar_salida(trabajo['nombre_archivo'], png)
+        en_vuelo.discard(clave)
+
+    return [codificar_o_copiar, renderizar_png, escribir_y_guardar]
+
+
+def _etapa(funcion, entrada, salida):
+    """
+    Hilo de una etapa del pipeline
+
+    Cada elemento es (indice, trabajo, valor, error). Los elementos con error
+    pasan sin procesar para que la etapa final los reporte en orden.
+    """
+    while True:
+        elemento = entrada.get()
+        if elemento is _FIN:
+            salida.put(_FIN)
+            return
+        indice, trabajo, valor, error = elemento
+        if error is None:
+            try:
+                valor = funcion(trabajo, valor)
+            except Exception as e:
+                valor, error = None, f"{type(e).__name__}: {e}"
+        salida.put((indice, trabajo, valor, error))
+
+
+def ejecutar_pipeline(trabajos, tamaño_cola=64, cache=None, compresion=None):
+    """
+    Procesa trabajos en un pipeline de hilos con colas acotadas
+
+    Cada etapa (codificar, renderizar, escribir) corre en su propio hilo y
+    como mucho hay tamaño_cola elementos esperando entre dos etapas, así que
+    la memoria usada no depende del número total de filas.
+
+    Args:
+        trabajos (iterable): Trabajos normalizados (ver normalizar_fila)
+        tamaño_cola (int): Capacidad de cada cola entre etapas
+        cache (CacheResultados): Caché de resultados para los datos repetidos
+        compresion (int): Nivel de compresión PNG (0-9), o None para el de Pillow
+
+    Yields:
+        ResultadoTrabajo: Un resultado por trabajo, en el orden de entrada
+    """
+    colas = [Queue(maxsize=tamaño_cola) for _ in range(4)]
+    if cache is not None:
+        etapas = _etapas_con_cache(cache, compresion)
+    else:
+        etapas = [
+            lambda trabajo, _: codificar(trabajo),
+            renderizar,
+            lambda trabajo, img: escribir(trabajo, img, compresion),
+        ]
+    hilos = [threading.Thread(target=_etapa, args=(funcion, colas[i], colas[i + 1]),
+                              daemon=True)
+             for i, funcion in enumerate(etapas)]
+    errores_lectura = []
+
+    def alimentar():
+        try:
+            for indice, trabajo in enumerate(trabajos):
+                error = trabajo.error if isinstance(trabajo, TrabajoInvalido) else None
+                colas[0].put((indice, trabajo, None, error))
+        except Exception as e:
+            errores_lectura.append(e)
+        finally:
+            colas[0].put(_FIN)
+
+    hilos.append(threading.Thread(target=alimentar, daemon=True))
+    for hilo in hilos:
+        hilo.start()
+
+    while True:
+        elemento = colas[-1].get()
+        if elemento is _FIN:
+            break
+        indice, trabajo, _, error = elemento
+        yield ResultadoTrabajo(indice, error is None, error, 1, 0.0,
+                               None if error is None else trabajo)
+
+    for hilo in hilos:
+        hilo.join()
+    if errores_lectura:
+        raise errores_lectura[0]
+
+
+def _con_opcion(trabajos, clave, valor):
+    """Fija una opción en los trabajos válidos; los TrabajoInvalido pasan tal cual"""
+    for trabajo in trabajos:
+        yield trabajo if isinstance(trabajo, TrabajoInvalido) else dict(trabajo, **{clave: valor})
+
+
+def procesar_entrada(origen='-', formato=None, directorio='qr_codes', workers=1,
+                     tamaño_cola=64, cache=None, compresion=None, compacto=False,
+                     presets=None):
+    """
+    Genera los códigos QR descritos en un archivo CSV o JSONL
+
+    Args:
+        origen (str): Ruta del archivo o '-' para leer de stdin
+        formato (str): 'csv' o 'jsonl' (por defecto se deduce de la extensión;
+                       stdin se interpreta como CSV)
+        directorio (str): Carpeta de salida de los códigos QR
+        workers (int): Con más de 1, reparte el trabajo entre procesos
+        tamaño_cola (int): Capacidad de las colas del pipeline en un proceso
+        cache (CacheResultados): Caché de resultados (por defecto, la activada
+                                 con qr_cache.activar_cache, si la hay)
+        compresion (int): Nivel de compresión PNG (0-9), o None para el de Pillow
+        compacto (bool): Guardar todas las filas en el modo sin pérdida más
+                         pequeño (ver QRRenderer), lo pida o no la fila
+        presets (dict): Presets a precalentar antes de empezar, y a registrar
+                        en cada proceso (RegistroPresets.descripcion)
+
+    Returns:
+        ResumenLote: Totales y filas fallidas
+    """
+    if formato is None:
+        formato = 'csv' if origen == '-' else detectar_formato(origen)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+
+    if origen == '-':
+        archivo = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+    else:
+        archivo = open(origen, encoding='utf-8', newline='')
+
+    if cache is None:
+        cache = cache_activa()
+
+    resumen = ResumenLote()
+    inicio = time.perf_counter()
+    try:
+        trabajos = leer_trabajos(archivo, formato, directorio)
+        if compacto:
+            trabajos = _con_opcion(trabajos, 'compacto', True)
+        if workers and workers > 1:
+            if compresion is not None:
+                trabajos = _con_opcion(trabajos, 'compresion', compresion)
+            resultados = iterar_lote(trabajos, workers, cache=cache, presets=presets)
+        else:
+            if presets:
+                PRESETS.precalentar(presets)
+            resultados = ejecutar_pipeline(trabajos, tamaño_cola, cache, compresion)
+        for resultado in resultados:
+            resumen.registrar(resultado)
+    finally:
+        if origen != '-':
+            archivo.close()
+    resumen.segundos = time.perf_counter() - inicio
+    return resumen
@@ -4,107 +4,160 @@ Generador de Códigos QR
 Este script permite generar códigos QR a partir de texto o URLs
 """
 
-import qrcode
-from PIL import Image
+import argparse
+import logging
 import os
+import sys
 
+from qr_salida import nombre_destino
 
-def generar_qr_simple(datos, nombre_archivo="qr_code.png"):
+
+registro = logging.getLogger(__name__)
+
+
+def generar_qr_simple(datos, nombre_archivo="qr_code.png", cache=None,
+                      compresion=None, optimizar=False,
+                      compacto=False, escala_nativa=False):
     """
     Genera un código QR básico
     
     Args:
-        datos (str): Texto o URL para codificar en el QR
-        nombre_archivo (str): Nombre del archivo de salida
-    """
-    qr = qrcode.QRCode(
-        version=1,  # Tamaño del QR (1-40)
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
+        datos (str): Texto o URL para codificar en el QR, o un MatrizQR
+        nombre_archivo: Archivo de salida (.svg y .pdf se generan como
+                        vectores), objeto con write(), el tipo bytes o un
+                        bytearray / memoryview reutilizable (ver qr_salida)
+        cache (CacheResultados): Caché de resultados (por defecto, la activada
+                                 con qr_cache.activar_cache, si la hay)
+        compresion (int): Nivel de compresión PNG (0-9), o None para el de Pillow
+        optimizar (bool): Buscar el PNG más pequeño (más lento)
+        compacto (bool): Guardar en el modo sin pérdida más pequeño (1 bit,
+                         paleta o RGB; ver QRRenderer)
+        escala_nativa (bool): Un píxel por módulo con la resolución anotada
+                              en el PNG en lugar de escalar por tamaño de caja
     
-    qr.add_data(datos)
-    qr.make(fit=True)
+    Returns:
+        bytes si nombre_archivo es bytes, el número de bytes escritos si es
+        un bytearray o memoryview, y None en otro caso
+    """
+    # Importaciones diferidas: --help y el menú arrancan sin cargar qrcode,
+    # Pillow ni NumPy, que solo hacen falta al generar
+    import qrcode
+    from qr_renderer import obtener_renderer
+
+    renderer = obtener_renderer(correccion=qrcode.constants.ERROR_CORRECT_L,
+                                compacto=compacto, escala_nativa=escala_nativa)
     
-    img = qr.make_image(fill_color="black", back_color="white")
-    img.save(nombre_archivo)
-    print(f"✓ Código QR generado: {nombre_archivo}")
+    salida = renderer.exportar(datos, nombre_archivo, cache, formato=None,
+                               compresion=compresion, optimizar=optimizar)
+    registro.info("✓ Código QR generado: %s", nombre_destino(nombre_archivo))
+    return salida
 
 
 def generar_qr_personalizado(datos, nombre_archivo="qr_personalizado.png", 
                              color_fondo="white", color_frente="black",
-                             tamaño_caja=10, borde=4):
+                             tamaño_caja=10, borde=4, cache=None,
+                             compresion=None, optimizar=False,
+                             compacto=False, escala_nativa=False, correccion_auto=False):
     """
     Genera un código QR personalizado con colores y tamaños específicos
     
     Args:
-        datos (str): Texto o URL para codificar
-        nombre_archivo (str): Nombre del archivo de salida
+        datos (str): Texto o URL para codificar, o un MatrizQR
+        nombre_archivo: Archivo de salida (.svg y .pdf se generan como
+                        vectores), objeto con write(), el tipo bytes o un
+                        bytearray / memoryview reutilizable (ver qr_salida)
         color_fondo (str): Color de fondo
         color_frente (str): Color del código QR
         tamaño_caja (int): Tamaño de cada caja del QR
         borde (int): Tamaño del borde
+        cache (CacheResultados): Caché de resultados (por defecto, la activada
+                                 con qr_cache.activar_cache, si la hay)
+        compresion (int): Nivel de compresión PNG (0-9), o None para el de Pillow
+        optimizar (bool): Buscar el PNG más pequeño (más lento)
+        compacto (bool): Guardar en el modo sin pérdida más pequeño (1 bit,
+                         paleta o RGB; ver QRRenderer)
+        escala_nativa (bool): Un píxel por módulo con la resolución anotada
+                              en el PNG en lugar de escalar por tamaño de caja
+        correccion_auto (bool): Usar la corrección más baja que deja margen
+                                (ver qr_ajuste) en lugar de H: versiones más
+                                pequeñas y archivos menores
+    
+    Returns:
+        bytes si nombre_archivo es bytes, el número de bytes escritos si es
+        un bytearray o memoryview, y None en otro caso
     """
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_H,  # Mayor corrección de errores
-        box_size=tamaño_caja,
-        border=borde,
+    import qrcode
+    from qr_renderer import obtener_renderer
+
+    renderer = obtener_renderer(
+        color_frente=color_frente,
+        color_fondo=color_fondo,
+        tamaño_caja=tamaño_caja,
+        borde=borde,
+        # Mayor corrección de errores, salvo que se pida la mínima suficiente
+        correccion='auto' if correccion_auto else qrcode.constants.ERROR_CORRECT_H,
+        compacto=compacto,
+        escala_nativa=escala_nativa,
     )
     
-    qr.add_data(datos)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color=color_frente, back_color=color_fondo)
-    img.save(nombre_archivo)
-    print(f"✓ Código QR personalizado generado: {nombre_archivo}")
+    salida = renderer.exportar(datos, nombre_archivo, cache, formato=None,
+                               compresion=compresion, optimizar=optimizar)
+    registro.info("✓ Código QR personalizado generado: %s",
+                  nombre_destino(nombre_archivo))
+    return salida
 
 
-def generar_qr_con_logo(datos, ruta_logo, nombre_archivo="qr_con_logo.png"):
+def generar_qr_con_logo(datos, ruta_logo, nombre_archivo="qr_con_logo.png", cache=None,
+                        compresion=None, optimizar=False, compacto=False,
+                        correccion_auto=False, proporcion_logo=0.2, propagar_errores=False):
     """
     Genera un código QR con un logo en el centro
     
     Args:
-        datos (str): Texto o URL para codificar
+        datos (str): Texto o URL para codificar, o un MatrizQR
         ruta_logo (str): Ruta de la imagen del logo
-        nombre_archivo (str): Nombre del archivo de salida
+        nombre_archivo: Archivo de salida (.svg y .pdf se generan como
+                        vectores), objeto con write(), el tipo bytes o un
+                        bytearray / memoryview reutilizable (ver qr_salida)
+        cache (CacheResultados): Caché de resultados (por defecto, la activada
+                                 con qr_cache.activar_cache, si la hay)
+        compresion (int): Nivel de compresión PNG (0-9), o None para el de Pillow
+        optimizar (bool): Buscar el PNG más pequeño (más lento)
+        compacto (bool): Guardar en el modo sin pérdida más pequeño (1 bit,
+                         paleta o RGB; ver QRRenderer)
+        correccion_auto (bool): Usar la corrección más baja con la que el
+                                logo deja margen (ver qr_ajuste), reduciendo
+                                el logo si ni con H lo deja
+        proporcion_logo (float): Fracción del ancho que ocupa el logo
+        propagar_errores (bool): Lanzar los errores del logo en lugar de
+                                 registrarlos y devolver None (los lotes lo
+                                 activan para contar y reintentar el trabajo)
+    
+    Returns:
+        bytes si nombre_archivo es bytes, el número de bytes escritos si es
+        un bytearray o memoryview, y None en otro caso
     """
     # Crear el QR con alta corrección de errores (necesaria para logo)
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_H,
-        box_size=10,
-        border=4,
-    )
-    
-    qr.add_data(datos)
-    qr.make(fit=True)
-    
-    img_qr = qr.make_image(fill_color="black", back_color="white").convert('RGB')
+    import qrcode
+    from qr_renderer import obtener_renderer
+
+    renderer = obtener_renderer(
+        correccion='auto' if correccion_auto else qrcode.constants.ERROR_CORRECT_H,
+        ruta_logo=ruta_logo, compacto=compacto, proporcion_logo=proporcion_logo)
     
-    # Abrir y redimensionar el logo
     try:
-        logo = Image.open(ruta_logo)
-        
-        # Calcular tamaño del logo (aproximadamente 1/5 del QR)
-        qr_width, qr_height = img_qr.size
-        logo_size = qr_width // 5
-        
-        logo = logo.resize((logo_size, logo_size), Image.Resampling.LANCZOS)
-        
-        # Calcular posición para centrar el logo
-        logo_pos = ((qr_width - logo_size) // 2, (qr_height - logo_size) // 2)
-        
-        # Pegar el logo en el QR
-        img_qr.paste(logo, logo_pos)
-        
-        img_qr.save(nombre_archivo)
-        print(f"✓ Código QR con logo generado: {nombre_archivo}")
+        salida = renderer.exportar(datos, nombre_archivo, cache, formato=None,
+                                   compresion=compresion, optimizar=optimizar)
+        registro.info("✓ Código QR con logo generado: %s", nombre_destino(nombre_archivo))
+        return salida
     except FileNotFoundError:
-        print(f"✗ Error: No se encontró el archivo de logo: {ruta_logo}")
+        if propagar_errores:
+            raise
+        registro.error("✗ Error: No se encontró el archivo de logo: %s", ruta_logo)
     except Exception as e:
-        print(f"✗ Error al procesar el logo: {e}")
+        if propagar_errores:
+            raise
+        registro.error("✗ Error al procesar el logo: %s", e)
 
 
 def menu_interactivo():
@@ -163,10 +216,76 @@ def menu_interactivo():
         print("Opción no válida")
 
 
-def main():
+def modo_no_interactivo(origen, formato=None, directorio="qr_codes", workers=1,
+                        directorio_cache=None, compresion=None, compacto=False,
+                        archivos_presets=()):
+    """
+    Genera códigos QR a partir de un archivo CSV o JSONL sin hacer preguntas
+    
+    Args:
+        origen (str): Ruta del archivo o '-' para leer de stdin
+        formato (str): 'csv' o 'jsonl' (por defecto según la extensión)
+        directorio (str): Carpeta de salida de los códigos QR
+        workers (int): Número de procesos a usar
+        directorio_cache (str): Carpeta de la caché de resultados, o None
+        compresion (int): Nivel de compresión PNG (0-9), o None para el de Pillow
+        compacto (bool): Guardar en el modo sin pérdida más pequeño
+        archivos_presets (list): Archivos TOML/JSON de presets de estilo que
+                                 las filas eligen con la columna 'preset'
+    """
+    from qr_entrada import procesar_entrada
+    from qr_cache import CacheResultados
+    from qr_presets import PRESETS
+    
+    try:
+        nombres = [nombre for ruta in archivos_presets for nombre in PRESETS.cargar(ruta)]
+    except (OSError, ValueError) as e:
+        print(f"✗ Error en los presets: {e}")
+        return 1
+    cache = CacheResultados(directorio_cache) if directorio_cache else None
+    resumen = procesar_entrada(origen, formato, directorio, workers, cache=cache,
+                               compresion=compresion, compacto=compacto,
+                               presets=PRESETS.descripcion(nombres) if nombres else None)
+    print(f"✓ Entrada procesada: {resumen}")
+    if cache is not None and cache.aciertos + cache.fallos:
+        print(f"  Caché: {cache.aciertos} aciertos, {cache.fallos} fallos")
+    for fallido in resumen.fallidos:
+        print(f"✗ Fila {fallido.indice + 1}: {fallido.error}")
+    return 1 if resumen.fallidos else 0
+
+
+def main(argv=None):
     """
     Función principal
     """
+    parser = argparse.ArgumentParser(
+        description="Generador de códigos QR. Sin argumentos abre el menú interactivo.")
+    parser.add_argument('-e', '--entrada', default=None,
+                        help="Archivo CSV/JSONL con un código por fila ('-' para stdin)")
+    parser.add_argument('-f', '--formato', choices=('csv', 'jsonl'), default=None,
+                        help="Formato de la entrada (por defecto según la extensión)")
+    parser.add_argument('-d', '--directorio', default="qr_codes",
+                        help="Carpeta de salida (por defecto 'qr_codes')")
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help="Número de procesos para la entrada no interactiva")
+    parser.add_argument('-c', '--cache', default=None, metavar='CARPETA',
+                        help="Carpeta de la caché de resultados para datos repetidos")
+    parser.add_argument('-z', '--compresion', type=int, choices=range(10), default=None,
+                        metavar='0-9',
+                        help="Nivel de compresión PNG (los bajos guardan más rápido)")
+    parser.add_argument('--compacto', action='store_true',
+                        help="Guardar en el modo sin pérdida más pequeño (1 bit, paleta o RGB)")
+    parser.add_argument('-P', '--presets', action='append', default=[], metavar='ARCHIVO',
+                        help="Archivo TOML o JSON de presets de estilo para la columna "
+                             "'preset' (repetible)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
+    if args.entrada:
+        return modo_no_interactivo(args.entrada, args.formato, args.directorio,
+                                   args.workers, args.cache, args.compresion,
+                                   args.compacto, args.presets)
+    
     # Crear carpeta de salida si no existe
     if not os.path.exists("qr_codes"):
         os.makedirs("qr_codes")
@@ -190,4 +309,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
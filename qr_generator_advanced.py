@@ -4,79 +4,72 @@ Generador Avanzado de Códigos QR con Estilos
 Permite crear códigos QR con diferentes formas de módulos y esquinas
 """
 
-import qrcode
-from qrcode.image.styledpil import StyledPilImage
-from qrcode.image.styles.moduledrawers import (
-    SquareModuleDrawer,
-    GappedSquareModuleDrawer,
-    CircleModuleDrawer,
-    RoundedModuleDrawer,
-    VerticalBarsDrawer,
-    HorizontalBarsDrawer
-)
-from qrcode.image.styles.colormasks import (
-    SolidFillColorMask,
-    SquareGradiantColorMask,
-    RadialGradiantColorMask,
-    HorizontalGradiantColorMask,
-    VerticalGradiantColorMask
-)
-from PIL import Image
+import logging
 import os
 
+from qr_salida import nombre_destino
+
+
+registro = logging.getLogger(__name__)
+
+
+def __getattr__(nombre):
+    # PEP 562: los nombres que antes se importaban de qr_renderer al cargar el
+    # módulo siguen disponibles, pero solo cargan qrcode y Pillow al pedirlos
+    if nombre in ('ESTILOS_MODULO', 'GRADIENTES', 'obtener_renderer'):
+        import qr_renderer
+        return getattr(qr_renderer, nombre)
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
 
 def generar_qr_con_estilo(datos, nombre_archivo="qr_estilo.png", 
                           estilo_modulo="cuadrado", 
                           color_frente="black", 
-                          color_fondo="white"):
+                          color_fondo="white",
+                          cache=None,
+                          compresion=None, optimizar=False, compacto=False):
     """
     Genera un código QR con diferentes estilos de módulos (puntas)
     
     Args:
-        datos (str): Texto o URL para codificar
-        nombre_archivo (str): Nombre del archivo de salida
+        datos (str): Texto o URL para codificar, o un MatrizQR
+        nombre_archivo: Archivo de salida (.svg y .pdf se generan como
+                        vectores), objeto con write(), el tipo bytes o un
+                        bytearray / memoryview reutilizable (ver qr_salida)
         estilo_modulo (str): Tipo de módulo: 'cuadrado', 'cuadrado_gap', 
                             'circulo', 'redondeado', 'barras_v', 'barras_h'
         color_frente (str): Color del código QR
         color_fondo (str): Color de fondo
-    """
+        cache (CacheResultados): Caché de resultados (por defecto, la activada
+                                 con qr_cache.activar_cache, si la hay)
+        compresion (int): Nivel de compresión PNG (0-9), o None para el de Pillow
+        optimizar (bool): Buscar el PNG más pequeño (más lento)
+        compacto (bool): Guardar en el modo sin pérdida más pequeño (1 bit,
+                         paleta o RGB; ver QRRenderer)
     
-    # Mapeo de estilos
-    estilos = {
-        'cuadrado': SquareModuleDrawer(),
-        'cuadrado_gap': GappedSquareModuleDrawer(),
-        'circulo': CircleModuleDrawer(),
-        'redondeado': RoundedModuleDrawer(),
-        'barras_v': VerticalBarsDrawer(),
-        'barras_h': HorizontalBarsDrawer()
-    }
-    
-    # Crear el QR
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_H,
-        box_size=10,
-        border=4,
-    )
-    
-    qr.add_data(datos)
-    qr.make(fit=True)
-    
-    # Seleccionar el drawer
-    drawer = estilos.get(estilo_modulo, SquareModuleDrawer())
+    Returns:
+        bytes si nombre_archivo es bytes, el número de bytes escritos si es
+        un bytearray o memoryview, y None en otro caso
+    """
     
-    # Crear imagen con estilo
-    img = qr.make_image(
-        image_factory=StyledPilImage,
-        module_drawer=drawer,
-        color_mask=SolidFillColorMask(
-            back_color=color_fondo,
-            front_color=color_frente
-        )
+    # Importaciones diferidas: el menú arranca sin cargar qrcode, Pillow ni NumPy
+    import qrcode
+    from qr_renderer import ESTILOS_MODULO, obtener_renderer
+
+    # Seleccionar el perfil (los estilos desconocidos se dibujan como cuadrados)
+    renderer = obtener_renderer(
+        estilo_modulo=estilo_modulo if estilo_modulo in ESTILOS_MODULO else 'cuadrado',
+        color_frente=color_frente,
+        color_fondo=color_fondo,
+        correccion=qrcode.constants.ERROR_CORRECT_H,
+        compacto=compacto,
     )
     
-    img.save(nombre_archivo)
-    print(f"✓ QR con estilo '{estilo_modulo}' generado: {nombre_archivo}")
+    salida = renderer.exportar(datos, nombre_archivo, cache, formato=None,
+                               compresion=compresion, optimizar=optimizar)
+    registro.info("✓ QR con estilo '%s' generado: %s", estilo_modulo,
+                  nombre_destino(nombre_archivo))
+    return salida
 
 
 def generar_qr_gradiente(datos, nombre_archivo="qr_gradiente.png",
@@ -84,153 +77,120 @@ def generar_qr_gradiente(datos, nombre_archivo="qr_gradiente.png",
                          color_centro="blue",
                          color_borde="purple",
                          color_fondo="white",
-                         estilo_modulo="redondeado"):
+                         estilo_modulo="redondeado",
+                         cache=None,
+                         compresion=None, optimizar=False, compacto=False):
     """
     Genera un código QR con gradiente de color
     
     Args:
-        datos (str): Texto o URL para codificar
-        nombre_archivo (str): Nombre del archivo de salida
+        datos (str): Texto o URL para codificar, o un MatrizQR
+        nombre_archivo: Archivo de salida (.svg y .pdf se generan como
+                        vectores), objeto con write(), el tipo bytes o un
+                        bytearray / memoryview reutilizable (ver qr_salida)
         tipo_gradiente (str): 'radial', 'horizontal', 'vertical', 'cuadrado'
         color_centro (str): Color del centro/inicio
         color_borde (str): Color del borde/fin
         color_fondo (str): Color de fondo
         estilo_modulo (str): Estilo de los módulos
-    """
-    
-    # Mapeo de estilos de módulos
-    estilos = {
-        'cuadrado': SquareModuleDrawer(),
-        'cuadrado_gap': GappedSquareModuleDrawer(),
-        'circulo': CircleModuleDrawer(),
-        'redondeado': RoundedModuleDrawer(),
-        'barras_v': VerticalBarsDrawer(),
-        'barras_h': HorizontalBarsDrawer()
-    }
+        cache (CacheResultados): Caché de resultados (por defecto, la activada
+                                 con qr_cache.activar_cache, si la hay)
+        compresion (int): Nivel de compresión PNG (0-9), o None para el de Pillow
+        optimizar (bool): Buscar el PNG más pequeño (más lento)
+        compacto (bool): Guardar en el modo sin pérdida más pequeño (1 bit,
+                         paleta o RGB; ver QRRenderer)
     
-    # Mapeo de gradientes
-    gradientes = {
-        'radial': RadialGradiantColorMask(
-            back_color=color_fondo,
-            center_color=color_centro,
-            edge_color=color_borde
-        ),
-        'horizontal': HorizontalGradiantColorMask(
-            back_color=color_fondo,
-            left_color=color_centro,
-            right_color=color_borde
-        ),
-        'vertical': VerticalGradiantColorMask(
-            back_color=color_fondo,
-            top_color=color_centro,
-            bottom_color=color_borde
-        ),
-        'cuadrado': SquareGradiantColorMask(
-            back_color=color_fondo,
-            center_color=color_centro,
-            edge_color=color_borde
-        )
-    }
+    Returns:
+        bytes si nombre_archivo es bytes, el número de bytes escritos si es
+        un bytearray o memoryview, y None en otro caso
+    """
+    import qrcode
+    from qr_renderer import ESTILOS_MODULO, GRADIENTES, obtener_renderer
     
-    # Crear el QR
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_H,
-        box_size=10,
-        border=4,
+    # Seleccionar el perfil (por defecto, radial con módulos redondeados)
+    renderer = obtener_renderer(
+        estilo_modulo=estilo_modulo if estilo_modulo in ESTILOS_MODULO else 'redondeado',
+        tipo_gradiente=tipo_gradiente if tipo_gradiente in GRADIENTES else 'radial',
+        color_centro=color_centro,
+        color_borde=color_borde,
+        color_fondo=color_fondo,
+        correccion=qrcode.constants.ERROR_CORRECT_H,
+        compacto=compacto,
     )
     
-    qr.add_data(datos)
-    qr.make(fit=True)
-    
     # Crear imagen con gradiente
-    img = qr.make_image(
-        image_factory=StyledPilImage,
-        module_drawer=estilos.get(estilo_modulo, RoundedModuleDrawer()),
-        color_mask=gradientes.get(tipo_gradiente, RadialGradiantColorMask(
-            back_color=color_fondo,
-            center_color=color_centro,
-            edge_color=color_borde
-        ))
-    )
-    
-    img.save(nombre_archivo)
-    print(f"✓ QR con gradiente '{tipo_gradiente}' generado: {nombre_archivo}")
+    salida = renderer.exportar(datos, nombre_archivo, cache, formato=None,
+                               compresion=compresion, optimizar=optimizar)
+    registro.info("✓ QR con gradiente '%s' generado: %s", tipo_gradiente,
+                  nombre_destino(nombre_archivo))
+    return salida
 
 
 def generar_qr_con_logo_y_estilo(datos, ruta_logo, nombre_archivo="qr_logo_estilo.png",
                                   estilo_modulo="redondeado",
                                   color_frente="black",
-                                  color_fondo="white"):
+                                  color_fondo="white",
+                                  cache=None,
+                                  compresion=None, optimizar=False, compacto=False,
+                                  correccion_auto=False, proporcion_logo=0.2,
+                                  propagar_errores=False):
     """
     Genera un código QR estilizado con logo en el centro
     
     Args:
-        datos (str): Texto o URL para codificar
+        datos (str): Texto o URL para codificar, o un MatrizQR
         ruta_logo (str): Ruta de la imagen del logo
-        nombre_archivo (str): Nombre del archivo de salida
+        nombre_archivo: Archivo de salida (.svg y .pdf se generan como
+                        vectores), objeto con write(), el tipo bytes o un
+                        bytearray / memoryview reutilizable (ver qr_salida)
         estilo_modulo (str): Estilo de los módulos
         color_frente (str): Color del QR
         color_fondo (str): Color de fondo
-    """
+        cache (CacheResultados): Caché de resultados (por defecto, la activada
+                                 con qr_cache.activar_cache, si la hay)
+        compresion (int): Nivel de compresión PNG (0-9), o None para el de Pillow
+        optimizar (bool): Buscar el PNG más pequeño (más lento)
+        compacto (bool): Guardar en el modo sin pérdida más pequeño (1 bit,
+                         paleta o RGB; ver QRRenderer)
+        correccion_auto (bool): Usar la corrección más baja con la que el
+                                logo y el estilo dejan margen (ver qr_ajuste)
+        proporcion_logo (float): Fracción del ancho que ocupa el logo
+        propagar_errores (bool): Lanzar los errores del logo en lugar de
+                                 registrarlos y devolver None (los lotes lo
+                                 activan para contar y reintentar el trabajo)
     
-    estilos = {
-        'cuadrado': SquareModuleDrawer(),
-        'cuadrado_gap': GappedSquareModuleDrawer(),
-        'circulo': CircleModuleDrawer(),
-        'redondeado': RoundedModuleDrawer(),
-        'barras_v': VerticalBarsDrawer(),
-        'barras_h': HorizontalBarsDrawer()
-    }
+    Returns:
+        bytes si nombre_archivo es bytes, el número de bytes escritos si es
+        un bytearray o memoryview, y None en otro caso
+    """
+    import qrcode
+    from qr_renderer import ESTILOS_MODULO, obtener_renderer
     
-    # Crear el QR con estilo
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_H,
-        box_size=10,
-        border=4,
+    renderer = obtener_renderer(
+        estilo_modulo=estilo_modulo if estilo_modulo in ESTILOS_MODULO else 'redondeado',
+        color_frente=color_frente,
+        color_fondo=color_fondo,
+        correccion='auto' if correccion_auto else qrcode.constants.ERROR_CORRECT_H,
+        ruta_logo=ruta_logo,
+        compacto=compacto,
+        proporcion_logo=proporcion_logo,
     )
     
-    qr.add_data(datos)
-    qr.make(fit=True)
-    
-    drawer = estilos.get(estilo_modulo, RoundedModuleDrawer())
-    
-    img_qr = qr.make_image(
-        image_factory=StyledPilImage,
-        module_drawer=drawer,
-        color_mask=SolidFillColorMask(
-            back_color=color_fondo,
-            front_color=color_frente
-        )
-    ).convert('RGB')
-    
-    # Agregar logo
+    # Crear el QR con estilo y agregar logo
     try:
-        logo = Image.open(ruta_logo)
-        
-        # Calcular tamaño del logo
-        qr_width, qr_height = img_qr.size
-        logo_size = qr_width // 5
-        
-        # Redimensionar logo
-        logo = logo.resize((logo_size, logo_size), Image.Resampling.LANCZOS)
-        
-        # Calcular posición central
-        logo_pos = ((qr_width - logo_size) // 2, (qr_height - logo_size) // 2)
-        
-        # Si el logo tiene transparencia, respetarla
-        if logo.mode == 'RGBA':
-            img_qr.paste(logo, logo_pos, logo)
-        else:
-            img_qr.paste(logo, logo_pos)
-        
-        img_qr.save(nombre_archivo)
-        print(f"✓ QR estilizado con logo generado: {nombre_archivo}")
+        salida = renderer.exportar(datos, nombre_archivo, cache, formato=None,
+                                   compresion=compresion, optimizar=optimizar)
+        registro.info("✓ QR estilizado con logo generado: %s",
+                      nombre_destino(nombre_archivo))
+        return salida
     except FileNotFoundError:
-        print(f"✗ Error: No se encontró el archivo de logo: {ruta_logo}")
+        if propagar_errores:
+            raise
+        registro.error("✗ Error: No se encontró el archivo de logo: %s", ruta_logo)
     except Exception as e:
-        print(f"✗ Error al procesar el logo: {e}")
+        if propagar_errores:
+            raise
+        registro.error("✗ Error al procesar el logo: %s", e)
 
 
 def mostrar_estilos_disponibles():
@@ -327,6 +287,8 @@ def main():
     """
     Función principal
     """
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
     # Crear carpeta de salida si no existe
     if not os.path.exists("qr_codes"):
         os.makedirs("qr_codes")
@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""
+Hojas de Etiquetas con Códigos QR
+Compone páginas de imprenta (A4, rollos...) con cientos de códigos y su
+pie de texto: cada código se dibuja directamente en su celda de un único
+lienzo de página reutilizado, y cada página se escribe en cuanto se llena,
+así que la memoria no depende del número de códigos
+"""
+
+import argparse
+import io
+import logging
+import os
+import re
+import sys
+import time
+import zlib
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+from qr_entrada import detectar_formato, leer_filas, normalizar_o_invalidar, perfil_para
+from qr_lote import ResultadoTrabajo, ResumenLote, TrabajoInvalido, tipo_de
+from qr_matriz import MatrizQR
+from qr_renderer import obtener_renderer
+from qr_salida import es_ruta, formato_de, nombre_destino, opciones_guardado
+from qr_vector import A4, CARTA, PUNTOS_POR_MM
+
+
+registro = logging.getLogger(__name__)
+
+# Nombre -> (ancho, alto) en mm
+TAMAÑOS_PAGINA = {
+    'A3': (297, 420),
+    'A4': A4,
+    'A5': (148, 210),
+    'carta': CARTA,
+}
+
+# Lado de los códigos en mm si no se indica ni el lado ni la rejilla
+LADO_POR_DEFECTO = 30
+
+
+def tamaño_pagina(texto):
+    """
+    Interpreta un tamaño de página: un nombre de TAMAÑOS_PAGINA o 'ANCHOxALTO' en mm
+
+    Un rollo se describe igual, con el ancho del rollo y el largo de cada corte
+    (por ejemplo '100x150').
+    """
+    if texto in TAMAÑOS_PAGINA:
+        return TAMAÑOS_PAGINA[texto]
+    medidas = re.fullmatch(r'\s*([\d.]+)\s*[xX×]\s*([\d.]+)\s*', texto)
+    if not medidas:
+        raise ValueError(f"Tamaño de página no válido: {texto!r} "
+                         f"(usa {', '.join(TAMAÑOS_PAGINA)} o ANCHOxALTO en mm)")
+    return float(medidas.group(1)), float(medidas.group(2))
+
+
+class HojaEtiquetas:
+    """
+    Disposición de una hoja: página, rejilla de celdas, resolución y sangrado
+
+    Cada celda tiene un código cuadrado de lado_mm y, debajo, una franja de
+    alto_pie_mm para el pie de texto. La rejilla se calcula a partir del
+    lado, a partir de las columnas y filas pedidas, o de una mezcla de ambos:
+
+        hoja = HojaEtiquetas(A4, ppp=300, columnas=6, filas=8, alto_pie_mm=4)
+        componer_hojas(trabajos, "etiquetas.pdf", hoja)
+    """
+
+    def __init__(self, tamaño_pagina=A4, ppp=300, lado_mm=None, columnas=None, filas=None,
+                 margen_mm=10, separacion_mm=3, sangrado_mm=0, alto_pie_mm=0,
+                 color_fondo="white", color_pie="black", modo='RGB'):
+        """
+        Args:
+            tamaño_pagina (tuple): (ancho, alto) de la página cortada, en mm
+            ppp (int): Resolución de la página en puntos por pulgada
+            lado_mm (float): Lado de cada código en mm, con su margen en
+                             blanco; None lo ajusta a columnas y filas
+            columnas (int): Columnas de la rejilla; None, las que quepan
+            filas (int): Filas de la rejilla; None, las que quepan
+            margen_mm (float): Margen de la página en mm
+            separacion_mm (float): Espacio entre celdas en mm
+            sangrado_mm (float): Sangrado alrededor de la página en mm; el
+                                 fondo se extiende por él y el PDF lo declara
+                                 con /BleedBox y /TrimBox
+            alto_pie_mm (float): Alto de la franja de texto bajo cada código
+                                 (0 para no poner pies)
+            color_fondo (str): Color de la página
+            color_pie (str): Color del texto de los pies
+            modo (str): 'RGB', o 'L' para hojas en escala de grises: ocupan
+                        un tercio de memoria y el PDF se comprime bastante
+                        más rápido (los colores se pasan a gris)
+        """
+        if modo not in ('RGB', 'L'):
+            raise ValueError(f"Modo de hoja no válido: {modo!r}")
+        ancho, alto = tamaño_pagina
+        util_ancho = ancho - 2 * margen_mm
+        util_alto = alto - 2 * margen_mm
+        if lado_mm is None:
+            candidatos = []
+            if columnas:
+                candidatos.append((util_ancho - (columnas - 1) * separacion_mm) / columnas)
+            if filas:
+                candidatos.append((util_alto - (filas - 1) * separacion_mm) / filas
+                                  - alto_pie_mm)
+            lado_mm = min(candidatos) if candidatos else LADO_POR_DEFECTO
+        if lado_mm <= 0:
+            raise ValueError("Las celdas pedidas no caben en la página")
+
+        paso_x = lado_mm + separacion_mm
+        paso_y = lado_mm + alto_pie_mm + separacion_mm
+        # El margen de 1e-9 evita perder una columna por redondeo al ajustar el lado
+        caben_columnas = int((util_ancho + separacion_mm) / paso_x + 1e-9)
+        caben_filas = int((util_alto + separacion_mm) / paso_y + 1e-9)
+        columnas = columnas or caben_columnas
+        filas = filas or caben_filas
+        if not 1 <= columnas <= caben_columnas or not 1 <= filas <= caben_filas:
+            raise ValueError(f"Una rejilla de {columnas}x{filas} celdas de {lado_mm:g} mm "
+                             f"no cabe en una página de {ancho:g}x{alto:g} mm")
+
+        self.tamaño_pagina = (ancho, alto)
+        self.ppp = ppp
+        self.lado_mm = lado_mm
+        self.columnas = columnas
+        self.filas = filas
+        self.sangrado_mm = sangrado_mm
+        self.alto_pie_mm = alto_pie_mm
+        self.modo = modo
+        self.color_fondo = ImageColor.getcolor(color_fondo, modo)
+        self.color_pie = ImageColor.getcolor(color_pie, modo)
+
+        # Geometría en píxeles del lienzo, sangrado incluido
+        self.ancho_px = self.a_pixeles(ancho + 2 * sangrado_mm)
+        self.alto_px = self.a_pixeles(alto + 2 * sangrado_mm)
+        self.lado_px = self.a_pixeles(lado_mm)
+        self.pie_px = self.a_pixeles(alto_pie_mm)
+        origen = sangrado_mm + margen_mm
+        self.celdas = [(self.a_pixeles(origen + columna * paso_x),
+                        self.a_pixeles(origen + fila * paso_y))
+                       for fila in range(filas) for columna in range(columnas)]
+        self._fuente = None
+
+    @property
+    def por_pagina(self):
+        """Número de códigos por página"""
+        return len(self.celdas)
+
+    def a_pixeles(self, mm):
+        """Convierte milímetros en píxeles a la resolución de la hoja"""
+        return round(mm * self.ppp / 25.4)
+
+    def fuente(self):
+        """Fuente de los pies, con un cuerpo proporcional al alto de la franja"""
+        if self._fuente is None:
+            self._fuente = ImageFont.load_default(size=max(1, int(self.pie_px * 0.7)))
+        return self._fuente
+
+    def __repr__(self):
+        ancho, alto = self.tamaño_pagina
+        return (f"HojaEtiquetas({ancho:g}x{alto:g} mm, {self.columnas}x{self.filas} "
+                f"celdas de {self.lado_mm:g} mm, {self.ppp} ppp)")
+
+
+def _normalizar_trabajo(trabajo):
+    """Acepta un texto o un trabajo de qr_lote y devuelve un trabajo con 'tipo'"""
+    if not isinstance(trabajo, dict):
+        return {'tipo': 'simple', 'datos': trabajo}
+    if 'tipo' in trabajo:
+        return trabajo
+    return dict(trabajo, tipo=tipo_de(trabajo))
+
+
+def _recortar_texto(texto, fuente, ancho):
+    """Acorta el texto con '…' hasta que quepa en el ancho indicado"""
+    if fuente.getlength(texto) <= ancho:
+        return texto
+    while texto and fuente.getlength(texto + "…") > ancho:
+        texto = texto[:-1]
+    return texto + "…"
+
+
+def dibujar_celda(pagina, hoja, trabajo, x, y):
+    """
+    Dibuja un código y su pie en la celda de la página que empieza en (x, y)
+
+    El código se renderiza con el perfil del generador de su tipo, pero con
+    el mayor tamaño de caja entero que cabe en la celda, y se centra en ella.
+
+    Args:
+        pagina (PIL.Image): Lienzo de la página
+        hoja (HojaEtiquetas): Disposición de la hoja
+        trabajo (dict): Trabajo con 'tipo', 'datos', las opciones del
+                        generador y la clave opcional 'pie'
+        x (int): Columna en píxeles de la esquina superior izquierda
+        y (int): Fila en píxeles de la esquina superior izquierda
+    """
+    perfil = perfil_para(trabajo)
+    # La hoja fija el tamaño del código, así que la escala nativa no se aplica
+    perfil.pop('escala_nativa', None)
+    datos = trabajo['datos']
+    matriz = datos if isinstance(datos, MatrizQR) else obtener_renderer(**perfil).matriz(datos)
+    modulos = matriz.lado + 2 * perfil.get('borde', 4)
+    caja = hoja.lado_px // modulos
+    if caja < 1:
+        raise ValueError(f"Un código de {modulos} módulos no cabe en {hoja.lado_px} px; "
+                         f"aumenta ppp o el lado de las celdas")
+
+    img = obtener_renderer(**dict(perfil, tamaño_caja=caja)).renderizar(matriz)
+    desplazamiento = (hoja.lado_px - img.width) // 2
+    pagina.paste(img, (x + desplazamiento, y + desplazamiento))
+
+    if hoja.pie_px:
+        pie = trabajo.get('pie')
+        if pie is None:
+            pie = datos if isinstance(datos, str) else ''
+        pie = ' '.join(str(pie).split())
+        if pie:
+            fuente = hoja.fuente()
+            ImageDraw.Draw(pagina).text(
+                (x + hoja.lado_px // 2, y + hoja.lado_px + hoja.pie_px // 2),
+                _recortar_texto(pie, fuente, hoja.lado_px), fill=hoja.color_pie,
+                font=fuente, anchor='mm')
+
+
+def iterar_hojas(trabajos, hoja=None):
+    """
+    Compone las páginas de forma perezosa y produce cada una al llenarse
+
+    Se usa siempre el mismo lienzo: la imagen producida solo es válida
+    hasta pedir la siguiente página, así que hay que guardarla (o copiarla)
+    antes. Los trabajos que fallan dejan su celda vacía y no mueven al
+    resto de códigos de sitio.
+
+    Args:
+        trabajos (iterable): Textos o trabajos de qr_lote ('tipo', 'datos' y
+                             las opciones del generador; 'nombre_archivo' se
+                             ignora) con la clave opcional 'pie'
+        hoja (HojaEtiquetas): Disposición de la hoja (por defecto, A4 a 300 ppp)
+
+    Yields:
+        tuple: (PIL.Image de la página, lista de ResultadoTrabajo de sus celdas)
+    """
+    hoja = hoja or HojaEtiquetas()
+    pagina = Image.new(hoja.modo, (hoja.ancho_px, hoja.alto_px), hoja.color_fondo)
+    resultados = []
+    for indice, trabajo in enumerate(trabajos):
+        posicion = indice % hoja.por_pagina
+        if posicion == 0 and resultados:
+            yield pagina, resultados
+            pagina.paste(hoja.color_fondo, (0, 0, hoja.ancho_px, hoja.alto_px))
+            resultados = []
+
+        inicio = time.perf_counter()
+        error = trabajo.error if isinstance(trabajo, TrabajoInvalido) else None
+        if error is None:
+            try:
+                dibujar_celda(pagina, hoja, _normalizar_trabajo(trabajo),
+                              *hoja.celdas[posicion])
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        resultados.append(ResultadoTrabajo(indice, error is None, error, 1,
+                                           time.perf_counter() - inicio,
+                                           None if error is None else trabajo))
+    if resultados:
+        yield pagina, resultados
+
+
+class EscritorPDFHojas:
+    """
+    Escribe un PDF de páginas rasterizadas a medida que llegan
+
+    Cada página se comprime y se vuelca al archivo en cuanto se añade, sin
+    guardar nada más que la posición de cada objeto para la tabla xref. El
+    archivo no necesita admitir seek, así que sirve una respuesta HTTP o
+    stdout.
+    """
+
+    def __init__(self, archivo, compresion=6):
+        """
+        Args:
+            archivo: Objeto binario con write()
+            compresion (int): Nivel zlib de las imágenes (1-9)
+        """
+        self.archivo = archivo
+        self.compresion = compresion
+        self._escritos = 0
+        # Número de objeto -> posición; el 1 (catálogo) y el 2 (árbol de
+        # páginas) se escriben al cerrar, cuando se conocen todas las páginas
+        self._posiciones = {}
+        self._paginas = []
+        self._escribir(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _escribir(self, contenido):
+        self.archivo.write(contenido)
+        self._escritos += len(contenido)
+
+    def _objeto(self, contenido, numero=None):
+        """Escribe un objeto y devuelve su número"""
+        if numero is None:
+            numero = max(self._posiciones, default=2) + 1
+        self._posiciones[numero] = self._escritos
+        self._escribir(b"%d 0 obj\n" % numero + contenido + b"\nendobj\n")
+        return numero
+
+    def añadir_pagina(self, img, ancho_mm, alto_mm, sangrado_mm=0):
+        """
+        Añade una página con la imagen ocupándola entera
+
+        Args:
+            img (PIL.Image): Página rasterizada ('RGB' o 'L'), sangrado incluido
+            ancho_mm (float): Ancho de la página cortada en mm
+            alto_mm (float): Alto de la página cortada en mm
+            sangrado_mm (float): Sangrado que incluye la imagen por cada lado
+        """
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        espacio = b"/DeviceGray" if img.mode == 'L' else b"/DeviceRGB"
+        pixeles = zlib.compress(img.tobytes(), self.compresion)
+        imagen = self._objeto(
+            b"<< /Type /XObject /Subtype /Image /Width %d /Height %d "
+            b"/ColorSpace %s /BitsPerComponent 8 /Filter /FlateDecode "
+            b"/Length %d >>\nstream\n" % (img.width, img.height, espacio, len(pixeles))
+            + pixeles + b"\nendstream")
+        del pixeles
+
+        ancho = (ancho_mm + 2 * sangrado_mm) * PUNTOS_POR_MM
+        alto = (alto_mm + 2 * sangrado_mm) * PUNTOS_POR_MM
+        sangrado = sangrado_mm * PUNTOS_POR_MM
+        dibujo = f"q {ancho:.3f} 0 0 {alto:.3f} 0 0 cm /Im0 Do Q".encode('latin-1')
+        contenido = self._objeto(b"<< /Length %d >>\nstream\n" % len(dibujo)
+                                 + dibujo + b"\nendstream")
+        caja = f"[{sangrado:.3f} {sangrado:.3f} {ancho - sangrado:.3f} {alto - sangrado:.3f}]"
+        self._paginas.append(self._objeto(
+            (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {ancho:.3f} {alto:.3f}] "
+             f"/BleedBox [0 0 {ancho:.3f} {alto:.3f}] /TrimBox {caja} "
+             f"/Resources << /XObject << /Im0 {imagen} 0 R >> >> "
+             f"/Contents {contenido} 0 R >>").encode('latin-1')))
+
+    @property
+    def paginas(self):
+        """Número de páginas escritas"""
+        return len(self._paginas)
+
+    def cerrar(self):
+        """Escribe el árbol de páginas, el catálogo y la tabla xref"""
+        hijos = ' '.join(f"{pagina} 0 R" for pagina in self._paginas)
+        self._objeto(f"<< /Type /Pages /Kids [{hijos}] /Count {len(self._paginas)} >>"
+                     .encode('latin-1'), 2)
+        self._objeto(b"<< /Type /Catalog /Pages 2 0 R >>", 1)
+        total = max(self._posiciones) + 1
+        inicio_xref = self._escritos
+        tabla = bytearray(b"xref\n0 %d\n0000000000 65535 f \n" % total)
+        for numero in range(1, total):
+            tabla += b"%010d 00000 n \n" % self._posiciones[numero]
+        tabla += (b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                  % (total, inicio_xref))
+        self._escribir(bytes(tabla))
+
+
+def componer_hojas(trabajos, destino="hojas.pdf", hoja=None, compresion=None):
+    """
+    Compone las hojas de etiquetas y las escribe página a página
+
+    Args:
+        trabajos (iterable): Textos o trabajos de qr_lote (ver iterar_hojas)
+        destino: Ruta de un PDF de varias páginas; una ruta con '{}' (por
+                 ejemplo 'hojas/hoja_{:03d}.png') para un archivo de imagen
+                 por página, numerado desde 1; o un objeto binario con
+                 write() (un BytesIO, una respuesta HTTP...) que recibe el PDF
+        hoja (HojaEtiquetas): Disposición de la hoja (por defecto, A4 a 300 ppp)
+        compresion (int): Nivel zlib del PDF o de los PNG (0-9), o None para
+                          el valor por defecto
+
+    Returns:
+        ResumenLote: Totales y trabajos fallidos
+    """
+    hoja = hoja or HojaEtiquetas()
+    resumen = ResumenLote()
+    inicio = time.perf_counter()
+    por_pagina = es_ruta(destino) and '{' in os.fspath(destino)
+
+    if por_pagina:
+        patron = os.fspath(destino)
+        formato = formato_de(patron)
+        for numero, (pagina, resultados) in enumerate(iterar_hojas(trabajos, hoja), 1):
+            ruta = patron.format(numero)
+            pagina.save(ruta, format=formato, dpi=(hoja.ppp, hoja.ppp),
+                        **opciones_guardado(formato, compresion))
+            registro.info("✓ Hoja %d guardada como: %s", numero, ruta)
+            for resultado in resultados:
+                resumen.registrar(resultado)
+        resumen.segundos = time.perf_counter() - inicio
+        return resumen
+
+    if not es_ruta(destino) and not hasattr(destino, 'write'):
+        raise TypeError(f"Destino de hojas no válido: {type(destino).__name__}")
+    archivo = open(destino, 'wb') if es_ruta(destino) else destino
+    try:
+        escritor = EscritorPDFHojas(archivo, 6 if compresion is None else compresion)
+        for pagina, resultados in iterar_hojas(trabajos, hoja):
+            escritor.añadir_pagina(pagina, *hoja.tamaño_pagina, hoja.sangrado_mm)
+            registro.info("✓ Hoja %d añadida a: %s", escritor.paginas, nombre_destino(destino))
+            for resultado in resultados:
+                resumen.registrar(resultado)
+        escritor.cerrar()
+    finally:
+        if archivo is not destino:
+            archivo.close()
+    resumen.segundos = time.perf_counter() - inicio
+    return resumen
+
+
+def leer_trabajos_hoja(archivo, formato='csv'):
+    """
+    Lee los trabajos de un archivo CSV o JSONL como los de qr_generator --entrada
+
+    Además de las columnas de los generadores admite 'pie', el texto bajo
+    cada código (por defecto, los datos). Las filas con errores llegan como
+    TrabajoInvalido y dejan su celda vacía.
+    """
+    for numero, fila in enumerate(leer_filas(archivo, formato), 1):
+        pie = fila.pop('pie', None)
+        trabajo = normalizar_o_invalidar(fila, numero)
+        if pie is not None and not isinstance(trabajo, TrabajoInvalido):
+            trabajo['pie'] = pie
+        yield trabajo
+
+
+def main(argv=None):
+    """
+    Función principal
+    """
+    parser = argparse.ArgumentParser(
+        description="Compone hojas de etiquetas para imprenta con muchos códigos QR "
+                    "por página, a partir de un archivo CSV o JSONL")
+    parser.add_argument('entrada', help="Archivo CSV o JSONL de códigos ('-' para stdin)")
+    parser.add_argument('-o', '--salida', default="hojas.pdf",
+                        help="PDF de salida, o ruta con '{}' para una imagen por página "
+                             "(por ejemplo hoja_{:03d}.png)")
+    parser.add_argument('-f', '--formato', choices=('csv', 'jsonl'), default=None,
+                        help="Formato de la entrada (por defecto, según la extensión)")
+    parser.add_argument('-p', '--pagina', type=tamaño_pagina, default=A4,
+                        help=f"Tamaño de página: {', '.join(TAMAÑOS_PAGINA)} o ANCHOxALTO "
+                             f"en mm (por defecto A4)")
+    parser.add_argument('--ppp', type=int, default=300, help="Resolución en puntos por pulgada")
+    parser.add_argument('--lado', type=float, default=None, metavar='MM',
+                        help="Lado de cada código en mm (por defecto, el que llene la "
+                             "rejilla, o 30 mm)")
+    parser.add_argument('--columnas', type=int, default=None)
+    parser.add_argument('--filas', type=int, default=None)
+    parser.add_argument('--margen', type=float, default=10, metavar='MM')
+    parser.add_argument('--separacion', type=float, default=3, metavar='MM')
+    parser.add_argument('--sangrado', type=float, default=0, metavar='MM')
+    parser.add_argument('--pie', type=float, default=0, metavar='MM',
+                        help="Alto del texto bajo cada código (0 para no poner pies)")
+    parser.add_argument('--gris', action='store_true',
+                        help="Componer las hojas en escala de grises (más rápido)")
+    parser.add_argument('-z', '--compresion', type=int, choices=range(10), default=None,
+                        metavar='0-9', help="Nivel de compresión del PDF o de los PNG")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    try:
+        hoja = HojaEtiquetas(args.pagina, args.ppp, args.lado, args.columnas, args.filas,
+                             args.margen, args.separacion, args.sangrado, args.pie,
+                             modo='L' if args.gris else 'RGB')
+    except ValueError as e:
+        print(f"✗ {e}")
+        return 1
+
+    formato = args.formato
+    if formato is None:
+        formato = 'csv' if args.entrada == '-' else detectar_formato(args.entrada)
+    if args.entrada == '-':
+        archivo = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+    else:
+        archivo = open(args.entrada, encoding='utf-8', newline='')
+    try:
+        resumen = componer_hojas(leer_trabajos_hoja(archivo, formato), args.salida, hoja,
+                                 args.compresion)
+    finally:
+        if args.entrada != '-':
+            archivo.close()
+
+    paginas = -(-resumen.total // hoja.por_pagina)
+    print(f"✓ {resumen.total} códigos en {paginas} hojas de {hoja.por_pagina} "
+          f"({hoja.columnas}x{hoja.filas}) en {resumen.segundos:.2f} s")
+    for fallido in resumen.fallidos:
+        print(f"✗ Código {fallido.indice}: {fallido.error}")
+    return 1 if resumen.fallidos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
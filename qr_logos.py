@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Caché de Logos para Códigos QR
+Decodifica cada logo una sola vez y guarda sus versiones redimensionadas,
+para que un lote de miles de códigos con el mismo logo no repita el
+Image.open ni el redimensionado LANCZOS en cada código
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+from PIL import Image
+
+
+def _bytes_imagen(img):
+    """Memoria aproximada que ocupa una imagen decodificada"""
+    return img.width * img.height * len(img.getbands())
+
+
+class CacheLogos:
+    """
+    Caché LRU de logos con límite de memoria
+
+    Guarda dos niveles: el logo decodificado, con clave (ruta, mtime), y el
+    logo ya redimensionado y listo para pegar, con clave (ruta, mtime,
+    tamaño, modo de pegado). Si el archivo cambia, su mtime cambia y las
+    entradas antiguas dejan de usarse hasta que el LRU las expulsa.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """
+        Args:
+            max_bytes (int): Memoria máxima ocupada por los logos guardados
+        """
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas = OrderedDict()
+        self._cerrojo = threading.Lock()
+
+    def _obtener(self, clave):
+        with self._cerrojo:
+            valor = self._entradas.get(clave)
+            if valor is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+            return valor
+
+    def _guardar(self, clave, valor, tamaño):
+        with self._cerrojo:
+            if clave in self._entradas or tamaño > self.max_bytes:
+                return
+            self._entradas[clave] = (valor, tamaño)
+            self.bytes += tamaño
+            while self.bytes > self.max_bytes:
+                _, (_, expulsado) = self._entradas.popitem(last=False)
+                self.bytes -= expulsado
+
+    def registrar_original(self, ruta, mtime, imagen):
+        """Añade un logo ya decodificado (p. ej. desde memoria compartida)"""
+        self._guardar(('original', ruta, mtime), imagen, _bytes_imagen(imagen))
+
+    def original(self, ruta):
+        """
+        Devuelve el logo decodificado, abriéndolo solo la primera vez
+
+        Raises:
+            FileNotFoundError: Si el logo no existe
+        """
+        mtime = os.stat(ruta).st_mtime_ns
+        entrada = self._obtener(('original', ruta, mtime))
+        if entrada is not None:
+            return entrada[0]
+        imagen = Image.open(ruta)
+        imagen.load()
+        self.registrar_original(ruta, mtime, imagen)
+        return imagen
+
+    def preparado(self, ruta, tamaño, con_transparencia=False, modo_destino='RGB'):
+        """
+        Devuelve el logo redimensionado y listo para pegar
+
+        Args:
+            ruta (str): Ruta de la imagen del logo
+            tamaño (int): Lado del logo en píxeles
+            con_transparencia (bool): Devolver también la máscara alfa
+            modo_destino (str): Modo de la imagen del QR donde se pegará
+
+        Returns:
+            tuple: (imagen, mascara) donde mascara es None si el logo se pega
+                   sin transparencia
+        """
+        mtime = os.stat(ruta).st_mtime_ns
+        clave = ('preparado', ruta, mtime, tamaño, con_transparencia, modo_destino)
+        entrada = self._obtener(clave)
+        if entrada is not None:
+            return entrada[0]
+
+        logo = self.original(ruta).resize((tamaño, tamaño), Image.Resampling.LANCZOS)
+        if con_transparencia and logo.mode == 'RGBA':
+            mascara = logo.getchannel('A')
+        else:
+            # Image.paste convierte al modo destino; hacerlo aquí evita
+            # repetir la conversión en cada código
+            logo, mascara = logo.convert(modo_destino), None
+        preparado = (logo, mascara)
+        tamaño_bytes = _bytes_imagen(logo) + (_bytes_imagen(mascara) if mascara else 0)
+        self._guardar(clave, preparado, tamaño_bytes)
+        return preparado
+
+    def limpiar(self):
+        """Vacía la caché"""
+        with self._cerrojo:
+            self._entradas.clear()
+            self.bytes = 0
+
+
+# Caché compartida por todos los renderizadores del proceso
+CACHE_LOGOS = CacheLogos()
+
+
+class LogosCompartidos:
+    """
+    Publica logos decodificados en memoria compartida para otros procesos
+
+    El proceso principal decodifica cada logo una vez; los trabajadores lo
+    leen de la memoria compartida sin volver a abrir el archivo.
+
+        with LogosCompartidos(['logo.png']) as descriptores:
+            ... pasar descriptores al inicializador de los trabajadores ...
+    """
+
+    def __init__(self, rutas, cache=CACHE_LOGOS):
+        self.descriptores = []
+        self._memorias = []
+        for ruta in dict.fromkeys(rutas):
+            imagen = cache.original(ruta)
+            datos = imagen.tobytes()
+            memoria = shared_memory.SharedMemory(create=True, size=max(len(datos), 1))
+            memoria.buf[:len(datos)] = datos
+            self._memorias.append(memoria)
+            paleta = imagen.palette.tobytes() if imagen.mode == 'P' else None
+            modo_paleta = imagen.palette.mode if imagen.mode == 'P' else None
+            self.descriptores.append({
+                'ruta': ruta,
+                'mtime': os.stat(ruta).st_mtime_ns,
+                'memoria': memoria.name,
+                'modo': imagen.mode,
+                'tamaño': imagen.size,
+                'paleta': paleta,
+                'modo_paleta': modo_paleta,
+                'info': {k: v for k, v in imagen.info.items() if k == 'transparency'},
+            })
+
+    def cerrar(self):
+        """Libera la memoria compartida"""
+        for memoria in self._memorias:
+            memoria.close()
+            memoria.unlink()
+        self._memorias = []
+
+    def __enter__(self):
+        return self.descriptores
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+# Memorias abiertas en este proceso; deben seguir vivas mientras se usen los logos
+_memorias_adjuntas = []
+
+
+def adjuntar_logos(descriptores, cache=CACHE_LOGOS):
+    """
+    Registra en la caché local los logos publicados por LogosCompartidos
+
+    Pensada como inicializador de los procesos trabajadores.
+    """
+    for descriptor in descriptores:
+        memoria = shared_memory.SharedMemory(name=descriptor['memoria'])
+        _memorias_adjuntas.append(memoria)
+        modo = descriptor['modo']
+        ancho, alto = descriptor['tamaño']
+        tamaño = len(Image.new(modo, (ancho, 1)).tobytes()) * alto
+        imagen = Image.frombuffer(modo, (ancho, alto), memoria.buf[:tamaño],
+                                  'raw', modo, 0, 1)
+        if descriptor['paleta'] is not None:
+            imagen.putpalette(descriptor['paleta'], descriptor['modo_paleta'])
+        imagen.info.update(descriptor['info'])
+        cache.registrar_original(descriptor['ruta'], descriptor['mtime'], imagen)
@@ -0,0 +1,753 @@
+#!/usr/bin/env python3
+"""
+Generador de Códigos QR por Lotes
+Reparte la generación de muchos códigos QR entre varios procesos,
+enviando el trabajo en bloques y conservando el orden de los resultados
+"""
+
+import argparse
+import json
+import logging
+import io
+import os
+import sys
+import time
+from collections import deque
+from itertools import islice
+
+from qr_metricas import (ColectorMetricas, ExportadorStatsD, ObservadoresMultiples,
+                         activar_metricas, crear_desde_descripcion, etapa,
+                         metricas_activas)
+
+
+# Tipo de trabajo -> (módulo, función generadora)
+GENERADORES = {
+    'simple': ('qr_generator', 'generar_qr_simple'),
+    'personalizado': ('qr_generator', 'generar_qr_personalizado'),
+    'logo': ('qr_generator', 'generar_qr_con_logo'),
+    'estilo': ('qr_generator_advanced', 'generar_qr_con_estilo'),
+    'gradiente': ('qr_generator_advanced', 'generar_qr_gradiente'),
+    'logo_estilo': ('qr_generator_advanced', 'generar_qr_con_logo_y_estilo'),
+    'preset': ('qr_presets', 'generar_qr_preset'),
+}
+
+# Tipos de trabajo cuyo generador admite correccion_auto
+TIPOS_CORRECCION_AUTO = ('personalizado', 'logo', 'logo_estilo')
+
+# Tipos de trabajo cuyo generador registra los errores del logo y devuelve
+# None salvo que se le pida propagar_errores
+TIPOS_CON_LOGO = ('logo', 'logo_estilo')
+
+
+class TrabajoInvalido(dict):
+    """
+    Fila de entrada que no se pudo convertir en trabajo
+
+    Conserva los campos leídos y el error de la fila. El lote la reporta
+    como trabajo fallido, sin reintentos, y sigue con el resto.
+    """
+
+    def __init__(self, fila, error):
+        """
+        Args:
+            fila (dict): Campos leídos de la fila ({} si no se pudo leer)
+            error (Exception): Error al leerla o normalizarla
+        """
+        super().__init__(fila if isinstance(fila, dict) else {})
+        self.error = f"{type(error).__name__}: {error}"
+
+
+class ResultadoTrabajo:
+    """Resultado de un trabajo individual dentro de un lote"""
+
+    __slots__ = ('indice', 'exito', 'error', 'intentos', 'segundos', 'trabajo', 'contenido',
+                 'verificado')
+
+    def __init__(self, indice, exito, error, intentos, segundos, trabajo=None,
+                 contenido=None, verificado=None):
+        self.indice = indice
+        self.exito = exito
+        self.error = error
+        self.intentos = intentos
+        self.segundos = segundos
+        self.trabajo = trabajo
+        # Imagen codificada, solo en los lotes generados en memoria
+        self.contenido = contenido
+        # True / False si se verificó la imagen (ver qr_verificacion), None si no
+        self.verificado = verificado
+
+    def __repr__(self):
+        estado = "ok" if self.exito else f"error={self.error!r}"
+        return f"ResultadoTrabajo(indice={self.indice}, {estado}, intentos={self.intentos})"
+
+
+class ResumenLote:
+    """Estadísticas de un lote terminado"""
+
+    def __init__(self):
+        self.total = 0
+        self.exitosos = 0
+        self.fallidos = []
+        self.omitidos = 0
+        self.verificados = 0
+        self.ilegibles = 0
+        self.segundos = 0.0
+
+    @property
+    def codigos_por_segundo(self):
+        return self.total / self.segundos if self.segundos else 0.0
+
+    def registrar(self, resultado):
+        self.total += 1
+        if resultado.exito:
+            self.exitosos += 1
+        else:
+            self.fallidos.append(resultado)
+        if resultado.verificado is not None:
+            self.verificados += 1
+            self.ilegibles += not resultado.verificado
+
+    def __str__(self):
+        texto = (f"{self.total} códigos en {self.segundos:.2f} s "
+                 f"({self.codigos_por_segundo:.1f} códigos/s), "
+                 f"{len(self.fallidos)} fallidos")
+        if self.omitidos:
+            texto += f", {self.omitidos} ya generados"
+        if self.verificados:
+            texto += f", {self.verificados} verificados ({self.ilegibles} ilegibles)"
+        return texto
+
+
+def _resolver_generador(tipo):
+    """Devuelve la función generadora asociada a un tipo de trabajo"""
+    try:
+        nombre_modulo, nombre_funcion = GENERADORES[tipo]
+    except KeyError:
+        raise ValueError(f"Tipo de trabajo desconocido: {tipo!r}") from None
+    modulo = __import__(nombre_modulo)
+    return getattr(modulo, nombre_funcion)
+
+
+def tipo_de(trabajo):
+    """Tipo de un trabajo: el indicado, 'preset' si nombra uno, o 'simple'"""
+    return trabajo.get('tipo') or ('preset' if 'preset' in trabajo else 'simple')
+
+
+def ejecutar_trabajo(trabajo, cache=None, atomico=False, en_memoria=False, matrices=False):
+    """
+    Ejecuta un único trabajo en el proceso actual
+
+    Args:
+        trabajo (dict): Argumentos del generador más la clave opcional 'tipo'
+                        (ver tipo_de)
+        cache (CacheResultados): Caché de resultados para el generador
+        atomico (bool): Escribir en un temporal y renombrarlo a nombre_archivo
+                        al terminar, para que un lote interrumpido nunca deje
+                        un archivo a medias con el nombre definitivo
+        en_memoria (bool): No escribir nada y devolver los bytes de la imagen;
+                           el formato sigue saliendo de la extensión de
+                           nombre_archivo
+        matrices (bool): Solo codificar, sin dibujar ni escribir nada, y
+                         devolver la matriz como registro de qr_contenedor
+
+    Returns:
+        bytes de la imagen si en_memoria, registro de la matriz si matrices,
+        o lo que devuelva el generador
+    """
+    opciones = dict(trabajo)
+    tipo = tipo_de(opciones)
+    opciones.pop('tipo', None)
+    if matrices:
+        from qr_contenedor import registro_matriz
+        from qr_entrada import codificar
+        return registro_matriz(codificar(dict(trabajo, tipo=tipo)), trabajo['datos'])
+    if cache is not None:
+        opciones['cache'] = cache
+    if tipo in TIPOS_CON_LOGO:
+        # Un logo que falta o no se puede leer debe contar como fallo
+        opciones['propagar_errores'] = True
+    generador = _resolver_generador(tipo)
+    destino = opciones.get('nombre_archivo')
+    if en_memoria:
+        if not isinstance(destino, str):
+            raise ValueError("El trabajo no indica nombre_archivo")
+        buffer = io.BytesIO()
+        buffer.name = destino
+        opciones['nombre_archivo'] = buffer
+        generador(**opciones)
+        return buffer.getvalue()
+    if not atomico or not isinstance(destino, str):
+        return generador(**opciones)
+
+    from qr_manifiesto import escritura_atomica
+    opciones['nombre_archivo'] = temporal = escritura_atomica(destino)
+    try:
+        resultado = generador(**opciones)
+        os.replace(temporal, destino)
+    except BaseException:
+        try:
+            os.unlink(temporal)
+        except FileNotFoundError:
+            pass
+        raise
+    return resultado
+
+
+def toca_verificar(indice, tasa):
+    """
+    Indica si el trabajo indice entra en la muestra de verificación
+
+    Se decide con un hash multiplicativo del índice, así que la muestra se
+    reparte por todo el lote y es la misma en cada ejecución.
+    """
+    return (indice * 0x9E3779B1) & 0xFFFFFFFF < tasa * 0x100000000
+
+
+def _verificar(trabajo, contenido, decodificador):
+    """Verifica la imagen de un trabajo terminado; devuelve (legible, error)"""
+    from qr_verificacion import verificar_trabajo
+    try:
+        with etapa('verificar'):
+            resultado = verificar_trabajo(trabajo, contenido, decodificador)
+    except Exception as e:
+        return False, f"Verificación: {type(e).__name__}: {e}"
+    if resultado is None:
+        return None, None
+    return resultado.legible, None if resultado.legible else f"Ilegible: {resultado}"
+
+
+# Caché de resultados de este proceso trabajador (ver _inicializar_trabajador)
+_cache_trabajador = None
+
+
+def _inicializar_trabajador(descriptores_logos, opciones_cache, metricas=None, presets=None):
+    """Inicializador de los procesos: logos compartidos, caché de resultados, métricas y presets"""
+    global _cache_trabajador
+    from qr_cache import CacheResultados
+    from qr_logos import adjuntar_logos
+    adjuntar_logos(descriptores_logos)
+    if opciones_cache is not None:
+        _cache_trabajador = CacheResultados(**opciones_cache)
+    if metricas is not None:
+        activar_metricas(crear_desde_descripcion(metricas))
+    if presets:
+        # Después de los logos: precalentar los redimensiona
+        from qr_presets import adoptar_presets
+        adoptar_presets(presets)
+
+
+def _procesar_bloque(bloque, reintentos, silencioso, cache=None, atomico=False,
+                     en_memoria=False, verificar=0.0, decodificador=None, matrices=False):
+    """Procesa un bloque de (indice, trabajo) dentro de un proceso trabajador"""
+    cache = cache if cache is not None else _cache_trabajador
+    resultados = []
+    # Los generadores informan de cada archivo con logging.info: en silencio
+    # se descartan esos mensajes sin tocar los avisos ni los errores
+    nivel_previo = logging.root.manager.disable
+    if silencioso:
+        logging.disable(logging.INFO)
+    try:
+        for indice, trabajo in bloque:
+            if isinstance(trabajo, TrabajoInvalido):
+                resultados.append((indice, False, trabajo.error, 1, 0.0, None, None))
+                continue
+            inicio = time.perf_counter()
+            error = contenido = None
+            for intento in range(1, reintentos + 2):
+                try:
+                    contenido = ejecutar_trabajo(trabajo, cache, atomico, en_memoria,
+                                                 matrices)
+                    if en_memoria and not contenido:
+                        raise ValueError("El generador no devolvió ninguna imagen")
+                    error = None
+                    break
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+            verificado = None
+            if error is None and verificar and toca_verificar(indice, verificar):
+                verificado, error = _verificar(trabajo, contenido if en_memoria else None,
+                                               decodificador)
+            resultados.append((indice, error is None, error, intento,
+                               time.perf_counter() - inicio,
+                               contenido if en_memoria else None, verificado))
+    finally:
+        logging.disable(nivel_previo)
+    return resultados
+
+
+def _procesar_bloque_trabajador(bloque, reintentos, silencioso, atomico, en_memoria,
+                                verificar, decodificador, matrices):
+    """Procesa un bloque en un proceso trabajador y recoge sus métricas y contadores de caché"""
+    crudos = _procesar_bloque(bloque, reintentos, silencioso, atomico=atomico,
+                              en_memoria=en_memoria, verificar=verificar,
+                              decodificador=decodificador, matrices=matrices)
+    observador = metricas_activas()
+    return (crudos, observador.recoger() if observador is not None else None,
+            _cache_trabajador.recoger_contadores() if _cache_trabajador is not None else None)
+
+
+def _dividir_en_bloques(iterable, tamaño_bloque):
+    """Agrupa un iterable en listas de como máximo tamaño_bloque elementos"""
+    iterador = iter(iterable)
+    while True:
+        bloque = list(islice(iterador, tamaño_bloque))
+        if not bloque:
+            return
+        yield bloque
+
+
+def _a_resultados(bloque, crudos):
+    """Convierte las tuplas devueltas por los trabajadores en ResultadoTrabajo"""
+    for (indice, trabajo), crudo in zip(bloque, crudos):
+        _, exito, error, intentos, segundos, contenido, verificado = crudo
+        yield ResultadoTrabajo(indice, exito, error, intentos, segundos,
+                               None if exito else trabajo, contenido, verificado)
+
+
+def iterar_lote(trabajos, workers=None, tamaño_bloque=64, reintentos=2,
+                silencioso=True, logos=(), cache=None, atomico=False, en_memoria=False,
+                verificar=0.0, decodificador=None, matrices=False, presets=None):
+    """
+    Genera un lote de códigos QR y produce los resultados en el orden de entrada
+
+    Los trabajos se consumen de forma perezosa: nunca hay más de
+    2 * workers bloques en vuelo, así que el iterable puede tener millones
+    de elementos sin cargarse entero en memoria.
+
+    Args:
+        trabajos (iterable): Diccionarios con 'tipo' y los argumentos del generador
+        workers (int): Número de procesos (por defecto, uno por núcleo).
+                       Con 1 se trabaja en el proceso actual
+        tamaño_bloque (int): Trabajos enviados a cada proceso por envío
+        reintentos (int): Reintentos por trabajo antes de marcarlo como fallido
+        silencioso (bool): Descartar los mensajes por archivo de los generadores
+        logos (iterable): Rutas de logos usados en el lote; se decodifican una
+                          vez y se comparten con los procesos en memoria compartida
+        cache (CacheResultados): Caché de resultados. Cada proceso crea la suya
+                                 con las mismas opciones, así que solo se
+                                 comparte el nivel en disco; sus aciertos y
+                                 fallos se suman a los de esta
+        atomico (bool): Escribir cada archivo en un temporal y renombrarlo
+                        (ver ejecutar_trabajo)
+        en_memoria (bool): No escribir archivos y devolver cada imagen
+                           codificada en ResultadoTrabajo.contenido
+        verificar (float): Fracción de los trabajos cuya imagen se comprueba
+                           (ver qr_verificacion); los ilegibles se marcan como
+                           fallidos. Con 0.01 se verifica uno de cada cien
+        decodificador: Nombre de un decodificador de qr_verificacion
+                       ('opencv', 'zbar') o función a nivel de módulo, para
+                       decodificar además las imágenes verificadas
+        matrices (bool): Solo codificar y devolver en ResultadoTrabajo.contenido
+                         el registro de cada matriz (ver qr_contenedor)
+        presets (dict): Presets que usa el lote (RegistroPresets.descripcion);
+                        cada proceso los registra y precalienta antes de
+                        empezar (ver qr_presets)
+
+    Si hay métricas activas (ver qr_metricas), cada proceso mide con un
+    observador equivalente y lo que recoge se suma al del proceso actual.
+    """
+    if not 0 <= verificar <= 1:
+        raise ValueError(f"Fracción de verificación fuera de rango (0-1): {verificar}")
+    if reintentos < 0:
+        raise ValueError(f"El número de reintentos no puede ser negativo: {reintentos}")
+    if verificar and matrices:
+        raise ValueError("Sin imágenes no hay nada que verificar")
+    en_memoria = en_memoria or matrices
+    if decodificador is not None:
+        from qr_verificacion import obtener_decodificador
+        obtener_decodificador(decodificador)
+    workers = workers or os.cpu_count() or 1
+    bloques = _dividir_en_bloques(enumerate(trabajos), tamaño_bloque)
+
+    if workers == 1:
+        if presets:
+            from qr_presets import adoptar_presets
+            adoptar_presets(presets)
+        for bloque in bloques:
+            yield from _a_resultados(bloque, _procesar_bloque(bloque, reintentos, silencioso,
+                                                              cache, atomico, en_memoria,
+                                                              verificar, decodificador,
+                                                              matrices))
+        return
+
+    # Importaciones diferidas: un lote en el proceso actual (o --help) no
+    # carga multiprocessing ni Pillow
+    from concurrent.futures import ProcessPoolExecutor
+    from qr_logos import LogosCompartidos
+    observador = metricas_activas()
+
+    def resultados_de(bloque, futuro):
+        crudos, estado, contadores = futuro.result()
+        if estado is not None:
+            observador.combinar(estado)
+        if contadores is not None:
+            cache.sumar_contadores(*contadores)
+        return _a_resultados(bloque, crudos)
+
+    with LogosCompartidos(logos) as descriptores, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_trabajador,
+                                initargs=(descriptores,
+                                          cache.opciones if cache else None,
+                                          observador.para_trabajador()
+                                          if observador else None,
+                                          presets)) as pool:
+        pendientes = deque()
+        for bloque in bloques:
+            futuro = pool.submit(_procesar_bloque_trabajador, bloque, reintentos, silencioso,
+                                 atomico, en_memoria, verificar, decodificador, matrices)
+            pendientes.append((bloque, futuro))
+            if len(pendientes) >= workers * 2:
+                yield from resultados_de(*pendientes.popleft())
+        while pendientes:
+            yield from resultados_de(*pendientes.popleft())
+
+
+def generar_lote(trabajos, workers=None, tamaño_bloque=64, reintentos=2,
+                 silencioso=True, al_progresar=None, cada=10000, logos=(), cache=None,
+                 manifiesto=None, fragmento=None, destino=None, verificar=0.0,
+                 decodificador=None, presets=None):
+    """
+    Genera un lote completo de códigos QR en paralelo
+
+    Args:
+        trabajos (iterable): Diccionarios con 'tipo' y los argumentos del generador
+        workers (int): Número de procesos (por defecto, uno por núcleo)
+        tamaño_bloque (int): Trabajos enviados a cada proceso por envío
+        reintentos (int): Reintentos por trabajo antes de marcarlo como fallido
+        silencioso (bool): Descartar los mensajes por archivo de los generadores
+        logos (iterable): Rutas de logos que se comparten entre los procesos
+        cache (CacheResultados): Caché de resultados para los datos repetidos
+        al_progresar (callable): Función llamada con el ResumenLote parcial
+                                 cada `cada` códigos
+        cada (int): Frecuencia de las llamadas a al_progresar
+        manifiesto (ManifiestoLote): Registro del lote (ver qr_manifiesto):
+                                     se saltan los trabajos ya terminados,
+                                     se anota el resultado de los demás y
+                                     cada archivo se escribe de forma atómica
+        fragmento (tuple): (indice, total) para generar solo el rango de
+                           claves de esta máquina (ver en_fragmento)
+        destino (DestinoArchivos): Guardar las imágenes en un ZIP, un TAR o
+                                   una carpeta repartida (ver qr_destinos)
+                                   con el nombre_archivo de cada trabajo, en
+                                   lugar de escribirlas los trabajadores; o
+                                   solo las matrices, en un contenedor .qrm.
+                                   El llamador lo cierra al terminar
+        verificar (float): Fracción de los trabajos cuya imagen se comprueba
+        decodificador: Decodificador para las imágenes verificadas (ver iterar_lote)
+        presets (dict): Presets a registrar y precalentar en cada proceso
+                        (ver iterar_lote)
+
+    Returns:
+        ResumenLote: Totales, trabajos fallidos y rendimiento del lote
+    """
+    if manifiesto is not None and destino is not None and not destino.reanudable:
+        raise ValueError(f"{type(destino).__name__} no se puede reanudar con un "
+                         "manifiesto; usa una carpeta repartida")
+    resumen = ResumenLote()
+    inicio = time.perf_counter()
+    # Posición en la entrada, clave y nombre de cada trabajo enviado; los
+    # resultados llegan en orden
+    en_vuelo = deque()
+    anotar = manifiesto is not None or destino is not None
+    filtrar = anotar or fragmento is not None
+    if filtrar:
+        trabajos = _con_claves(trabajos, manifiesto, fragmento, en_vuelo)
+    try:
+        for resultado in iterar_lote(trabajos, workers, tamaño_bloque, reintentos, silencioso,
+                                     logos, cache, atomico=manifiesto is not None,
+                                     en_memoria=destino is not None, verificar=verificar,
+                                     decodificador=decodificador,
+                                     matrices=destino is not None and destino.matrices,
+                                     presets=presets):
+            if filtrar:
+                resultado.indice, clave, nombre = en_vuelo.popleft()
+            resumen.registrar(resultado)
+            if anotar:
+                fila = (clave, nombre, resultado.exito, resultado.error,
+                        resultado.intentos, resultado.segundos)
+                if destino is not None and resultado.exito:
+                    # El manifiesto solo anota lo que el destino ya escribió
+                    destino.escribir(nombre, resultado.contenido,
+                                     fila if manifiesto is not None else None)
+                    resultado.contenido = None
+                elif manifiesto is not None:
+                    _registrar(manifiesto, destino, fila)
+                if manifiesto is not None and destino is not None:
+                    for fila in destino.confirmados():
+                        _registrar(manifiesto, destino, fila)
+            if al_progresar and resumen.total % cada == 0:
+                resumen.segundos = time.perf_counter() - inicio
+                al_progresar(resumen)
+        if destino is not None:
+            destino.sincronizar()
+    finally:
+        if manifiesto is not None:
+            if destino is not None:
+                for fila in destino.confirmados():
+                    _registrar(manifiesto, destino, fila)
+            manifiesto.vaciar()
+    resumen.segundos = time.perf_counter() - inicio
+    if manifiesto is not None:
+        resumen.omitidos = manifiesto.omitidos
+    return resumen
+
+
+def _registrar(manifiesto, destino, fila):
+    """Anota en el manifiesto una fila (clave, nombre, exito, error, intentos, segundos)"""
+    clave, nombre, exito, error, intentos, segundos = fila
+    if nombre:
+        salida = destino.ubicacion(nombre) if destino is not None else os.path.abspath(nombre)
+    else:
+        salida = None
+    manifiesto.registrar(clave, salida, exito, error, intentos, segundos)
+
+
+def _con_claves(trabajos, manifiesto, fragmento, en_vuelo):
+    """
+    Filtra los trabajos por fragmento y manifiesto
+
+    Anota en en_vuelo la posición en la entrada, la clave y el nombre de
+    cada trabajo que pasa, para que los resultados conserven el índice de
+    la entrada y no el de los trabajos que quedan tras filtrar.
+    """
+    from qr_manifiesto import clave_trabajo, en_fragmento
+    numerados = enumerate(trabajos)
+    if manifiesto is not None or fragmento is not None:
+        pares = ((clave_trabajo(trabajo), (indice, trabajo)) for indice, trabajo in numerados)
+    else:
+        pares = ((None, par) for par in numerados)
+    if fragmento is not None:
+        pares = (par for par in pares if en_fragmento(par[0], fragmento))
+    if manifiesto is not None:
+        pares = manifiesto.pendientes(pares)
+    for clave, (indice, trabajo) in pares:
+        en_vuelo.append((indice, clave, trabajo.get('nombre_archivo')))
+        yield trabajo
+
+
+def _con_valores(trabajos, valores, tipos=None):
+    """Completa los trabajos (solo los de esos tipos, si se indican) con valores por defecto"""
+    for trabajo in trabajos:
+        if isinstance(trabajo, TrabajoInvalido) or (tipos and tipo_de(trabajo) not in tipos):
+            yield trabajo
+        else:
+            yield dict(valores, **trabajo)
+
+
+def _con_logos_absolutos(trabajos, directorio):
+    """Resuelve el ruta_logo relativo de cada trabajo respecto a directorio"""
+    for trabajo in trabajos:
+        if trabajo.get('ruta_logo') and not isinstance(trabajo, TrabajoInvalido):
+            trabajo = dict(trabajo, ruta_logo=os.path.abspath(
+                os.path.join(directorio, trabajo['ruta_logo'])))
+        yield trabajo
+
+
+def leer_trabajos_jsonl(archivo):
+    """
+    Lee trabajos de un archivo JSONL, un objeto por línea
+
+    Una línea que no es un objeto JSON se produce como TrabajoInvalido, para
+    que falle ese trabajo y no el lote entero.
+    """
+    for numero, linea in enumerate(archivo, 1):
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            trabajo = json.loads(linea)
+        except ValueError as e:
+            yield TrabajoInvalido({}, ValueError(f"Línea {numero}: JSON no válido ({e})"))
+            continue
+        if not isinstance(trabajo, dict):
+            yield TrabajoInvalido({}, ValueError(f"Línea {numero}: no es un objeto JSON"))
+        else:
+            yield trabajo
+
+
+def main(argv=None):
+    """
+    Función principal
+    """
+    parser = argparse.ArgumentParser(
+        description="Genera códigos QR por lotes a partir de un archivo JSONL "
+                    "con un trabajo por línea")
+    parser.add_argument('trabajos', help="Archivo JSONL de trabajos ('-' para stdin)")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Número de procesos (por defecto, uno por núcleo)")
+    parser.add_argument('-b', '--bloque', type=int, default=64,
+                        help="Trabajos por envío a cada proceso")
+    parser.add_argument('-r', '--reintentos', type=int, default=2,
+                        help="Reintentos por trabajo fallido")
+    parser.add_argument('-d', '--directorio', default=None,
+                        help="Carpeta de salida de los códigos QR")
+    parser.add_argument('-l', '--logo', action='append', default=[],
+                        help="Logo usado por el lote, para decodificarlo una sola "
+                             "vez y compartirlo entre procesos (repetible)")
+    parser.add_argument('-c', '--cache', default=None, metavar='CARPETA',
+                        help="Carpeta de la caché de resultados: los datos repetidos "
+                             "se copian en lugar de volver a generarse")
+    parser.add_argument('--enlazar', action='store_true',
+                        help="Crear los duplicados de la caché como enlaces duros")
+    parser.add_argument('-z', '--compresion', type=int, choices=range(10), default=None,
+                        metavar='0-9',
+                        help="Nivel de compresión PNG de los trabajos que no lo indiquen "
+                             "(los bajos guardan más rápido)")
+    parser.add_argument('--compacto', action='store_true',
+                        help="Guardar cada código en el modo sin pérdida más pequeño "
+                             "(1 bit, paleta o RGB)")
+    parser.add_argument('--correccion-auto', action='store_true',
+                        help="Usar en los QR personalizados y con logo la corrección de "
+                             "errores más baja que deja margen, en lugar de H")
+    parser.add_argument('-P', '--presets', action='append', default=[], metavar='ARCHIVO',
+                        help="Archivo TOML o JSON de presets de estilo, que los trabajos "
+                             "eligen con 'preset'; se compilan y precalientan en cada "
+                             "proceso antes de empezar (repetible)")
+    parser.add_argument('-m', '--metricas', default=None, metavar='ARCHIVO',
+                        help="Medir cada etapa, mostrar el informe y guardar las métricas "
+                             "en formato de texto de Prometheus")
+    parser.add_argument('--statsd', default=None, metavar='HOST:PUERTO',
+                        help="Enviar las métricas a StatsD por UDP")
+    parser.add_argument('-M', '--manifiesto', default=None, metavar='ARCHIVO',
+                        help="Manifiesto SQLite del lote: al relanzarlo se saltan los "
+                             "trabajos ya generados")
+    parser.add_argument('-s', '--salida', default=None, metavar='DESTINO',
+                        help="Guardar el lote en un .zip, un .tar / .tar.gz o una carpeta "
+                             "repartida en subcarpetas por prefijo de hash, en lugar de "
+                             "un archivo por código en la carpeta de salida; con un .qrm "
+                             "se guardan solo las matrices de módulos, sin imágenes")
+    parser.add_argument('--niveles', type=int, default=1,
+                        help="Niveles de subcarpetas de la carpeta repartida")
+    parser.add_argument('-f', '--fragmento', default=None, metavar='I/N',
+                        help="Generar solo el fragmento I de N (desde 0) del rango de "
+                             "claves, para repartir el lote entre máquinas")
+    parser.add_argument('-V', '--verificar', type=float, default=0.0, metavar='FRACCIÓN',
+                        help="Comprobar que se pueden leer las imágenes de esta fracción "
+                             "de los trabajos (0.01 = uno de cada cien); los ilegibles "
+                             "cuentan como fallidos")
+    parser.add_argument('--decodificador', choices=('opencv', 'zbar'), default=None,
+                        help="Decodificar además las imágenes verificadas con OpenCV o ZBar")
+    args = parser.parse_args(argv)
+    if not 0 <= args.verificar <= 1:
+        parser.error("--verificar debe estar entre 0 y 1")
+    if args.reintentos < 0:
+        parser.error("--reintentos no puede ser negativo")
+    if args.decodificador:
+        from qr_verificacion import obtener_decodificador
+        try:
+            obtener_decodificador(args.decodificador)
+        except ImportError as e:
+            parser.error(str(e))
+    fragmento = None
+    if args.fragmento:
+        from qr_manifiesto import leer_fragmento
+        try:
+            fragmento = leer_fragmento(args.fragmento)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.statsd:
+        host_statsd, _, puerto_statsd = args.statsd.rpartition(':')
+        try:
+            puerto_statsd = int(puerto_statsd)
+        except ValueError:
+            puerto_statsd = 0
+        if not 0 < puerto_statsd < 65536:
+            parser.error(f"--statsd debe ser HOST:PUERTO con un puerto entre 1 y 65535, "
+                         f"no {args.statsd!r}")
+    if args.salida:
+        # Antes de abrir el manifiesto y el destino: abrir un .zip, un .tar o
+        # un .qrm los vacía
+        from qr_destinos import clase_destino
+        clase = clase_destino(os.path.abspath(args.salida))
+        if args.manifiesto and not clase.reanudable:
+            parser.error("--manifiesto solo puede reanudar una carpeta repartida, "
+                         "no un .zip, un .tar ni un .qrm")
+        if args.verificar and clase.matrices:
+            parser.error("--verificar necesita imágenes; un .qrm solo guarda matrices")
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    observadores = []
+    if args.metricas:
+        # Antes del chdir a la carpeta de salida
+        ruta_metricas = os.path.abspath(args.metricas)
+        colector = ColectorMetricas()
+        observadores.append(colector)
+    if args.statsd:
+        statsd = ExportadorStatsD(host_statsd or '127.0.0.1', puerto_statsd)
+        observadores.append(statsd)
+    if observadores:
+        activar_metricas(observadores[0] if len(observadores) == 1
+                         else ObservadoresMultiples(*observadores))
+
+    archivo = sys.stdin if args.trabajos == '-' else open(args.trabajos, encoding='utf-8')
+    logos = [os.path.abspath(logo) for logo in args.logo]
+    cache = None
+    if args.cache:
+        from qr_cache import CacheResultados
+        cache = CacheResultados(os.path.abspath(args.cache), enlazar=args.enlazar)
+    presets = None
+    if args.presets:
+        from qr_presets import PRESETS
+        try:
+            nombres = [nombre for ruta in args.presets for nombre in PRESETS.cargar(ruta)]
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        presets = PRESETS.descripcion(nombres)
+    manifiesto = None
+    if args.manifiesto:
+        from qr_manifiesto import ManifiestoLote
+        manifiesto = ManifiestoLote(os.path.abspath(args.manifiesto))
+    destino = None
+    if args.salida:
+        from qr_destinos import abrir_destino
+        destino = abrir_destino(os.path.abspath(args.salida), args.niveles)
+    # Los trabajos se leen después del chdir: sus logos se resuelven
+    # respecto a la carpeta desde la que se lanza el lote
+    directorio_inicial = os.getcwd()
+    if args.directorio:
+        os.makedirs(args.directorio, exist_ok=True)
+        os.chdir(args.directorio)
+
+    def informar(resumen):
+        print(f"… {resumen}", file=sys.stderr)
+
+    trabajos = _con_logos_absolutos(leer_trabajos_jsonl(archivo), directorio_inicial)
+    if args.compresion is not None:
+        trabajos = _con_valores(trabajos, {'compresion': args.compresion})
+    if args.compacto:
+        trabajos = _con_valores(trabajos, {'compacto': True})
+    if args.correccion_auto:
+        trabajos = _con_valores(trabajos, {'correccion_auto': True}, TIPOS_CORRECCION_AUTO)
+
+    try:
+        resumen = generar_lote(trabajos, args.workers, args.bloque,
+                               args.reintentos, al_progresar=informar,
+                               logos=logos, cache=cache, manifiesto=manifiesto,
+                               fragmento=fragmento, destino=destino,
+                               verificar=args.verificar, decodificador=args.decodificador,
+                               presets=presets)
+    finally:
+        if archivo is not sys.stdin:
+            archivo.close()
+        if destino is not None:
+            destino.cerrar()
+        if manifiesto is not None:
+            manifiesto.cerrar()
+
+    print(f"✓ Lote completado: {resumen}")
+    if cache is not None and cache.aciertos + cache.fallos:
+        print(f"  Caché: {cache.aciertos} aciertos, {cache.fallos} fallos")
+    for fallido in resumen.fallidos:
+        print(f"✗ Trabajo {fallido.indice}: {fallido.error}")
+    if args.statsd:
+        statsd.cerrar()
+    if args.metricas:
+        with open(ruta_metricas, 'w', encoding='utf-8') as salida:
+            salida.write(colector.prometheus())
+        print(colector.informe())
+        print(f"✓ Métricas guardadas en: {args.metricas}")
+    return 1 if resumen.fallidos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Manifiesto de Lotes de Códigos QR
+Registra en SQLite el hash de cada trabajo, su archivo de salida y su
+estado, para que un lote interrumpido se reanude saltándose lo ya generado
+y para repartir un mismo lote entre varias máquinas por rangos de clave
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from itertools import islice
+
+
+# Trabajos por consulta al buscar los que ya están terminados
+TAMAÑO_CONSULTA = 500
+
+
+def clave_trabajo(trabajo):
+    """
+    Calcula el hash de un trabajo
+
+    Args:
+        trabajo (dict): Trabajo del lote; el orden de sus claves no importa
+
+    Returns:
+        str: SHA-256 en hexadecimal
+    """
+    texto = json.dumps(trabajo, sort_keys=True, ensure_ascii=False,
+                       separators=(',', ':'), default=str)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def leer_fragmento(texto):
+    """
+    Interpreta un fragmento 'i/n' (el i-ésimo de n, contando desde 0)
+
+    Returns:
+        tuple: (indice, total)
+    """
+    try:
+        indice, total = (int(parte) for parte in texto.split('/'))
+    except ValueError:
+        raise ValueError(f"Fragmento no válido (se esperaba i/n): {texto!r}") from None
+    if not 0 <= indice < total:
+        raise ValueError(f"Fragmento fuera de rango: {texto!r}")
+    return indice, total
+
+
+def en_fragmento(clave, fragmento):
+    """
+    Indica si una clave cae en el fragmento pedido
+
+    El espacio de hashes se divide en rangos contiguos del mismo tamaño
+    según sus primeros 32 bits, así que cada máquina puede leer el mismo
+    archivo de trabajos y quedarse solo con su rango.
+
+    Args:
+        clave (str): Hash del trabajo (ver clave_trabajo)
+        fragmento (tuple): (indice, total)
+    """
+    indice, total = fragmento
+    return int(clave[:8], 16) * total >> 32 == indice
+
+
+class ManifiestoLote:
+    """
+    Registro persistente de los trabajos de un lote
+
+    Cada trabajo se guarda con su hash, la ruta de salida y el estado
+    ('ok' o 'error'). Al relanzar el lote con el mismo manifiesto, los
+    trabajos ya terminados se saltan. Las filas se escriben por tandas en
+    una sola transacción, así que el registro no frena la generación; si el
+    proceso muere se pierde como mucho la última tanda, y esos trabajos
+    simplemente se vuelven a generar.
+
+        with ManifiestoLote('lote.sqlite') as manifiesto:
+            generar_lote(trabajos, manifiesto=manifiesto)
+
+    Cada máquina de un lote repartido debe usar su propio manifiesto: SQLite
+    no admite escritores concurrentes sobre un disco de red.
+    """
+
+    def __init__(self, ruta, tamaño_tanda=1000, intervalo=1.0):
+        """
+        Args:
+            ruta (str): Archivo SQLite del manifiesto (se crea si no existe)
+            tamaño_tanda (int): Filas acumuladas antes de escribirlas
+            intervalo (float): Segundos máximos entre escrituras
+        """
+        self.ruta = ruta
+        self.tamaño_tanda = tamaño_tanda
+        self.intervalo = intervalo
+        self.omitidos = 0
+        self._pendientes = []
+        self._ultima_escritura = time.monotonic()
+        self._conexion = sqlite3.connect(ruta)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS trabajos ("
+            " clave TEXT PRIMARY KEY,"
+            " salida TEXT,"
+            " estado TEXT NOT NULL,"
+            " intentos INTEGER,"
+            " error TEXT,"
+            " segundos REAL,"
+            " fecha REAL"
+            ") WITHOUT ROWID")
+        self._conexion.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def terminados(self, claves):
+        """Devuelve el subconjunto de claves que ya se generaron correctamente"""
+        claves = list(claves)
+        terminados = set()
+        for inicio in range(0, len(claves), TAMAÑO_CONSULTA):
+            parte = claves[inicio:inicio + TAMAÑO_CONSULTA]
+            marcas = ','.join('?' * len(parte))
+            filas = self._conexion.execute(
+                f"SELECT clave FROM trabajos WHERE estado = 'ok' AND clave IN ({marcas})",
+                parte)
+            terminados.update(clave for clave, in filas)
+        return terminados
+
+    def pendientes(self, pares):
+        """
+        Filtra los trabajos que aún no se han generado
+
+        Consulta el manifiesto por bloques de TAMAÑO_CONSULTA, de modo que
+        un lote de millones de trabajos se recorre sin cargarlo en memoria.
+
+        Args:
+            pares (iterable): Tuplas (clave, trabajo)
+
+        Yields:
+            tuple: (clave, trabajo) de los trabajos no terminados; los demás
+                   se cuentan en self.omitidos
+        """
+        iterador = iter(pares)
+        while True:
+            bloque = list(islice(iterador, TAMAÑO_CONSULTA))
+            if not bloque:
+                return
+            terminados = self.terminados(clave for clave, _ in bloque)
+            for clave, trabajo in bloque:
+                if clave in terminados:
+                    self.omitidos += 1
+                else:
+                    yield clave, trabajo
+
+    def registrar(self, clave, salida, exito, error=None, intentos=1, segundos=0.0):
+        """
+        Anota el resultado de un trabajo
+
+        Args:
+            clave (str): Hash del trabajo
+            salida (str): Ruta del archivo generado
+            exito (bool): Si el trabajo terminó bien
+            error (str): Mensaje de error del trabajo fallido
+            intentos (int): Intentos realizados
+            segundos (float): Duración del trabajo
+        """
+        self._pendientes.append((clave, salida, 'ok' if exito else 'error',
+                                 intentos, error, segundos, time.time()))
+        if (len(self._pendientes) >= self.tamaño_tanda
+                or time.monotonic() - self._ultima_escritura >= self.intervalo):
+            self.vaciar()
+
+    def vaciar(self):
+        """Escribe las filas pendientes en una sola transacción"""
+        if self._pendientes:
+            with self._conexion:
+                self._conexion.executemany(
+                    "INSERT OR REPLACE INTO trabajos"
+                    " (clave, salida, estado, intentos, error, segundos, fecha)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)", self._pendientes)
+            self._pendientes.clear()
+        self._ultima_escritura = time.monotonic()
+
+    def estadisticas(self):
+        """Devuelve el número de trabajos por estado, sin contar los pendientes"""
+        filas = self._conexion.execute(
+            "SELECT estado, COUNT(*) FROM trabajos GROUP BY estado")
+        return dict(filas)
+
+    def fallidos(self):
+        """Produce (salida, error) de cada trabajo fallido"""
+        yield from self._conexion.execute(
+            "SELECT salida, error FROM trabajos WHERE estado = 'error' ORDER BY fecha")
+
+    def cerrar(self):
+        """Escribe lo pendiente y cierra la base de datos"""
+        if self._conexion is not None:
+            self.vaciar()
+            self._conexion.close()
+            self._conexion = None
+
+
+def escritura_atomica(nombre_archivo):
+    """
+    Ruta temporal para escribir nombre_archivo y renombrarlo al terminar
+
+    El temporal está en la misma carpeta (os.replace es atómico dentro del
+    mismo sistema de archivos), es oculto y conserva la extensión, de la que
+    depende el formato de salida.
+    """
+    carpeta, nombre = os.path.split(nombre_archivo)
+    base, extension = os.path.splitext(nombre)
+    return os.path.join(carpeta, f".{base}.{os.getpid()}.parcial{extension}")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Matriz Codificada de Códigos QR
+Separa la codificación (Reed-Solomon, ajuste de versión y elección de
+máscara) del dibujo: un mismo MatrizQR se puede renderizar en muchos
+estilos, o enviar a otros procesos, sin volver a codificar los datos
+"""
+
+import numpy as np
+import qrcode
+
+from qr_codificador import codificar_rapido
+
+
+# Nivel de corrección (valor de qrcode.constants) -> letra
+NOMBRES_CORRECCION = {
+    qrcode.constants.ERROR_CORRECT_L: 'L',
+    qrcode.constants.ERROR_CORRECT_M: 'M',
+    qrcode.constants.ERROR_CORRECT_Q: 'Q',
+    qrcode.constants.ERROR_CORRECT_H: 'H',
+}
+
+
+class MatrizQR:
+    """
+    Matriz de módulos de un código QR ya codificado, sin borde
+
+    Guarda los módulos empaquetados a 1 bit (unos 2 KB para una versión 25)
+    junto con la versión, la corrección de errores y la máscara, así que se
+    serializa con pickle casi sin coste. Todos los generadores y QRRenderer
+    la aceptan en lugar de los datos:
+
+        matriz = codificar_matriz("https://github.com")
+        generar_qr_con_estilo(matriz, "a.png", "circulo")
+        generar_qr_gradiente(matriz, "b.png", "radial")
+    """
+
+    __slots__ = ('bits', 'lado', 'version', 'correccion', 'mascara')
+
+    def __init__(self, bits, lado, version, correccion, mascara=None):
+        """
+        Args:
+            bits (bytes): Módulos empaquetados fila a fila (np.packbits), 1 = oscuro
+            lado (int): Módulos por lado (21 + 4 * (version - 1))
+            version (int): Versión del código (1-40)
+            correccion (int): Nivel de corrección de errores (qrcode.constants)
+            mascara (int): Patrón de máscara aplicado (0-7), o None si se desconoce
+        """
+        self.bits = bytes(bits)
+        self.lado = lado
+        self.version = version
+        self.correccion = correccion
+        self.mascara = mascara
+
+    @classmethod
+    def desde_modulos(cls, modulos, version, correccion, mascara=None):
+        """Crea la matriz a partir de qr.modules o de un array (lado, lado) de bool"""
+        matriz = np.asarray(modulos, dtype=bool)
+        return cls(np.packbits(matriz, axis=None).tobytes(), matriz.shape[0],
+                   version, correccion, mascara)
+
+    @classmethod
+    def desde_qrcode(cls, qr):
+        """Crea la matriz a partir de un qrcode.QRCode ya compilado con make()"""
+        return cls.desde_modulos(qr.modules, qr.version, qr.error_correction,
+                                 qr.mask_pattern)
+
+    def modulos(self):
+        """Devuelve los módulos como array (lado, lado) de bool, True en los oscuros"""
+        empaquetados = np.frombuffer(self.bits, dtype=np.uint8)
+        total = self.lado * self.lado
+        return np.unpackbits(empaquetados, count=total).view(bool).reshape(self.lado,
+                                                                           self.lado)
+
+    def a_qrcode(self, tamaño_caja=10, borde=4):
+        """
+        Devuelve un qrcode.QRCode con estos módulos, listo para make_image
+
+        Sirve para los dibujos que solo existen en qrcode (StyledPilImage,
+        SVG...). No vuelve a codificar nada.
+        """
+        qr = qrcode.QRCode(version=self.version, error_correction=self.correccion,
+                           box_size=tamaño_caja, border=borde,
+                           mask_pattern=self.mascara)
+        qr.modules = self.modulos().tolist()
+        qr.modules_count = self.lado
+        # make_image solo llama a make() si data_cache es None
+        qr.data_cache = self.bits
+        return qr
+
+    def __reduce__(self):
+        return (MatrizQR, (self.bits, self.lado, self.version, self.correccion,
+                           self.mascara))
+
+    def __eq__(self, otra):
+        if not isinstance(otra, MatrizQR):
+            return NotImplemented
+        return (self.bits, self.lado, self.version, self.correccion) == \
+            (otra.bits, otra.lado, otra.version, otra.correccion)
+
+    def __hash__(self):
+        return hash((self.bits, self.lado, self.version, self.correccion))
+
+    def __repr__(self):
+        nivel = NOMBRES_CORRECCION.get(self.correccion, self.correccion)
+        return (f"MatrizQR(version={self.version}, correccion={nivel}, "
+                f"mascara={self.mascara}, lado={self.lado})")
+
+
+def codificar_matriz(datos, correccion=qrcode.constants.ERROR_CORRECT_H,
+                     version=None, mascara=None, motor='numpy'):
+    """
+    Codifica los datos una sola vez y devuelve la matriz de módulos
+
+    Con motor='numpy' se usa qr_codificador, que da la misma matriz que
+    qrcode en una fracción del tiempo; 'qrcode' usa QRCode.make tal cual.
+
+    Args:
+        datos (str): Texto o URL para codificar
+        correccion (int): Nivel de corrección de errores (qrcode.constants)
+        version (int): Versión fija, o None para la menor en la que quepan
+        mascara (int): Patrón de máscara fijo (0-7), o None para el de menor
+                       penalización (el criterio de qrcode)
+        motor (str): 'numpy' o 'qrcode'
+
+    Returns:
+        MatrizQR: Matriz codificada
+    """
+    if motor == 'numpy':
+        modulos, version, mascara = codificar_rapido(datos, correccion, version, mascara)
+        return MatrizQR.desde_modulos(modulos, version, correccion, mascara)
+    if motor != 'qrcode':
+        raise ValueError(f"Motor de codificación desconocido: {motor!r}")
+
+    qr = qrcode.QRCode(version=version, error_correction=correccion,
+                       mask_pattern=mascara)
+    qr.add_data(datos)
+    if version is None:
+        qr.best_fit()
+    if mascara is None:
+        mascara = qr.best_mask_pattern()
+    qr.makeImpl(False, mascara)
+    return MatrizQR.desde_modulos(qr.modules, qr.version, correccion, mascara)
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Métricas de Generación de Códigos QR
+Ganchos opcionales en todas las etapas de los generadores (codificar,
+dibujar, pegar el logo, guardar, consultar la caché) que registran
+tiempos, bytes escritos, aciertos de caché y la versión elegida. Un
+colector propio los exporta en el formato de texto de Prometheus y otro
+los envía por UDP a StatsD. Desactivadas, cada etapa cuesta una llamada
+a función:
+
+    colector = activar_metricas()
+    generar_qr_con_estilo("https://github.com", "a.png", "circulo")
+    print(colector.informe())
+"""
+
+import bisect
+import contextlib
+import os
+import socket
+import threading
+import time
+
+
+# Límites (en segundos) de los cubos del histograma de tiempos por etapa
+CUBOS_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                  2.5)
+
+# Observador usado por los generadores (None: métricas desactivadas)
+OBSERVADOR = None
+
+_NULO = contextlib.nullcontext()
+
+
+class ObservadorMetricas:
+    """
+    Interfaz de los ganchos de métricas
+
+    Las subclases redefinen los métodos que les interesen; todos se pueden
+    llamar desde varios hilos a la vez (el pipeline de qr_entrada tiene un
+    hilo por etapa).
+    """
+
+    def etapa(self, nombre, segundos):
+        """Una etapa ('codificar', 'dibujar', 'logo', 'vectorial', 'guardar', 'cache') terminó"""
+
+    def version(self, version):
+        """Se codificó un código de la versión indicada"""
+
+    def salida(self, bytes_escritos, desde_cache):
+        """Se escribió un código (bytes_escritos es None si no se conoce)"""
+
+    def para_trabajador(self):
+        """
+        Descripción (picklable) para crear el observador equivalente en los
+        procesos de qr_lote, o None para no medir en ellos
+        """
+        return None
+
+    def recoger(self):
+        """En un proceso trabajador: envía lo pendiente y devuelve lo que haya que combinar"""
+        return None
+
+    def combinar(self, estado):
+        """Suma lo recogido en un proceso trabajador"""
+
+
+class _Cronometro:
+    """Gestor de contexto que informa al observador del tiempo de una etapa"""
+
+    __slots__ = ('observador', 'nombre', 'inicio')
+
+    def __init__(self, observador, nombre):
+        self.observador = observador
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.observador.etapa(self.nombre, time.perf_counter() - self.inicio)
+        return False
+
+
+def etapa(nombre):
+    """
+    Mide el bloque `with` como la etapa indicada
+
+    Sin métricas activas devuelve un contexto nulo compartido.
+    """
+    if OBSERVADOR is None:
+        return _NULO
+    return _Cronometro(OBSERVADOR, nombre)
+
+
+def registrar_version(version):
+    """Informa de la versión de un código recién codificado"""
+    if OBSERVADOR is not None:
+        OBSERVADOR.version(version)
+
+
+def registrar_salida(destino, contenido=None, desde_cache=False):
+    """
+    Informa de un código escrito en el destino
+
+    Args:
+        destino: Destino de la escritura (ver qr_salida)
+        contenido: Bytes escritos o su número (lo que devuelve
+                   qr_salida.escribir_bytes), si se conocen; si no, en las
+                   rutas se mira el tamaño del archivo
+        desde_cache (bool): Si el resultado salió de la caché
+    """
+    if OBSERVADOR is None:
+        return
+    if isinstance(contenido, int):
+        escritos = contenido
+    elif contenido is not None:
+        escritos = len(contenido)
+    elif isinstance(destino, (str, os.PathLike)):
+        escritos = os.path.getsize(destino)
+    else:
+        escritos = None
+    OBSERVADOR.salida(escritos, desde_cache)
+
+
+class ColectorMetricas(ObservadorMetricas):
+    """
+    Acumula las métricas en memoria, como un perfilador siempre activo por etapas
+
+    Guarda por etapa el número de llamadas, el tiempo total y máximo y un
+    histograma; además, los códigos por versión y los escritos, bytes y
+    aciertos de caché.
+    """
+
+    def __init__(self, cubos=CUBOS_SEGUNDOS):
+        """
+        Args:
+            cubos (tuple): Límites superiores en segundos del histograma
+        """
+        self.cubos = tuple(cubos)
+        self._cerrojo = threading.Lock()
+        self.limpiar()
+
+    def limpiar(self):
+        """Pone todos los contadores a cero"""
+        with self._cerrojo:
+            # etapa -> [llamadas, segundos, máximo, cuentas por cubo (+Inf al final)]
+            self.etapas = {}
+            self.versiones = {}
+            self.generados = 0
+            self.desde_cache = 0
+            self.bytes_escritos = 0
+
+    def etapa(self, nombre, segundos):
+        cubo = bisect.bisect_left(self.cubos, segundos)
+        with self._cerrojo:
+            datos = self.etapas.get(nombre)
+            if datos is None:
+                datos = self.etapas[nombre] = [0, 0.0, 0.0, [0] * (len(self.cubos) + 1)]
+            datos[0] += 1
+            datos[1] += segundos
+            datos[2] = max(datos[2], segundos)
+            datos[3][cubo] += 1
+
+    def version(self, version):
+        with self._cerrojo:
+            self.versiones[version] = self.versiones.get(version, 0) + 1
+
+    def salida(self, bytes_escritos, desde_cache):
+        with self._cerrojo:
+            if desde_cache:
+                self.desde_cache += 1
+            else:
+                self.generados += 1
+            self.bytes_escritos += bytes_escritos or 0
+
+    def estado(self):
+        """Copia picklable de todos los contadores"""
+        with self._cerrojo:
+            return {
+                'etapas': {nombre: [d[0], d[1], d[2], list(d[3])]
+                           for nombre, d in self.etapas.items()},
+                'versiones': dict(self.versiones),
+                'generados': self.generados,
+                'desde_cache': self.desde_cache,
+                'bytes_escritos': self.bytes_escritos,
+            }
+
+    def para_trabajador(self):
+        return ('colector', self.cubos)
+
+    def recoger(self):
+        estado = self.estado()
+        self.limpiar()
+        return estado
+
+    def combinar(self, estado):
+        with self._cerrojo:
+            for nombre, (llamadas, segundos, maximo, cuentas) in estado['etapas'].items():
+                datos = self.etapas.get(nombre)
+                if datos is None:
+                    datos = self.etapas[nombre] = [0, 0.0, 0.0, [0] * (len(self.cubos) + 1)]
+                datos[0] += llamadas
+                datos[1] += segundos
+                datos[2] = max(datos[2], maximo)
+                datos[3] = [a + b for a, b in zip(datos[3], cuentas)]
+            for version, cuenta in estado['versiones'].items():
+                self.versiones[version] = self.versiones.get(version, 0) + cuenta
+            self.generados += estado['generados']
+            self.desde_cache += estado['desde_cache']
+            self.bytes_escritos += estado['bytes_escritos']
+
+    def prometheus(self, prefijo='qr'):
+        """
+        Devuelve las métricas en el formato de texto de Prometheus
+
+        Sirve para el endpoint /metrics de un servicio o para el colector
+        de archivos de texto de node_exporter.
+        """
+        estado = self.estado()
+        lineas = [f"# HELP {prefijo}_etapa_segundos Tiempo de cada etapa de generación",
+                  f"# TYPE {prefijo}_etapa_segundos histogram"]
+        for nombre, (llamadas, segundos, _, cuentas) in sorted(estado['etapas'].items()):
+            acumulado = 0
+            for limite, cuenta in zip(self.cubos + ('+Inf',), cuentas):
+                acumulado += cuenta
+                lineas.append(f'{prefijo}_etapa_segundos_bucket{{etapa="{nombre}",'
+                              f'le="{limite}"}} {acumulado}')
+            lineas.append(f'{prefijo}_etapa_segundos_sum{{etapa="{nombre}"}} {segundos!r}')
+            lineas.append(f'{prefijo}_etapa_segundos_count{{etapa="{nombre}"}} {llamadas}')
+
+        lineas += [f"# HELP {prefijo}_codigos_escritos_total Códigos escritos, "
+                   f"generados o copiados de la caché",
+                   f"# TYPE {prefijo}_codigos_escritos_total counter",
+                   f'{prefijo}_codigos_escritos_total{{origen="generado"}} '
+                   f'{estado["generados"]}',
+                   f'{prefijo}_codigos_escritos_total{{origen="cache"}} '
+                   f'{estado["desde_cache"]}',
+                   f"# HELP {prefijo}_bytes_escritos_total Bytes de imagen escritos",
+                   f"# TYPE {prefijo}_bytes_escritos_total counter",
+                   f"{prefijo}_bytes_escritos_total {estado['bytes_escritos']}",
+                   f"# HELP {prefijo}_codigos_codificados_total Códigos codificados por versión",
+                   f"# TYPE {prefijo}_codigos_codificados_total counter"]
+        for version, cuenta in sorted(estado['versiones'].items()):
+            lineas.append(f'{prefijo}_codigos_codificados_total{{version="{version}"}} {cuenta}')
+        return '\n'.join(lineas) + '\n'
+
+    def informe(self):
+        """Tabla legible con el tiempo de cada etapa, al estilo de pstats"""
+        estado = self.estado()
+        total = sum(d[1] for d in estado['etapas'].values()) or 1.0
+        lineas = [f"{'etapa':<12} {'llamadas':>9} {'total':>10} {'media':>10} "
+                  f"{'máximo':>10} {'%':>6}"]
+        for nombre, (llamadas, segundos, maximo, _) in sorted(
+                estado['etapas'].items(), key=lambda elemento: -elemento[1][1]):
+            lineas.append(f"{nombre:<12} {llamadas:>9} {segundos:>9.3f}s "
+                          f"{segundos / llamadas * 1000:>8.3f}ms {maximo * 1000:>8.3f}ms "
+                          f"{segundos / total:>6.1%}")
+        versiones = ', '.join(f"v{v}: {c}" for v, c in sorted(estado['versiones'].items()))
+        lineas.append(f"Códigos: {estado['generados']} generados, "
+                      f"{estado['desde_cache']} desde la caché, "
+                      f"{estado['bytes_escritos']} bytes escritos")
+        if versiones:
+            lineas.append(f"Versiones: {versiones}")
+        return '\n'.join(lineas)
+
+
+class ExportadorStatsD(ObservadorMetricas):
+    """
+    Envía las métricas a un servidor StatsD por UDP
+
+    Las líneas se agrupan en paquetes de hasta tamaño_paquete bytes, y lo
+    pendiente se envía como mucho cada `intervalo` segundos o al llamar a
+    vaciar(); así un código no cuesta un paquete por métrica. Si no hay
+    servidor escuchando los envíos se descartan sin error.
+    """
+
+    def __init__(self, host='127.0.0.1', puerto=8125, prefijo='qr', tamaño_paquete=1432,
+                 intervalo=1.0):
+        """
+        Args:
+            host (str): Servidor StatsD
+            puerto (int): Puerto UDP
+            prefijo (str): Prefijo de los nombres de métrica
+            tamaño_paquete (int): Bytes máximos por datagrama (1432 cabe en
+                                  una MTU de Ethernet)
+            intervalo (float): Segundos máximos que una métrica espera a enviarse
+        """
+        self.host = host
+        self.puerto = puerto
+        self.prefijo = prefijo
+        self.tamaño_paquete = tamaño_paquete
+        self.intervalo = intervalo
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._pendiente = []
+        self._bytes_pendientes = 0
+        self._ultimo_envio = time.monotonic()
+        self._cerrojo = threading.Lock()
+
+    def _enviar(self, *lineas):
+        with self._cerrojo:
+            for linea in lineas:
+                linea = linea.encode('ascii')
+                if self._bytes_pendientes + len(linea) + 1 > self.tamaño_paquete:
+                    self._vaciar()
+                self._pendiente.append(linea)
+                self._bytes_pendientes += len(linea) + 1
+            if time.monotonic() - self._ultimo_envio >= self.intervalo:
+                self._vaciar()
+
+    def _vaciar(self):
+        if self._pendiente:
+            try:
+                self._socket.sendto(b'\n'.join(self._pendiente), (self.host, self.puerto))
+            except OSError:
+                pass
+        self._pendiente = []
+        self._bytes_pendientes = 0
+        self._ultimo_envio = time.monotonic()
+
+    def vaciar(self):
+        """Envía ya las métricas pendientes"""
+        with self._cerrojo:
+            self._vaciar()
+
+    def cerrar(self):
+        """Envía lo pendiente y cierra el socket"""
+        self.vaciar()
+        self._socket.close()
+
+    def etapa(self, nombre, segundos):
+        self._enviar(f"{self.prefijo}.etapa.{nombre}:{segundos * 1000:.3f}|ms")
+
+    def version(self, version):
+        self._enviar(f"{self.prefijo}.version.{version}:1|c")
+
+    def salida(self, bytes_escritos, desde_cache):
+        origen = 'cache' if desde_cache else 'generado'
+        lineas = [f"{self.prefijo}.codigos.{origen}:1|c"]
+        if bytes_escritos:
+            lineas.append(f"{self.prefijo}.bytes:{bytes_escritos}|c")
+        self._enviar(*lineas)
+
+    def para_trabajador(self):
+        return ('statsd', (self.host, self.puerto, self.prefijo, self.tamaño_paquete,
+                           self.intervalo))
+
+    def recoger(self):
+        # Cada proceso envía lo suyo directamente: no hay nada que combinar
+        self.vaciar()
+        return None
+
+
+class ObservadoresMultiples(ObservadorMetricas):
+    """Reparte cada métrica entre varios observadores (por ejemplo, colector y StatsD)"""
+
+    def __init__(self, *observadores):
+        self.observadores = observadores
+
+    def etapa(self, nombre, segundos):
+        for observador in self.observadores:
+            observador.etapa(nombre, segundos)
+
+    def version(self, version):
+        for observador in self.observadores:
+            observador.version(version)
+
+    def salida(self, bytes_escritos, desde_cache):
+        for observador in self.observadores:
+            observador.salida(bytes_escritos, desde_cache)
+
+    def para_trabajador(self):
+        return ('multiples', [observador.para_trabajador() for observador in self.observadores])
+
+    def recoger(self):
+        return [observador.recoger() for observador in self.observadores]
+
+    def combinar(self, estado):
+        for observador, parte in zip(self.observadores, estado):
+            if parte is not None:
+                observador.combinar(parte)
+
+
+def crear_desde_descripcion(descripcion):
+    """Crea en un proceso trabajador el observador descrito por para_trabajador()"""
+    if descripcion is None:
+        return None
+    tipo, argumentos = descripcion
+    if tipo == 'colector':
+        return ColectorMetricas(argumentos)
+    if tipo == 'statsd':
+        return ExportadorStatsD(*argumentos)
+    if tipo == 'multiples':
+        # Los que no se propagan se sustituyen por uno que no hace nada
+        return ObservadoresMultiples(*(crear_desde_descripcion(parte) or ObservadorMetricas()
+                                       for parte in argumentos))
+    raise ValueError(f"Descripción de métricas desconocida: {tipo!r}")
+
+
+def activar_metricas(observador=None):
+    """
+    Activa las métricas para todos los generadores del proceso
+
+    Args:
+        observador (ObservadorMetricas): Gancho que recibe las métricas (por
+                                         defecto, un ColectorMetricas nuevo)
+
+    Returns:
+        ObservadorMetricas: El observador activado
+    """
+    global OBSERVADOR
+    OBSERVADOR = observador if observador is not None else ColectorMetricas()
+    return OBSERVADOR
+
+
+def desactivar_metricas():
+    """Deja de medir los generadores"""
+    global OBSERVADOR
+    OBSERVADOR = None
+
+
+def metricas_activas():
+    """Devuelve el observador activado con activar_metricas, o None"""
+    return OBSERVADOR
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Presets de Estilo para Códigos QR
+Da nombre a aspectos completos (estilo de módulo, colores o gradiente, logo,
+borde, tamaño y corrección) que se cargan de un archivo TOML o JSON. Cada
+preset se compila una sola vez en un QRRenderer con los colores ya
+interpretados y los drawers y máscaras creados, y precalentar() deja en
+caché los sellos, gradientes y logos que usa, así que un trabajo que solo
+indica preset="marca_a" no repite nada de esa preparación
+"""
+
+import inspect
+import json
+import logging
+import os
+import time
+
+import qrcode
+
+from qr_matriz import NOMBRES_CORRECCION, codificar_matriz
+from qr_renderer import QRRenderer, obtener_renderer
+from qr_salida import nombre_destino
+
+
+registro = logging.getLogger(__name__)
+
+# Presets incluidos: los aspectos de demo_estilos.py
+PRESETS_INCLUIDOS = {
+    'cuadrado': {'estilo_modulo': 'cuadrado', 'color_frente': 'navy',
+                 'color_fondo': 'lightblue'},
+    'cuadrado_gap': {'estilo_modulo': 'cuadrado_gap', 'color_frente': 'darkgreen',
+                     'color_fondo': 'lightgreen'},
+    'circulo': {'estilo_modulo': 'circulo', 'color_frente': 'darkred',
+                'color_fondo': 'lightyellow'},
+    'redondeado': {'estilo_modulo': 'redondeado', 'color_frente': 'purple',
+                   'color_fondo': 'lavender'},
+    'barras_v': {'estilo_modulo': 'barras_v', 'color_frente': 'darkorange',
+                 'color_fondo': 'lightyellow'},
+    'barras_h': {'estilo_modulo': 'barras_h', 'color_frente': 'darkblue',
+                 'color_fondo': 'lightcyan'},
+    'gradiente_radial': {'tipo_gradiente': 'radial', 'color_centro': 'blue',
+                         'color_borde': 'purple', 'estilo_modulo': 'redondeado'},
+    'gradiente_horizontal': {'tipo_gradiente': 'horizontal', 'color_centro': 'red',
+                             'color_borde': 'orange', 'estilo_modulo': 'circulo'},
+    'gradiente_vertical': {'tipo_gradiente': 'vertical', 'color_centro': 'green',
+                           'color_borde': 'yellow', 'estilo_modulo': 'redondeado'},
+    'gradiente_cuadrado': {'tipo_gradiente': 'cuadrado', 'color_centro': 'navy',
+                           'color_borde': 'cyan', 'estilo_modulo': 'cuadrado_gap'},
+}
+
+# Opciones que admite un preset: las de QRRenderer
+OPCIONES_PRESET = tuple(inspect.signature(QRRenderer).parameters)
+
+# Nombres alternativos de las opciones (las claves sin comillas de TOML
+# solo pueden ser ASCII)
+ALIAS_OPCIONES = {
+    'tamano_caja': 'tamaño_caja',
+    'caja': 'tamaño_caja',
+    'estilo': 'estilo_modulo',
+    'gradiente': 'tipo_gradiente',
+    'logo': 'ruta_logo',
+}
+
+# Letra -> nivel de corrección, para los archivos de presets
+CORRECCIONES = {letra: nivel for nivel, letra in NOMBRES_CORRECCION.items()}
+CORRECCIONES['AUTO'] = 'auto'
+
+# Versiones que dibuja precalentar(): cubren la mayoría de URLs y textos cortos
+VERSIONES_PRECALENTAR = tuple(range(1, 11))
+
+
+def normalizar_preset(nombre, opciones, directorio=None):
+    """
+    Comprueba las opciones de un preset y las deja listas para QRRenderer
+
+    Args:
+        nombre (str): Nombre del preset, para los mensajes de error
+        opciones (dict): Opciones de QRRenderer (admite los alias de
+                         ALIAS_OPCIONES); 'correccion' admite también 'L', 'M',
+                         'Q', 'H' o 'auto', y los colores, listas RGB
+        directorio (str): Carpeta respecto a la que se resuelve ruta_logo
+
+    Returns:
+        dict: Opciones con valores inmutables (sirven de clave de caché)
+    """
+    opciones = {ALIAS_OPCIONES.get(clave, clave): valor for clave, valor in opciones.items()}
+    desconocidas = set(opciones) - set(OPCIONES_PRESET)
+    if desconocidas:
+        raise ValueError(f"Opciones desconocidas en el preset {nombre!r}: "
+                         f"{', '.join(sorted(desconocidas))}")
+    perfil = {}
+    for clave, valor in opciones.items():
+        if isinstance(valor, list):
+            valor = tuple(valor)
+        perfil[clave] = valor
+    if isinstance(perfil.get('correccion'), str):
+        nivel = perfil['correccion'].upper()
+        if nivel not in CORRECCIONES:
+            raise ValueError(f"Corrección de errores desconocida en el preset {nombre!r}: "
+                             f"{perfil['correccion']!r}")
+        perfil['correccion'] = CORRECCIONES[nivel]
+    if perfil.get('ruta_logo'):
+        perfil['ruta_logo'] = os.path.abspath(os.path.join(directorio or '',
+                                                           perfil['ruta_logo']))
+    return perfil
+
+
+def leer_archivo_presets(ruta):
+    """
+    Lee un archivo de presets TOML o JSON: una tabla (u objeto) por preset
+
+        [marca_a]
+        estilo_modulo = "redondeado"
+        color_frente = "#1A237E"
+        ruta_logo = "logos/marca_a.png"
+        tamano_caja = 8
+        correccion = "auto"
+
+    Returns:
+        dict: Nombre -> opciones, con las rutas de logo ya resueltas
+    """
+    if ruta.endswith('.toml'):
+        try:
+            import tomllib
+        except ModuleNotFoundError:
+            # Python < 3.11
+            import tomli as tomllib
+        with open(ruta, 'rb') as archivo:
+            contenido = tomllib.load(archivo)
+    else:
+        with open(ruta, encoding='utf-8') as archivo:
+            contenido = json.load(archivo)
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    presets = {}
+    for nombre, opciones in contenido.items():
+        if not isinstance(opciones, dict):
+            raise ValueError(f"El preset {nombre!r} de {ruta} no es una tabla de opciones")
+        presets[nombre] = normalizar_preset(nombre, opciones, directorio)
+    return presets
+
+
+class RegistroPresets:
+    """
+    Presets con nombre y su QRRenderer ya compilado
+
+    Los renderers salen de obtener_renderer, así que los generadores y los
+    módulos que piden el mismo perfil (hojas, animaciones, verificación)
+    usan la misma instancia compilada.
+    """
+
+    def __init__(self, presets=None):
+        """
+        Args:
+            presets (dict): Nombre -> opciones de QRRenderer iniciales
+        """
+        self._perfiles = {}
+        self._compilados = {}
+        for nombre, opciones in (presets or {}).items():
+            self.registrar(nombre, **opciones)
+
+    def __contains__(self, nombre):
+        return nombre in self._perfiles
+
+    def __iter__(self):
+        return iter(self._perfiles)
+
+    def __len__(self):
+        return len(self._perfiles)
+
+    def registrar(self, nombre, **opciones):
+        """
+        Añade (o sustituye) un preset y lo compila
+
+        Returns:
+            QRRenderer: El renderer compilado del preset
+        """
+        perfil = normalizar_preset(nombre, opciones)
+        try:
+            renderer = obtener_renderer(**perfil)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Preset {nombre!r}: {e}") from None
+        self._perfiles[nombre] = perfil
+        self._compilados[nombre] = renderer
+        return renderer
+
+    def cargar(self, ruta):
+        """
+        Registra los presets de un archivo TOML o JSON (ver leer_archivo_presets)
+
+        Returns:
+            list: Nombres de los presets cargados
+        """
+        presets = leer_archivo_presets(ruta)
+        for nombre, perfil in presets.items():
+            self.registrar(nombre, **perfil)
+        return list(presets)
+
+    def perfil(self, nombre):
+        """Devuelve una copia de las opciones de QRRenderer del preset"""
+        if nombre not in self._perfiles:
+            raise ValueError(f"Preset desconocido: {nombre!r}")
+        return dict(self._perfiles[nombre])
+
+    def renderer(self, nombre):
+        """Devuelve el QRRenderer compilado del preset"""
+        try:
+            return self._compilados[nombre]
+        except KeyError:
+            raise ValueError(f"Preset desconocido: {nombre!r}") from None
+
+    def descripcion(self, nombres=None):
+        """
+        Presets en un dict que se puede enviar a otros procesos
+
+        Args:
+            nombres (iterable): Presets a incluir; None para todos
+        """
+        nombres = self._perfiles if nombres is None else nombres
+        return {nombre: self.perfil(nombre) for nombre in nombres}
+
+    def precalentar(self, nombres=None, versiones=VERSIONES_PRECALENTAR):
+        """
+        Dibuja un código de cada versión con cada preset para llenar las cachés
+
+        Deja preparados los sellos de los estilos, los campos de gradiente y
+        los logos redimensionados de esos tamaños, de modo que el primer
+        código real de cada preset ya no paga esa preparación.
+
+        Args:
+            nombres (iterable): Presets a precalentar; None para todos
+            versiones (iterable): Versiones de código a dibujar
+
+        Returns:
+            float: Segundos empleados
+        """
+        inicio = time.perf_counter()
+        for nombre in (list(self._perfiles) if nombres is None else nombres):
+            renderer = self.renderer(nombre)
+            # Con 'auto' el logo se mide como con H, el nivel de los datos más exigentes
+            correccion = (qrcode.constants.ERROR_CORRECT_H if renderer.correccion == 'auto'
+                          else renderer.correccion)
+            for version in versiones:
+                renderer.renderizar(codificar_matriz('0', correccion, version))
+        return time.perf_counter() - inicio
+
+
+# Registro del proceso, con los presets incluidos
+PRESETS = RegistroPresets(PRESETS_INCLUIDOS)
+
+
+def cargar_presets(ruta):
+    """Carga un archivo de presets en el registro del proceso; devuelve sus nombres"""
+    return PRESETS.cargar(ruta)
+
+
+def obtener_preset(nombre):
+    """Devuelve el QRRenderer compilado de un preset del registro del proceso"""
+    return PRESETS.renderer(nombre)
+
+
+def adoptar_presets(descripcion, versiones=VERSIONES_PRECALENTAR):
+    """
+    Registra y precalienta los presets recibidos de otro proceso
+
+    Pensada como parte del inicializador de los procesos trabajadores (ver
+    RegistroPresets.descripcion).
+    """
+    for nombre, perfil in descripcion.items():
+        if nombre not in PRESETS or PRESETS.perfil(nombre) != perfil:
+            PRESETS.registrar(nombre, **perfil)
+    PRESETS.precalentar(descripcion, versiones)
+
+
+def generar_qr_preset(datos, nombre_archivo="qr_preset.png", preset="cuadrado",
+                      cache=None, compresion=None, optimizar=False, compacto=False):
+    """
+    Genera un código QR con el aspecto de un preset
+
+    Args:
+        datos (str): Texto o URL para codificar, o un MatrizQR
+        nombre_archivo: Archivo de salida (.svg y .pdf se generan como
+                        vectores), objeto con write(), el tipo bytes o un
+                        bytearray / memoryview reutilizable (ver qr_salida)
+        preset (str): Nombre del preset (ver PRESETS_INCLUIDOS y cargar_presets)
+        cache (CacheResultados): Caché de resultados (por defecto, la activada
+                                 con qr_cache.activar_cache, si la hay)
+        compresion (int): Nivel de compresión PNG (0-9), o None para el de Pillow
+        optimizar (bool): Buscar el PNG más pequeño (más lento)
+        compacto (bool): Guardar en el modo sin pérdida más pequeño (1 bit,
+                         paleta o RGB; ver QRRenderer)
+
+    Returns:
+        bytes si nombre_archivo es bytes, el número de bytes escritos si es
+        un bytearray o memoryview, y None en otro caso
+    """
+    if compacto:
+        renderer = obtener_renderer(**dict(PRESETS.perfil(preset), compacto=True))
+    else:
+        renderer = PRESETS.renderer(preset)
+    salida = renderer.exportar(datos, nombre_archivo, cache, formato=None,
+                               compresion=compresion, optimizar=optimizar)
+    registro.info("✓ QR con preset '%s' generado: %s", preset, nombre_destino(nombre_archivo))
+    return salida
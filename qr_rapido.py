@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Renderizado Rápido de Códigos QR con NumPy
+Dibuja la matriz de módulos de una sola vez (escalado y borde vectorizados)
+en lugar de pintar cada módulo por separado con ImageDraw
+"""
+
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageColor
+from qrcode.main import ActiveWithNeighbors
+from qrcode.image.styles.moduledrawers import SquareModuleDrawer
+from qrcode.image.styles.colormasks import SolidFillColorMask
+
+
+def _normalizar_color(color):
+    """Pasa a minúsculas los nombres de color, como hace qrcode.image.pil"""
+    try:
+        return color.lower()
+    except AttributeError:
+        return color
+
+
+def _color_en_modo(color, modo):
+    """Devuelve el color como tupla del modo indicado ('RGB' o 'RGBA')"""
+    if isinstance(color, tuple):
+        if modo == 'RGBA':
+            return tuple(color) + (255,) * (4 - len(color))
+        return tuple(color[:3])
+    return ImageColor.getcolor(color, modo)
+
+
+def escalar_matriz(modulos, tamaño_caja, borde):
+    """
+    Convierte la matriz de módulos en una matriz de píxeles booleana
+
+    Args:
+        modulos: Matriz de módulos sin borde (qr.modules o array de NumPy)
+        tamaño_caja (int): Píxeles por módulo
+        borde (int): Módulos de margen alrededor del código
+
+    Returns:
+        numpy.ndarray: Array (alto, ancho) de bool, True en los módulos oscuros
+    """
+    matriz = np.asarray(modulos, dtype=bool)
+    if borde:
+        matriz = np.pad(matriz, borde)
+    return matriz.repeat(tamaño_caja, axis=0).repeat(tamaño_caja, axis=1)
+
+
+def imagen_plana(modulos, tamaño_caja=10, borde=4, color_frente="black",
+                 color_fondo="white", compacta=False):
+    """
+    Dibuja un QR de colores sólidos idéntico píxel a píxel al de PilImage
+
+    Elige el mismo modo que qrcode: '1' para negro sobre blanco, 'RGBA' con
+    fondo 'transparent' y 'RGB' en el resto de casos. Con compacta=True los
+    colores se quedan en modo 'P' con una paleta de dos entradas, que se
+    guarda como PNG de 1 bit.
+
+    Args:
+        modulos: Matriz de módulos sin borde (qr.modules o array de NumPy)
+        tamaño_caja (int): Píxeles por módulo
+        borde (int): Módulos de margen alrededor del código
+        color_frente (str): Color de los módulos
+        color_fondo (str): Color de fondo
+        compacta (bool): Devolver la imagen en modo 'P' en lugar de RGB(A)
+
+    Returns:
+        PIL.Image: Imagen del código QR
+    """
+    pixeles = escalar_matriz(modulos, tamaño_caja, borde)
+    alto, ancho = pixeles.shape
+    frente = _normalizar_color(color_frente)
+    fondo = _normalizar_color(color_fondo)
+
+    if frente == "black" and fondo == "white":
+        # 1 bit por píxel, 1 = blanco; np.packbits ya rellena cada fila a bytes
+        bits = np.packbits(~pixeles, axis=1)
+        return Image.frombuffer('1', (ancho, alto), bits, 'raw', '1', 0, 1)
+
+    if fondo == "transparent":
+        modo = 'RGBA'
+        paleta = (0, 0, 0, 0) + _color_en_modo(frente, modo)
+    else:
+        modo = 'RGB'
+        paleta = _color_en_modo(fondo, modo) + _color_en_modo(frente, modo)
+
+    # Índices de paleta (0 = fondo, 1 = frente) compartiendo la memoria del array
+    indices = pixeles.view(np.uint8)
+    img = Image.frombuffer('P', (ancho, alto), indices, 'raw', 'P', 0, 1)
+    img.putpalette(paleta, modo)
+    return img if compacta else img.convert(modo)
+
+
+class _LienzoSello:
+    """
+    Imagen mínima sobre la que un drawer de qrcode dibuja un solo módulo
+
+    Imita los atributos de StyledPilImage que usan los drawers y las máscaras
+    de color. El módulo se dibuja en la celda central de un lienzo de 3x3
+    celdas para que las coordenadas no empiecen en 0, igual que en un QR real.
+    """
+
+    def __init__(self, tamaño_caja, mascara):
+        self.box_size = tamaño_caja
+        self.color_mask = mascara
+        # Mismo color de pintura que StyledPilImage
+        self.paint_color = tuple(0 for _ in mascara.back_color)
+        if mascara.has_transparency:
+            self.paint_color = tuple([*mascara.back_color[:3], 255])
+        self.mode = 'RGBA' if mascara.has_transparency else 'RGB'
+        lado = tamaño_caja * 3
+        self._img = Image.new(self.mode, (lado, lado), mascara.back_color)
+
+    def recortar(self):
+        """Devuelve la celda central como array (caja, caja, canales)"""
+        t = self.box_size
+        return np.asarray(self._img.crop((t, t, 2 * t, 2 * t)), dtype=np.uint8)
+
+
+# Variante de sello de los módulos de los patrones de posición (ojos)
+SELLO_OJO = 16
+
+
+def _dibujar_sellos(clase_drawer, tamaño_caja, mascara, aplicar_mascara):
+    """Dibuja las 17 variantes de módulo con un drawer y una máscara de qrcode"""
+    t = tamaño_caja
+    caja = ((t, t), (2 * t - 1, 2 * t - 1))
+    sellos = []
+    drawers = [clase_drawer()] * SELLO_OJO + [SquareModuleDrawer()]
+    for variante, drawer in enumerate(drawers):
+        lienzo = _LienzoSello(tamaño_caja, mascara)
+        mascara.initialize(lienzo, lienzo._img)
+        drawer.initialize(img=lienzo)
+        if drawer.needs_neighbors and variante < SELLO_OJO:
+            n, e, s, o = (bool(variante & bit) for bit in (1, 2, 4, 8))
+            activo = ActiveWithNeighbors(False, n, False, o, True, e, False, s, False)
+        else:
+            activo = True
+        drawer.drawrect(caja, activo)
+        if aplicar_mascara:
+            mascara.apply_mask(lienzo._img)
+        sellos.append(lienzo.recortar())
+    return np.stack(sellos)
+
+
+@lru_cache(maxsize=64)
+def sellos_de_estilo(clase_drawer, tamaño_caja, color_frente, color_fondo):
+    """
+    Rasteriza y colorea una vez cada variante de módulo de un estilo
+
+    Los drawers que miran a sus vecinos (redondeado, barras) solo dependen de
+    los vecinos N, E, S y O, así que basta con 16 variantes; la 17.ª
+    (SELLO_OJO) es el cuadrado con el que StyledPilImage dibuja los ojos.
+    La máscara de color sólido solo depende del color de cada píxel, así que
+    aplicarla a los sellos da el mismo resultado que aplicarla al QR entero.
+
+    Args:
+        clase_drawer (type): Clase del drawer de qrcode
+        tamaño_caja (int): Píxeles por módulo
+        color_frente (tuple): Color de los módulos
+        color_fondo (tuple): Color de fondo
+
+    Returns:
+        numpy.ndarray: Array (17, caja, caja, canales) de uint8
+    """
+    mascara = SolidFillColorMask(back_color=color_fondo, front_color=color_frente)
+    return _dibujar_sellos(clase_drawer, tamaño_caja, mascara, aplicar_mascara=True)
+
+
+@lru_cache(maxsize=64)
+def mascaras_de_estilo(clase_drawer, tamaño_caja, color_fondo):
+    """
+    Rasteriza una vez la cobertura (0-255) de cada variante de módulo
+
+    Es la proporción de tinta que QRColorMask calcula para cada píxel antes
+    de mezclar fondo y frente, así que sirve para cualquier máscara de color.
+
+    Returns:
+        numpy.ndarray: Array (17, caja, caja, 1) de uint8
+    """
+    mascara = SolidFillColorMask(back_color=color_fondo)
+    crudos = _dibujar_sellos(clase_drawer, tamaño_caja, mascara, aplicar_mascara=False)
+    fondo = np.array(color_fondo, dtype=np.float64)
+    pintura = np.array(_LienzoSello(1, mascara).paint_color, dtype=np.float64)
+
+    # Igual que QRColorMask.extrap_color: media de los canales que cambian
+    canales = fondo != pintura
+    proporcion = ((crudos[..., canales] - fondo[canales]) / (pintura - fondo)[canales]).mean(axis=-1)
+    proporcion[(crudos == fondo.astype(np.uint8)).all(axis=-1)] = 0
+    cobertura = np.clip(np.rint(proporcion * 255), 0, 255).astype(np.uint8)
+    return cobertura[..., np.newaxis]
+
+
+def variantes_de_modulos(modulos):
+    """
+    Calcula la variante de sello de cada módulo a partir de sus vecinos
+
+    Returns:
+        numpy.ndarray: Array (n, n) de int con la variante de cada módulo
+                       oscuro y -1 en los claros
+    """
+    matriz = np.asarray(modulos, dtype=bool)
+    n = matriz.shape[0]
+    vecinos = np.pad(matriz, 1)
+    variantes = (vecinos[:-2, 1:-1] * 1      # N
+                 + vecinos[1:-1, 2:] * 2     # E
+                 + vecinos[2:, 1:-1] * 4     # S
+                 + vecinos[1:-1, :-2] * 8)   # O
+
+    # Mismo criterio que BaseImage.is_eye
+    ojos = np.zeros((n, n), dtype=bool)
+    ojos[:7, :7] = ojos[:7, n - 7:] = ojos[n - 7:, :7] = True
+    variantes[ojos] = SELLO_OJO
+    variantes[~matriz] = -1
+    return variantes
+
+
+def componer_sellos(modulos, sellos, borde, relleno):
+    """
+    Compone el código entero pegando los sellos precalculados
+
+    Args:
+        modulos: Matriz de módulos sin borde (qr.modules o array de NumPy)
+        sellos (numpy.ndarray): Array (17, caja, caja, canales) de sellos
+        borde (int): Módulos de margen alrededor del código
+        relleno: Valor de los píxeles sin módulo (color de fondo)
+
+    Returns:
+        numpy.ndarray: Array (alto, ancho, canales) del mismo tipo que los sellos
+    """
+    variantes = variantes_de_modulos(modulos)
+    _, tamaño_caja, _, canales = sellos.shape
+    n = variantes.shape[0]
+    lado = (n + 2 * borde) * tamaño_caja
+
+    lienzo = np.empty((lado, lado, canales), dtype=sellos.dtype)
+    lienzo[...] = relleno
+    inicio, fin = borde * tamaño_caja, (borde + n) * tamaño_caja
+    # Vista (fila, y, columna, x, canal) de la zona de módulos para pegar por índices
+    celdas = lienzo[inicio:fin, inicio:fin].reshape(n, tamaño_caja, n, tamaño_caja, canales)
+    for variante in np.unique(variantes[variantes >= 0]):
+        filas, columnas = np.nonzero(variantes == variante)
+        celdas[filas, :, columnas, :] = sellos[variante]
+    return lienzo
+
+
+def imagen_estilizada(modulos, clase_drawer, tamaño_caja=10, borde=4,
+                      color_frente=(0, 0, 0), color_fondo=(255, 255, 255)):
+    """
+    Dibuja un QR con estilo de módulos y colores sólidos usando sellos
+
+    Da los mismos píxeles que StyledPilImage con SolidFillColorMask (salvo
+    el redondeo de Pillow en la primera fila cuando borde=0), pero cada
+    forma se dibuja y colorea una sola vez por estilo, tamaño y colores.
+
+    Args:
+        modulos: Matriz de módulos sin borde (qr.modules o array de NumPy)
+        clase_drawer (type): Clase del drawer de qrcode
+        tamaño_caja (int): Píxeles por módulo
+        borde (int): Módulos de margen alrededor del código
+        color_frente (tuple): Color de los módulos (RGB o RGBA)
+        color_fondo (tuple): Color de fondo (RGB o RGBA)
+
+    Returns:
+        PIL.Image: Imagen en modo 'RGB' ('RGBA' si el fondo tiene alfa)
+    """
+    sellos = sellos_de_estilo(clase_drawer, tamaño_caja, color_frente, color_fondo)
+    pixeles = componer_sellos(modulos, sellos, borde, color_fondo)
+    modo = 'RGBA' if pixeles.shape[2] == 4 else 'RGB'
+    return Image.fromarray(pixeles, modo)
+
+
+def _fraccion_gradiente(tipo_gradiente, lado):
+    """
+    Posición (0-1) de cada píxel dentro del gradiente
+
+    Usa las mismas fórmulas que los get_fg_pixel de qrcode.image.styles.colormasks.
+    """
+    y, x = np.mgrid[0:lado, 0:lado].astype(np.float64)
+    mitad = lado / 2
+    if tipo_gradiente == 'radial':
+        return np.sqrt((x - mitad) ** 2 + (y - mitad) ** 2) / (np.sqrt(2) * mitad)
+    if tipo_gradiente == 'cuadrado':
+        return np.maximum(np.abs(x - mitad), np.abs(y - mitad)) / mitad
+    if tipo_gradiente == 'horizontal':
+        return x / lado
+    if tipo_gradiente == 'vertical':
+        return y / lado
+    raise ValueError(f"Tipo de gradiente desconocido: {tipo_gradiente!r}")
+
+
+def campo_gradiente(tipo_gradiente, color_inicio, color_fin, lado, modo='RGB'):
+    """
+    Calcula el color de frente de todos los píxeles de un gradiente
+
+    Args:
+        tipo_gradiente (str): 'radial', 'horizontal', 'vertical' o 'cuadrado'
+        color_inicio (tuple): Color del centro/inicio
+        color_fin (tuple): Color del borde/fin
+        lado (int): Ancho y alto de la imagen en píxeles
+        modo (str): 'RGB' o 'RGBA'
+
+    Returns:
+        PIL.Image: Imagen con el gradiente completo
+    """
+    inicio = np.array(_color_en_modo(color_inicio, modo), dtype=np.float64)
+    fin = np.array(_color_en_modo(color_fin, modo), dtype=np.float64)
+    fraccion = _fraccion_gradiente(tipo_gradiente, lado)[..., np.newaxis]
+    # Igual que QRColorMask.interp_num: int(n2 * norm + n1 * (1 - norm))
+    pixeles = np.clip(fin * fraccion + inicio * (1 - fraccion), 0, 255).astype(np.uint8)
+    return Image.fromarray(pixeles, modo)
+
+
+class CacheGradientes:
+    """
+    Caché LRU de campos de gradiente con límite de memoria
+
+    Dentro de un lote el gradiente solo depende de (tipo, colores, tamaño),
+    así que se calcula una vez y se reutiliza para todos los códigos.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        """
+        Args:
+            max_bytes (int): Memoria máxima ocupada por los campos guardados
+        """
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self._campos = OrderedDict()
+        self._cerrojo = threading.Lock()
+
+    def obtener(self, tipo_gradiente, color_inicio, color_fin, lado, modo='RGB'):
+        """Devuelve el campo del gradiente, calculándolo si no está en caché"""
+        clave = (tipo_gradiente, color_inicio, color_fin, lado, modo)
+        with self._cerrojo:
+            campo = self._campos.get(clave)
+            if campo is not None:
+                self._campos.move_to_end(clave)
+                self.aciertos += 1
+                return campo
+            self.fallos += 1
+
+        campo = campo_gradiente(tipo_gradiente, color_inicio, color_fin, lado, modo)
+        tamaño = lado * lado * len(modo)
+        with self._cerrojo:
+            if clave not in self._campos and tamaño <= self.max_bytes:
+                self._campos[clave] = campo
+                self.bytes += tamaño
+                while self.bytes > self.max_bytes:
+                    _, expulsado = self._campos.popitem(last=False)
+                    self.bytes -= expulsado.width * expulsado.height * len(expulsado.mode)
+        return campo
+
+    def limpiar(self):
+        """Vacía la caché"""
+        with self._cerrojo:
+            self._campos.clear()
+            self.bytes = 0
+
+
+# Caché compartida por todos los renderizadores del proceso
+CACHE_GRADIENTES = CacheGradientes()
+
+
+def imagen_gradiente(modulos, clase_drawer, tamaño_caja=10, borde=4,
+                     tipo_gradiente='radial', color_inicio=(0, 0, 255),
+                     color_fin=(128, 0, 128), color_fondo=(255, 255, 255),
+                     cache=CACHE_GRADIENTES):
+    """
+    Dibuja un QR con estilo de módulos y gradiente de color
+
+    El gradiente sale de la caché y se combina con la cobertura de los
+    módulos (compuesta con sellos) en un único Image.composite. Respecto a
+    StyledPilImage solo varían unos pocos niveles en los bordes suavizados,
+    por el redondeo de la cobertura a 8 bits.
+
+    Args:
+        modulos: Matriz de módulos sin borde (qr.modules o array de NumPy)
+        clase_drawer (type): Clase del drawer de qrcode
+        tamaño_caja (int): Píxeles por módulo
+        borde (int): Módulos de margen alrededor del código
+        tipo_gradiente (str): 'radial', 'horizontal', 'vertical' o 'cuadrado'
+        color_inicio (tuple): Color del centro/inicio
+        color_fin (tuple): Color del borde/fin
+        color_fondo (tuple): Color de fondo (RGB o RGBA)
+        cache (CacheGradientes): Caché de campos de gradiente
+
+    Returns:
+        PIL.Image: Imagen en modo 'RGB' ('RGBA' si el fondo tiene alfa)
+    """
+    mascaras = mascaras_de_estilo(clase_drawer, tamaño_caja, color_fondo)
+    cobertura = componer_sellos(modulos, mascaras, borde, 0)[..., 0]
+    lado = cobertura.shape[0]
+    modo = 'RGBA' if len(color_fondo) == 4 else 'RGB'
+
+    campo = cache.obtener(tipo_gradiente, color_inicio, color_fin, lado, modo)
+    fondo = Image.new(modo, (lado, lado), color_fondo)
+    mascara = Image.frombuffer('L', (lado, lado), cobertura, 'raw', 'L', 0, 1)
+    return Image.composite(campo, fondo, mascara)
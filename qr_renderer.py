@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Renderizador Reutilizable de Códigos QR
+Agrupa en un objeto todo lo que no depende de los datos (drawer, máscara de
+color, colores ya interpretados, tamaño y corrección de errores) para
+construirlo una sola vez y renderizar muchos códigos con él
+"""
+
+from functools import lru_cache
+
+import qrcode
+from qrcode.image.styledpil import StyledPilImage
+from qrcode.image.styles.moduledrawers import (
+    SquareModuleDrawer,
+    GappedSquareModuleDrawer,
+    CircleModuleDrawer,
+    RoundedModuleDrawer,
+    VerticalBarsDrawer,
+    HorizontalBarsDrawer
+)
+from qrcode.image.styles.colormasks import (
+    SolidFillColorMask,
+    SquareGradiantColorMask,
+    RadialGradiantColorMask,
+    HorizontalGradiantColorMask,
+    VerticalGradiantColorMask
+)
+from PIL import ImageColor
+
+from qr_cache import cache_activa
+from qr_logos import CACHE_LOGOS
+from qr_matriz import MatrizQR, codificar_matriz
+from qr_metricas import etapa, registrar_salida, registrar_version
+from qr_rapido import imagen_plana, imagen_estilizada, imagen_gradiente
+from qr_salida import (codificar_imagen, compactar_imagen, escribir_bytes, es_ruta,
+                       formato_de, guardar_imagen)
+from qr_vector import pdf_qr, svg_qr
+
+
+# Estilo de módulo -> clase del drawer
+ESTILOS_MODULO = {
+    'cuadrado': SquareModuleDrawer,
+    'cuadrado_gap': GappedSquareModuleDrawer,
+    'circulo': CircleModuleDrawer,
+    'redondeado': RoundedModuleDrawer,
+    'barras_v': VerticalBarsDrawer,
+    'barras_h': HorizontalBarsDrawer,
+}
+
+# Resolución nominal de un píxel de imagen (la misma que usa la salida vectorial)
+PPP_NOMINAL = 96
+
+# Tipo de gradiente -> (clase de la máscara, argumento inicio, argumento fin)
+GRADIENTES = {
+    'radial': (RadialGradiantColorMask, 'center_color', 'edge_color'),
+    'horizontal': (HorizontalGradiantColorMask, 'left_color', 'right_color'),
+    'vertical': (VerticalGradiantColorMask, 'top_color', 'bottom_color'),
+    'cuadrado': (SquareGradiantColorMask, 'center_color', 'edge_color'),
+}
+
+
+def parsear_color(color):
+    """
+    Convierte un color HTML/CSS ('darkblue', '#FF5733', 'rgb(...)') en tupla RGB(A)
+
+    Las tuplas se devuelven tal cual.
+    """
+    if isinstance(color, tuple):
+        return color
+    return ImageColor.getrgb(color)
+
+
+class QRRenderer:
+    """
+    Perfil de renderizado construido una vez y reutilizable para muchos datos
+
+    Con estilo_modulo=None dibuja el QR plano de qrcode (como
+    generar_qr_simple/generar_qr_personalizado); con un estilo usa
+    StyledPilImage con el drawer y la máscara de color ya creados.
+
+    Un mismo renderer no debe usarse desde varios hilos a la vez: los drawers
+    de qrcode guardan estado de la imagen que están dibujando.
+    """
+
+    def __init__(self, estilo_modulo=None, color_frente="black", color_fondo="white",
+                 tipo_gradiente=None, color_centro="blue", color_borde="purple",
+                 tamaño_caja=10, borde=4,
+                 correccion=qrcode.constants.ERROR_CORRECT_H,
+                 ruta_logo=None, logo_con_transparencia=None, motor='numpy',
+                 mascara=None, compacto=False, escala_nativa=False, proporcion_logo=0.2,
+                 margen_ajuste=0.25):
+        """
+        Args:
+            estilo_modulo (str): Estilo de los módulos (ver ESTILOS_MODULO) o None
+            color_frente (str): Color del código QR
+            color_fondo (str): Color de fondo
+            tipo_gradiente (str): Tipo de gradiente (ver GRADIENTES) o None
+            color_centro (str): Color del centro/inicio del gradiente
+            color_borde (str): Color del borde/fin del gradiente
+            tamaño_caja (int): Tamaño de cada caja del QR
+            borde (int): Tamaño del borde
+            correccion (int): Nivel de corrección de errores (qrcode.constants),
+                              o 'auto' para el más bajo que deja libre
+                              margen_ajuste de la corrección tras el logo y
+                              el estilo (ver qr_ajuste). Con 'auto' el logo
+                              se reduce si ni con H deja ese margen
+            ruta_logo (str): Logo a pegar en el centro, o None
+            logo_con_transparencia (bool): Usar el canal alfa del logo como
+                                           máscara (por defecto, solo con estilo)
+            motor (str): 'numpy' (vectorizado) o 'pil' (el de qrcode). Con
+                         estilo, 'numpy' pega formas precalculadas y toma los
+                         gradientes de una caché; salen los mismos píxeles
+                         salvo pocos niveles en los bordes de los gradientes.
+                         También elige el codificador (ver qr_codificador)
+            mascara (int): Patrón de máscara fijo (0-7) para no puntuar las 8
+                           máscaras al codificar, o None para elegir la mejor
+            compacto (bool): Devolver las imágenes en el modo sin pérdida más
+                             pequeño (ver qr_salida.compactar_imagen): 1 bit
+                             para blanco y negro, paleta para los colores
+                             sólidos y RGB solo si hay gradiente o logo
+            escala_nativa (bool): Dibujar un píxel por módulo y anotar en la
+                                  imagen una resolución de PPP_NOMINAL /
+                                  tamaño_caja, de modo que se imprime al
+                                  mismo tamaño sin escalar los píxeles.
+                                  Solo con módulos cuadrados y sin logo
+            proporcion_logo (float): Fracción del ancho que ocupa el logo
+            margen_ajuste (float): Fracción de la corrección de cada bloque
+                                   que 'auto' deja libre para daños de
+                                   impresión y lectura
+        """
+        if estilo_modulo is not None and estilo_modulo not in ESTILOS_MODULO:
+            raise ValueError(f"Estilo de módulo desconocido: {estilo_modulo!r}")
+        if tipo_gradiente is not None and tipo_gradiente not in GRADIENTES:
+            raise ValueError(f"Tipo de gradiente desconocido: {tipo_gradiente!r}")
+        if motor not in ('numpy', 'pil'):
+            raise ValueError(f"Motor de renderizado desconocido: {motor!r}")
+        if tipo_gradiente is not None and estilo_modulo is None:
+            estilo_modulo = 'cuadrado'
+        if escala_nativa and (ruta_logo or estilo_modulo not in (None, 'cuadrado')):
+            raise ValueError("La escala nativa solo admite módulos cuadrados y sin logo")
+        if not 0 < proporcion_logo <= 0.3:
+            raise ValueError(f"Proporción de logo fuera de rango (0-0.3): {proporcion_logo}")
+        if not 0 <= margen_ajuste < 1:
+            raise ValueError(f"Margen de ajuste fuera de rango (0-1): {margen_ajuste}")
+
+        self.estilo_modulo = estilo_modulo
+        self.tipo_gradiente = tipo_gradiente
+        self.tamaño_caja = tamaño_caja
+        self.borde = borde
+        self.compacto = compacto
+        self.escala_nativa = escala_nativa
+        # Píxeles por módulo de la imagen y resolución anotada al guardarla
+        self.caja_imagen = 1 if escala_nativa else tamaño_caja
+        self.ppp = PPP_NOMINAL / tamaño_caja if escala_nativa else None
+        self.correccion = correccion
+        self.ruta_logo = ruta_logo
+        self.proporcion_logo = proporcion_logo
+        self.margen_ajuste = margen_ajuste
+        self.motor = motor
+        self.mascara_fija = mascara
+        self.logo_con_transparencia = (estilo_modulo is not None
+                                       if logo_con_transparencia is None
+                                       else logo_con_transparencia)
+
+        # Todo lo que decide los píxeles de salida; es la clave de la caché
+        # de resultados junto con los datos
+        self.perfil = (('version', 1, 'fit'), ('correccion', correccion),
+                       ('estilo_modulo', estilo_modulo), ('tipo_gradiente', tipo_gradiente),
+                       ('color_frente', color_frente), ('color_fondo', color_fondo),
+                       ('color_centro', color_centro if tipo_gradiente else None),
+                       ('color_borde', color_borde if tipo_gradiente else None),
+                       ('tamaño_caja', tamaño_caja), ('borde', borde),
+                       ('ruta_logo', ruta_logo),
+                       ('logo_con_transparencia', self.logo_con_transparencia),
+                       ('motor', motor), ('mascara', mascara))
+        # Solo entran en la clave si se activan, para no invalidar las
+        # cachés en disco de los perfiles anteriores
+        if compacto:
+            self.perfil += (('compacto', True),)
+        if escala_nativa:
+            self.perfil += (('escala_nativa', True),)
+        if ruta_logo and proporcion_logo != 0.2:
+            self.perfil += (('proporcion_logo', proporcion_logo),)
+        if correccion == 'auto':
+            self.perfil += (('margen_ajuste', margen_ajuste),)
+
+        # El renderizado plano lo resuelve PilImage, que ya acepta nombres
+        # de colores y elige el modo '1' para blanco y negro
+        self.color_frente = color_frente
+        self.color_fondo = color_fondo
+        self.color_centro = color_centro
+        self.color_borde = color_borde
+        self.drawer = None
+        self.mascara = None
+        if estilo_modulo is not None:
+            fondo = parsear_color(color_fondo)
+            self.drawer = ESTILOS_MODULO[estilo_modulo]()
+            self.drawer_ojos = SquareModuleDrawer()
+            self.rgb_fondo = fondo
+            if tipo_gradiente is None:
+                self.rgb_frente = parsear_color(color_frente)
+                self.mascara = SolidFillColorMask(back_color=fondo,
+                                                  front_color=self.rgb_frente)
+            else:
+                clase, inicio, fin = GRADIENTES[tipo_gradiente]
+                self.rgb_centro = parsear_color(color_centro)
+                self.rgb_borde = parsear_color(color_borde)
+                self.mascara = clase(**{'back_color': fondo,
+                                        inicio: self.rgb_centro,
+                                        fin: self.rgb_borde})
+
+    def codificar(self, datos):
+        """Devuelve un QRCode con los datos ya codificados"""
+        qr = qrcode.QRCode(
+            version=1,  # Tamaño del QR (1-40), se ajusta con fit=True
+            error_correction=self.correccion_para(datos),
+            box_size=self.caja_imagen,
+            border=self.borde,
+            mask_pattern=self.mascara_fija,
+        )
+        qr.add_data(datos)
+        qr.make(fit=True)
+        return qr
+
+    def correccion_para(self, datos):
+        """Nivel de corrección con el que se codifican los datos"""
+        if self.correccion != 'auto':
+            return self.correccion
+        from qr_ajuste import elegir_correccion, tramo_de
+        return elegir_correccion(tramo_de(datos), self.estilo_modulo,
+                                 self.proporcion_logo if self.ruta_logo else 0.0,
+                                 self.margen_ajuste, self.caja_imagen, self.borde)
+
+    def proporcion_de(self, qr):
+        """
+        Fracción del ancho que ocupa el logo en un código ya codificado
+
+        Es proporcion_logo salvo con corrección 'auto', donde se reduce lo
+        necesario para dejar libre margen_ajuste (ver qr_ajuste.proporcion_logo).
+
+        Args:
+            qr: MatrizQR o qrcode.QRCode compilado
+        """
+        if self.correccion != 'auto' or not self.ruta_logo:
+            return self.proporcion_logo
+        from qr_ajuste import proporcion_logo
+        if isinstance(qr, MatrizQR):
+            version, correccion = qr.version, qr.correccion
+        else:
+            version, correccion = qr.version, qr.error_correction
+        return proporcion_logo(version, correccion, self.estilo_modulo, self.proporcion_logo,
+                               self.margen_ajuste, self.caja_imagen, self.borde)
+
+    def matriz(self, datos):
+        """Codifica los datos con la corrección del perfil y devuelve un MatrizQR"""
+        with etapa('codificar'):
+            matriz = codificar_matriz(datos, self.correccion_para(datos),
+                                      mascara=self.mascara_fija,
+                                      motor='numpy' if self.motor == 'numpy' else 'qrcode')
+        registrar_version(matriz.version)
+        return matriz
+
+    def renderizar(self, qr):
+        """
+        Dibuja un código ya codificado y devuelve la imagen PIL
+
+        Args:
+            qr: qrcode.QRCode compilado o MatrizQR. La matriz conserva su
+                propia corrección de errores, aunque el perfil tenga otra
+        """
+        with etapa('dibujar'):
+            img = self._dibujar(qr)
+        if self.ruta_logo:
+            with etapa('logo'):
+                img = self._pegar_logo(img.convert('RGB'), self.proporcion_de(qr))
+        if self.compacto:
+            with etapa('compactar'):
+                img = compactar_imagen(img)
+        return img
+
+    def _dibujar(self, qr):
+        """Dibuja los módulos, sin el logo"""
+        if isinstance(qr, MatrizQR):
+            modulos = qr.modulos()
+            if self.motor == 'pil':
+                qr = qr.a_qrcode(self.caja_imagen, self.borde)
+        else:
+            modulos = qr.modules
+
+        if self.drawer is None and self.motor == 'numpy':
+            img = imagen_plana(modulos, self.caja_imagen, self.borde,
+                               self.color_frente, self.color_fondo, self.compacto)
+        elif self.drawer is None:
+            img = qr.make_image(fill_color=self.color_frente,
+                                back_color=self.color_fondo).get_image()
+        elif self.tipo_gradiente is None and self.motor == 'numpy':
+            img = imagen_estilizada(modulos, type(self.drawer), self.caja_imagen,
+                                    self.borde, self.rgb_frente, self.rgb_fondo)
+        elif self.motor == 'numpy':
+            img = imagen_gradiente(modulos, type(self.drawer), self.caja_imagen,
+                                   self.borde, self.tipo_gradiente, self.rgb_centro,
+                                   self.rgb_borde, self.rgb_fondo)
+        else:
+            img = qr.make_image(
+                image_factory=StyledPilImage,
+                module_drawer=self.drawer,
+                eye_drawer=self.drawer_ojos,
+                color_mask=self.mascara
+            ).get_image()
+        return img
+
+    def render(self, datos):
+        """
+        Codifica y dibuja los datos: el camino rápido para muchos códigos
+
+        Si datos ya es un MatrizQR, solo se dibuja.
+        """
+        if isinstance(datos, MatrizQR):
+            return self.renderizar(datos)
+        return self.renderizar(self.matriz(datos))
+
+    def vectorial(self, datos, formato='SVG'):
+        """
+        Dibuja el código como SVG o PDF vectorial con el estilo y los colores del perfil
+
+        Args:
+            datos (str): Texto o URL para codificar, o un MatrizQR ya codificado
+            formato (str): 'SVG' o 'PDF' (una página del tamaño nominal del
+                           código, a tamaño_caja píxeles de 96 ppp por módulo)
+
+        Returns:
+            bytes: Documento SVG o PDF
+        """
+        if self.ruta_logo:
+            raise ValueError("Los logos solo se pueden pegar en imágenes de mapa de bits")
+        matriz = datos if isinstance(datos, MatrizQR) else self.matriz(datos)
+        estilo = {'estilo_modulo': self.estilo_modulo or 'cuadrado',
+                  'tipo_gradiente': self.tipo_gradiente,
+                  'color_frente': self.color_frente, 'color_fondo': self.color_fondo,
+                  'color_centro': self.color_centro, 'color_borde': self.color_borde}
+        if formato.upper() == 'SVG':
+            with etapa('vectorial'):
+                return svg_qr(matriz.modulos(), self.tamaño_caja, self.borde,
+                              **estilo).encode('utf-8')
+        if formato.upper() == 'PDF':
+            lado_mm = (matriz.lado + 2 * self.borde) * self.tamaño_caja * 25.4 / PPP_NOMINAL
+            with etapa('vectorial'):
+                return pdf_qr(matriz, bytes, lado_mm, tamaño_pagina=None, borde=self.borde,
+                              **estilo)
+        raise ValueError(f"Formato vectorial desconocido: {formato!r}")
+
+    def guardar(self, datos, destino, cache=None, formato="PNG", compresion=None,
+                optimizar=False):
+        """
+        Genera el código y lo guarda, pasando por la caché de resultados
+
+        Args:
+            datos (str): Texto o URL para codificar, o un MatrizQR ya codificado
+            destino: Archivo de salida, objeto con write(), el tipo bytes o un
+                     bytearray / memoryview reutilizable (ver qr_salida)
+            cache (CacheResultados): Caché a usar (por defecto, la activada
+                                     con qr_cache.activar_cache, si la hay)
+            formato (str): Formato de imagen, o 'SVG' / 'PDF' para la salida
+                           vectorial; None lo deduce de la extensión. La caché
+                           solo guarda PNG
+            compresion (int): Nivel zlib del PNG (0-9), o None para el de Pillow.
+                              Los aciertos de caché se devuelven tal como se
+                              guardaron
+            optimizar (bool): Buscar la compresión PNG más pequeña (más lento)
+
+        Returns:
+            bool: True si el resultado salió de la caché
+        """
+        return self._exportar(datos, destino, cache, formato, compresion, optimizar)[1]
+
+    def exportar(self, datos, destino=bytes, cache=None, formato="PNG", compresion=None,
+                 optimizar=False):
+        """
+        Como guardar, pero devuelve la salida: los bytes de la imagen si
+        destino es bytes (el valor por defecto), el número de bytes escritos
+        si es un bytearray o memoryview, y None en los demás casos
+        """
+        return self._exportar(datos, destino, cache, formato, compresion, optimizar)[0]
+
+    def _exportar(self, datos, destino, cache, formato, compresion, optimizar):
+        """Devuelve (salida, si salió de la caché)"""
+        if cache is None:
+            cache = cache_activa()
+        if formato is None:
+            formato = formato_de(destino)
+        if formato in ('SVG', 'PDF'):
+            contenido = self.vectorial(datos, formato)
+            with etapa('guardar'):
+                salida = escribir_bytes(contenido, destino)
+            registrar_salida(destino, contenido)
+            return salida, False
+        if cache is None or formato != "PNG":
+            img = self.render(datos)
+            with etapa('guardar'):
+                salida = guardar_imagen(img, destino, formato, compresion, optimizar,
+                                        self.ppp)
+            registrar_salida(destino, salida)
+            return salida, False
+
+        clave = cache.clave(datos, self.perfil, self.ruta_logo)
+        with etapa('cache'):
+            if es_ruta(destino):
+                png = None
+                acierto = cache.escribir(clave, destino)
+                salida = None
+            else:
+                png = cache.obtener(clave)
+                acierto = png is not None
+                salida = escribir_bytes(png, destino) if acierto else None
+        if acierto:
+            registrar_salida(destino, png, desde_cache=True)
+            return salida, True
+        img = self.render(datos)
+        with etapa('guardar'):
+            png = codificar_imagen(img, "PNG", compresion, optimizar, self.ppp)
+            cache.guardar(clave, png)
+            salida = escribir_bytes(png, destino)
+        registrar_salida(destino, png)
+        return salida, False
+
+    def _pegar_logo(self, img_qr, proporcion=0.2):
+        """Pega el logo centrado ocupando la proporción pedida del QR (1/5 por defecto)"""
+        # Calcular tamaño del logo
+        qr_width, qr_height = img_qr.size
+        logo_size = int(qr_width * proporcion)
+
+        # El logo decodificado y redimensionado sale de la caché
+        logo, mascara = CACHE_LOGOS.preparado(self.ruta_logo, logo_size,
+                                              self.logo_con_transparencia,
+                                              img_qr.mode)
+
+        # Calcular posición para centrar el logo
+        logo_pos = ((qr_width - logo_size) // 2, (qr_height - logo_size) // 2)
+
+        # Si el logo tiene transparencia y así se pidió, respetarla
+        img_qr.paste(logo, logo_pos, mascara)
+        return img_qr
+
+
+@lru_cache(maxsize=64)
+def obtener_renderer(**perfil):
+    """
+    Devuelve un QRRenderer compartido para el perfil dado
+
+    Los generadores llaman a esta función en cada código, así que los perfiles
+    repetidos reutilizan sus drawers, máscaras y colores ya interpretados.
+    """
+    return QRRenderer(**perfil)
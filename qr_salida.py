@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Salida de Códigos QR
+Escribe las imágenes en un archivo, en un objeto tipo archivo o en memoria,
+con control de la compresión PNG, para subirlas a un almacenamiento de
+objetos, enviarlas por HTTP o meterlas en un ZIP sin pasar por el disco
+"""
+
+import io
+import os
+
+
+# Extensiones que se generan como vectores (ver qr_vector) en lugar de imagen
+FORMATOS_VECTORIALES = {'.svg': 'SVG', '.pdf': 'PDF'}
+
+
+def es_ruta(destino):
+    """Indica si el destino es una ruta de archivo (str o os.PathLike)"""
+    return isinstance(destino, (str, os.PathLike))
+
+
+def formato_de(destino):
+    """
+    Deduce el formato de salida de la extensión del destino
+
+    Las rutas .svg y .pdf son vectoriales; las demás extensiones que Pillow
+    conoce dan su formato, y lo que no tiene una extensión conocida se
+    guarda como PNG. De los objetos tipo archivo se mira su atributo name,
+    si es un nombre de archivo.
+    """
+    if not es_ruta(destino):
+        destino = getattr(destino, 'name', None)
+        if not isinstance(destino, str):
+            return "PNG"
+    extension = os.path.splitext(os.fspath(destino))[1].lower()
+    if extension in FORMATOS_VECTORIALES:
+        return FORMATOS_VECTORIALES[extension]
+    from PIL import Image
+    return Image.registered_extensions().get(extension, "PNG")
+
+
+def nombre_destino(destino):
+    """Describe el destino para los mensajes de registro"""
+    if es_ruta(destino):
+        return os.fspath(destino)
+    if destino is bytes:
+        return "bytes en memoria"
+    return getattr(destino, 'name', None) or type(destino).__name__
+
+
+# Colores hasta los que el modo 'P' (PNG de 4 bits o menos) siempre ocupa
+# menos que RGB; con más, compactar_imagen compara los dos PNG
+MAX_COLORES_SIN_COMPARAR = 16
+
+
+def compactar_imagen(img):
+    """
+    Pasa la imagen al modo sin pérdida más pequeño
+
+    Blanco y negro se guarda en modo '1' (1 bit por píxel); hasta 256
+    colores, en modo 'P' con una paleta exacta (Pillow escribe el PNG con 1,
+    2, 4 u 8 bits según el tamaño de la paleta, y con tRNS si hay alfa); con
+    más colores (gradientes, logos fotográficos) se deja tal cual. Con más
+    de MAX_COLORES_SIN_COMPARAR colores (bordes suavizados, gradientes
+    cortos) el PNG de 8 bits no siempre es menor: se codifican los dos y se
+    devuelve la imagen del más pequeño. Los píxeles no cambian.
+
+    Args:
+        img (PIL.Image): Imagen a compactar
+
+    Returns:
+        PIL.Image: La misma imagen si no se puede reducir, o una nueva
+    """
+    if img.mode not in ('RGB', 'RGBA'):
+        return img
+    from PIL import Image
+    colores = img.getcolors(256)
+    if colores is None:
+        return img
+    if all(color[:3] in ((0, 0, 0), (255, 255, 255)) and color[3:] in ((), (255,))
+           for _, color in colores):
+        return img.convert('1', dither=Image.Dither.NONE)
+
+    import numpy as np
+    # Cada color se empaqueta en un entero y se busca en la paleta ordenada
+    canales = len(img.mode)
+    pixeles = np.asarray(img)
+    paleta = np.array([color for _, color in colores], dtype=np.uint8)
+    claves = np.zeros(pixeles.shape[:2], dtype=np.uint32)
+    claves_paleta = np.zeros(len(paleta), dtype=np.uint32)
+    for canal in range(canales):
+        claves = (claves << 8) | pixeles[..., canal]
+        claves_paleta = (claves_paleta << 8) | paleta[:, canal]
+    orden = np.argsort(claves_paleta)
+    indices = orden[np.searchsorted(claves_paleta[orden], claves)].astype(np.uint8)
+    compacta = Image.fromarray(indices, 'P')
+    compacta.putpalette(paleta.tobytes(), img.mode)
+    if (len(paleta) > MAX_COLORES_SIN_COMPARAR
+            and len(codificar_imagen(compacta)) >= len(codificar_imagen(img))):
+        return img
+    return compacta
+
+
+def opciones_guardado(formato="PNG", compresion=None, optimizar=False, ppp=None):
+    """
+    Devuelve los argumentos de Image.save para el formato pedido
+
+    Args:
+        formato (str): Formato de imagen
+        compresion (int): Nivel zlib del PNG (0-9; Pillow usa 6). Los niveles
+                          bajos guardan bastante más rápido a cambio de
+                          archivos algo mayores
+        optimizar (bool): Buscar la compresión más pequeña (más lento)
+        ppp (float): Resolución que se anota en la imagen (pHYs en PNG), o None
+    """
+    opciones = {'dpi': (ppp, ppp)} if ppp else {}
+    if formato is None or formato.upper() != "PNG":
+        return opciones
+    if compresion is not None:
+        if not 0 <= compresion <= 9:
+            raise ValueError(f"Nivel de compresión fuera de rango (0-9): {compresion}")
+        opciones['compress_level'] = compresion
+    if optimizar:
+        opciones['optimize'] = True
+    return opciones
+
+
+def codificar_imagen(img, formato="PNG", compresion=None, optimizar=False, ppp=None):
+    """Codifica la imagen en memoria y devuelve sus bytes"""
+    buffer = io.BytesIO()
+    img.save(buffer, format=formato or "PNG",
+             **opciones_guardado(formato or "PNG", compresion, optimizar, ppp))
+    return buffer.getvalue()
+
+
+def escribir_bytes(contenido, destino):
+    """
+    Escribe una imagen ya codificada en el destino
+
+    Args:
+        contenido (bytes): Imagen codificada
+        destino: Ruta, objeto con write(), el tipo bytes, o un bytearray /
+                 memoryview que se reutiliza como buffer
+
+    Returns:
+        bytes si destino es bytes, el número de bytes escritos si es un
+        bytearray o memoryview, y None en otro caso
+    """
+    if destino is bytes:
+        return bytes(contenido)
+    if es_ruta(destino):
+        with open(destino, 'wb') as archivo:
+            archivo.write(contenido)
+        return None
+    if isinstance(destino, bytearray):
+        # Se reutiliza la memoria del bytearray, que crece si hace falta
+        destino[:] = contenido
+        return len(contenido)
+    if isinstance(destino, memoryview):
+        if len(contenido) > destino.nbytes:
+            raise ValueError(f"El buffer es demasiado pequeño: {len(contenido)} bytes "
+                             f"necesarios, {destino.nbytes} disponibles")
+        destino.cast('B')[:len(contenido)] = contenido
+        return len(contenido)
+    if hasattr(destino, 'write'):
+        destino.write(contenido)
+        return None
+    raise TypeError(f"Destino de salida no válido: {type(destino).__name__}")
+
+
+def guardar_imagen(img, destino, formato="PNG", compresion=None, optimizar=False,
+                   ppp=None):
+    """
+    Guarda una imagen PIL en el destino indicado
+
+    Args:
+        img (PIL.Image): Imagen a guardar
+        destino: Ruta de archivo, objeto con write() (un BytesIO, un archivo
+                 abierto, la petición de subida...), el tipo bytes para
+                 recibir los bytes, o un bytearray / memoryview reutilizable
+        formato (str): Formato de imagen; None lo deduce del destino (ver formato_de)
+        compresion (int): Nivel zlib del PNG (0-9), o None para el de Pillow
+        optimizar (bool): Buscar la compresión PNG más pequeña (más lento)
+        ppp (float): Resolución que se anota en la imagen, o None
+
+    Returns:
+        Lo mismo que escribir_bytes: bytes, número de bytes o None
+    """
+    if formato is None:
+        formato = formato_de(destino)
+    if es_ruta(destino) or hasattr(destino, 'write'):
+        img.save(destino, format=formato,
+                 **opciones_guardado(formato, compresion, optimizar, ppp))
+        return None
+    return escribir_bytes(codificar_imagen(img, formato, compresion, optimizar, ppp),
+                          destino)
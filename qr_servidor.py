@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Servidor HTTP de Códigos QR
+Devuelve los bytes PNG, SVG o PDF de un código QR a partir de los parámetros de
+la URL, sin archivos temporales:
+
+    GET /qr?datos=https://tienda.com&estilo=circulo&color_frente=navy
+    GET /qr?datos=Hola&gradiente=radial&color_centro=blue&formato=png
+    GET /qr?datos=Hola&logo=empresa.png            (logo de --logos)
+    GET /qr?datos=Hola&estilo=redondeado&formato=svg
+
+El renderizado corre en un grupo acotado de procesos. Las peticiones
+idénticas que llegan a la vez comparten un único renderizado, las
+respuestas llevan ETag y Cache-Control, y cuando hay demasiados
+renderizados pendientes se responde 503 en lugar de encolar sin límite.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import qrcode
+
+from qr_cache import CacheResultados
+from qr_entrada import ALIAS_COLUMNAS
+from qr_renderer import ESTILOS_MODULO, GRADIENTES, obtener_renderer, parsear_color
+
+
+CORRECCIONES = {
+    'L': qrcode.constants.ERROR_CORRECT_L,
+    'M': qrcode.constants.ERROR_CORRECT_M,
+    'Q': qrcode.constants.ERROR_CORRECT_Q,
+    'H': qrcode.constants.ERROR_CORRECT_H,
+    # La más baja que deja margen tras el logo y el estilo (ver qr_ajuste)
+    'AUTO': 'auto',
+}
+
+# Nombres aceptados en la URL: los de la entrada CSV/JSONL más variantes ASCII
+ALIAS_PARAMETROS = dict(ALIAS_COLUMNAS, tamano_caja='tamaño_caja', caja='tamaño_caja')
+
+TIPOS_CONTENIDO = {'png': 'image/png', 'svg': 'image/svg+xml',
+                   'pdf': 'application/pdf'}
+
+# Límites de los parámetros numéricos, para que una petición no pueda
+# pedir una imagen gigante
+MAX_TAMAÑO_CAJA = 50
+MAX_BORDE = 20
+
+# Opciones de QRRenderer que se pueden pedir por la URL (en este orden)
+OPCIONES_PERFIL = ('estilo_modulo', 'tipo_gradiente', 'color_frente', 'color_fondo',
+                   'color_centro', 'color_borde', 'tamaño_caja', 'borde', 'correccion',
+                   'ruta_logo')
+
+ESTADOS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 500: 'Internal Server Error',
+           503: 'Service Unavailable'}
+
+
+class ServidorSaturado(Exception):
+    """Hay demasiados renderizados pendientes para aceptar otro"""
+
+
+def opciones_de_consulta(consulta, directorio_logos=None):
+    """
+    Convierte los parámetros de la URL en las opciones de renderizado
+
+    Admite los mismos nombres que la entrada CSV/JSONL (ver ALIAS_PARAMETROS),
+    más 'correccion' (L, M, Q, H, auto) y 'formato' (png, svg, pdf).
+
+    Args:
+        consulta (str): Parte de la URL tras '?'
+        directorio_logos (str): Carpeta de la que se pueden tomar logos, o
+                                None para no permitirlos
+
+    Returns:
+        dict: 'datos', 'formato' y las opciones de QRRenderer pedidas
+
+    Raises:
+        ValueError: Si falta 'datos' o algún parámetro no es válido
+    """
+    parametros = {}
+    for clave, valor in parse_qsl(consulta, keep_blank_values=False):
+        parametros[ALIAS_PARAMETROS.get(clave, clave)] = valor
+
+    datos = parametros.pop('datos', None)
+    if not datos:
+        raise ValueError("Falta el parámetro 'datos'")
+    formato = parametros.pop('formato', 'png').lower()
+    if formato not in TIPOS_CONTENIDO:
+        raise ValueError(f"Formato desconocido: {formato!r}")
+
+    opciones = {}
+    for clave in OPCIONES_PERFIL:
+        if clave in parametros:
+            opciones[clave] = parametros.pop(clave)
+    if parametros:
+        raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(parametros))}")
+
+    if opciones.get('estilo_modulo', 'cuadrado') not in ESTILOS_MODULO:
+        raise ValueError(f"Estilo de módulo desconocido: {opciones['estilo_modulo']!r}")
+    if opciones.get('tipo_gradiente', 'radial') not in GRADIENTES:
+        raise ValueError(f"Tipo de gradiente desconocido: {opciones['tipo_gradiente']!r}")
+    for clave in ('color_frente', 'color_fondo', 'color_centro', 'color_borde'):
+        if clave in opciones:
+            # Sin estilo el código es plano y, como en PilImage, admite fondo transparente
+            if (clave == 'color_fondo' and 'estilo_modulo' not in opciones
+                    and opciones[clave].lower() == 'transparent'):
+                continue
+            try:
+                parsear_color(opciones[clave])
+            except ValueError:
+                raise ValueError(f"Color desconocido en '{clave}': {opciones[clave]!r}") from None
+    for clave, minimo, maximo in (('tamaño_caja', 1, MAX_TAMAÑO_CAJA),
+                                  ('borde', 0, MAX_BORDE)):
+        if clave in opciones:
+            try:
+                opciones[clave] = int(opciones[clave])
+            except ValueError:
+                raise ValueError(f"'{clave}' debe ser un número entero") from None
+            if not minimo <= opciones[clave] <= maximo:
+                raise ValueError(f"'{clave}' debe estar entre {minimo} y {maximo}")
+
+    # Como los generadores: L solo para el QR simple, H en cuanto hay opciones
+    nivel = opciones.pop('correccion', 'H' if opciones else 'L').upper()
+    if nivel not in CORRECCIONES:
+        raise ValueError(f"Corrección de errores desconocida: {nivel!r}")
+    opciones['correccion'] = CORRECCIONES[nivel]
+
+    if 'ruta_logo' in opciones:
+        if not directorio_logos:
+            raise ValueError("Este servidor no admite logos")
+        ruta = os.path.join(directorio_logos, os.path.basename(opciones['ruta_logo']))
+        if not os.path.isfile(ruta):
+            raise ValueError(f"Logo desconocido: {opciones['ruta_logo']!r}")
+        opciones['ruta_logo'] = ruta
+
+    if formato != 'png' and 'ruta_logo' in opciones:
+        raise ValueError("Los logos solo se admiten en formato PNG")
+
+    opciones.update(datos=datos, formato=formato)
+    return opciones
+
+
+def etiqueta(opciones):
+    """
+    Calcula el ETag de una petición a partir de sus opciones
+
+    El renderizado es determinista, así que la etiqueta no necesita la
+    imagen: sirve para responder 304 y para fusionar peticiones sin renderizar.
+    """
+    firma = repr(sorted(opciones.items()))
+    if opciones.get('ruta_logo'):
+        estado = os.stat(opciones['ruta_logo'])
+        firma += f"|{estado.st_mtime_ns}:{estado.st_size}"
+    return '"' + hashlib.sha256(firma.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def renderizar_peticion(opciones):
+    """
+    Renderiza una petición y devuelve los bytes de la imagen
+
+    Se ejecuta en los procesos del grupo; cada proceso reutiliza sus
+    QRRenderer gracias a obtener_renderer.
+    """
+    perfil = {clave: opciones[clave] for clave in OPCIONES_PERFIL if clave in opciones}
+    # Los mismos píxeles en el modo sin pérdida más pequeño: menos bytes por respuesta
+    renderer = obtener_renderer(compacto=True, **perfil)
+    if opciones['formato'] != 'png':
+        return renderer.vectorial(opciones['datos'], opciones['formato'])
+    buffer = io.BytesIO()
+    renderer.render(opciones['datos']).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _respuesta(estado, cabeceras, cuerpo, mantener, solo_cabeceras=False):
+    """Serializa una respuesta HTTP/1.1"""
+    lineas = [f"HTTP/1.1 {estado} {ESTADOS[estado]}",
+              f"Content-Length: {len(cuerpo)}",
+              f"Connection: {'keep-alive' if mantener else 'close'}"]
+    lineas.extend(f"{nombre}: {valor}" for nombre, valor in cabeceras.items())
+    cabecera = ('\r\n'.join(lineas) + '\r\n\r\n').encode('latin-1')
+    return cabecera if solo_cabeceras else cabecera + cuerpo
+
+
+def _texto(estado, mensaje, **cabeceras):
+    cabeceras['Content-Type'] = 'text/plain; charset=utf-8'
+    return estado, cabeceras, (mensaje + '\n').encode('utf-8')
+
+
+class ServidorQR:
+    """
+    Servidor asyncio que renderiza códigos QR bajo demanda
+
+        servidor = ServidorQR(workers=8, directorio_logos='logos')
+        asyncio.run(servidor.servir('0.0.0.0', 8080))
+    """
+
+    def __init__(self, workers=None, max_pendientes=256, directorio_logos=None,
+                 max_bytes_cache=64 * 1024 * 1024, max_edad=86400, espera=30):
+        """
+        Args:
+            workers (int): Procesos de renderizado (por defecto, uno por núcleo)
+            max_pendientes (int): Renderizados distintos en curso a partir de
+                                  los cuales se responde 503
+            directorio_logos (str): Carpeta de logos permitidos, o None
+            max_bytes_cache (int): Memoria para las imágenes ya servidas
+            max_edad (int): Segundos de Cache-Control: max-age
+            espera (float): Segundos de inactividad antes de cerrar una conexión
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pendientes = max_pendientes
+        self.directorio_logos = directorio_logos
+        self.max_edad = max_edad
+        self.espera = espera
+        self.cache = CacheResultados(max_bytes_memoria=max_bytes_cache)
+        self.peticiones = 0
+        self.renderizados = 0
+        self.fusionadas = 0
+        self.rechazadas = 0
+        self._en_vuelo = {}
+        self._pool = None
+
+    async def obtener_imagen(self, opciones, clave):
+        """
+        Devuelve los bytes de la imagen, fusionando peticiones idénticas
+
+        Raises:
+            ServidorSaturado: Si hay max_pendientes renderizados en curso
+        """
+        imagen = self.cache.obtener(clave)
+        if imagen is not None:
+            return imagen
+
+        tarea = self._en_vuelo.get(clave)
+        if tarea is not None:
+            self.fusionadas += 1
+        else:
+            if len(self._en_vuelo) >= self.max_pendientes:
+                self.rechazadas += 1
+                raise ServidorSaturado()
+            tarea = asyncio.ensure_future(self._renderizar(opciones, clave))
+            self._en_vuelo[clave] = tarea
+            tarea.add_done_callback(lambda _: self._en_vuelo.pop(clave, None))
+        # shield: si un cliente se desconecta, el renderizado sigue para los demás
+        return await asyncio.shield(tarea)
+
+    async def _renderizar(self, opciones, clave):
+        bucle = asyncio.get_running_loop()
+        imagen = await bucle.run_in_executor(self._pool, renderizar_peticion, opciones)
+        self.renderizados += 1
+        self.cache.guardar(clave, imagen)
+        return imagen
+
+    def estadisticas(self):
+        """Contadores del servidor"""
+        return {'peticiones': self.peticiones,
+                'renderizados': self.renderizados,
+                'fusionadas': self.fusionadas,
+                'rechazadas': self.rechazadas,
+                'en_curso': len(self._en_vuelo),
+                'cache': self.cache.estadisticas()}
+
+    async def responder(self, metodo, objetivo, cabeceras):
+        """Devuelve (estado, cabeceras, cuerpo) para una petición"""
+        if metodo not in ('GET', 'HEAD'):
+            return _texto(405, "Método no permitido", Allow='GET, HEAD')
+        url = urlsplit(objetivo)
+        if url.path == '/salud':
+            cuerpo = json.dumps(self.estadisticas()).encode('utf-8')
+            return 200, {'Content-Type': 'application/json',
+                         'Cache-Control': 'no-store'}, cuerpo
+        if url.path != '/qr':
+            return _texto(404, "No encontrado")
+
+        try:
+            opciones = opciones_de_consulta(url.query, self.directorio_logos)
+        except ValueError as e:
+            return _texto(400, str(e))
+        clave = etiqueta(opciones)
+        comunes = {'ETag': clave, 'Cache-Control': f'public, max-age={self.max_edad}'}
+        if clave in (e.strip() for e in cabeceras.get('if-none-match', '').split(',')):
+            return 304, comunes, b''
+
+        try:
+            imagen = await self.obtener_imagen(opciones, clave)
+        except ServidorSaturado:
+            return _texto(503, "Servidor saturado, reintenta en un momento",
+                          **{'Retry-After': '1'})
+        except qrcode.exceptions.DataOverflowError:
+            return _texto(400, "Los datos no caben en un código QR")
+        except Exception as e:
+            return _texto(500, f"Error al generar el código: {type(e).__name__}")
+        comunes['Content-Type'] = TIPOS_CONTENIDO[opciones['formato']]
+        return 200, comunes, imagen
+
+    async def atender(self, lector, escritor):
+        """Atiende una conexión, con keep-alive, hasta que el cliente la cierre"""
+        try:
+            while True:
+                try:
+                    cabecera = await asyncio.wait_for(lector.readuntil(b'\r\n\r\n'),
+                                                      self.espera)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        asyncio.TimeoutError, ConnectionError):
+                    return
+                primera, _, resto = cabecera.partition(b'\r\n')
+                lineas = [primera.decode('utf-8', 'replace')]
+                lineas += resto.decode('latin-1').split('\r\n')
+                try:
+                    metodo, objetivo, version = lineas[0].split(' ')
+                except ValueError:
+                    escritor.write(_respuesta(*_texto(400, "Petición mal formada"), False))
+                    return
+                cabeceras = {}
+                for linea in lineas[1:]:
+                    nombre, _, valor = linea.partition(':')
+                    if nombre:
+                        cabeceras[nombre.strip().lower()] = valor.strip()
+                try:
+                    longitud = int(cabeceras.get('content-length', 0) or 0)
+                    if longitud < 0:
+                        raise ValueError(longitud)
+                except ValueError:
+                    # Sin una longitud válida no se sabe dónde acaba el cuerpo
+                    escritor.write(_respuesta(*_texto(400, "Content-Length no válido"), False))
+                    return
+                if longitud:
+                    await lector.readexactly(longitud)
+
+                self.peticiones += 1
+                estado, extra, cuerpo = await self.responder(metodo, objetivo, cabeceras)
+                mantener = (version == 'HTTP/1.1'
+                            and cabeceras.get('connection', '').lower() != 'close')
+                escritor.write(_respuesta(estado, extra, cuerpo, mantener,
+                                          solo_cabeceras=metodo == 'HEAD'))
+                await escritor.drain()
+                if not mantener:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            escritor.close()
+
+    async def servir(self, host='127.0.0.1', puerto=8080):
+        """Arranca el servidor y atiende peticiones hasta que se cancele o reciba SIGTERM"""
+        # Con 'forkserver' los procesos no heredan el socket de escucha: si
+        # el servidor muere no se quedan con el puerto ocupado
+        contexto = multiprocessing.get_context('forkserver')
+        contexto.set_forkserver_preload(['qr_servidor'])
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=contexto)
+        bucle = asyncio.get_running_loop()
+        try:
+            servidor = await asyncio.start_server(self.atender, host, puerto,
+                                                  backlog=1024)
+            print(f"✓ Servidor de códigos QR en http://{host}:{puerto}/qr "
+                  f"({self.workers} procesos)")
+            async with servidor:
+                tarea = asyncio.ensure_future(servidor.serve_forever())
+                bucle.add_signal_handler(signal.SIGTERM, tarea.cancel)
+                try:
+                    await tarea
+                except asyncio.CancelledError:
+                    pass
+        finally:
+            self._pool.shutdown(cancel_futures=True)
+
+
+def main(argv=None):
+    """
+    Función principal
+    """
+    parser = argparse.ArgumentParser(description="Servidor HTTP de códigos QR")
+    parser.add_argument('--host', default='127.0.0.1', help="Dirección de escucha")
+    parser.add_argument('-p', '--puerto', type=int, default=8080, help="Puerto de escucha")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Procesos de renderizado (por defecto, uno por núcleo)")
+    parser.add_argument('--max-pendientes', type=int, default=256,
+                        help="Renderizados en curso antes de responder 503")
+    parser.add_argument('-l', '--logos', default=None, metavar='CARPETA',
+                        help="Carpeta con los logos que se pueden pedir con ?logo=")
+    args = parser.parse_args(argv)
+
+    servidor = ServidorQR(args.workers, args.max_pendientes, args.logos)
+    try:
+        asyncio.run(servidor.servir(args.host, args.puerto))
+    except KeyboardInterrupt:
+        print("\n¡Hasta pronto!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+"""
+Códigos QR Vectoriales
+Genera SVG y PDF a partir de la matriz de módulos con todos los estilos y
+gradientes de qr_generator_advanced. Los módulos oscuros consecutivos se
+unen en un solo trazo por racha, así que el tamaño del archivo no depende
+de la escala: sirve igual para una etiqueta que para una valla publicitaria
+"""
+
+import math
+import zlib
+
+import numpy as np
+from PIL import ImageColor
+
+from qr_salida import escribir_bytes
+
+
+# Distancia de los puntos de control de la Bézier que aproxima un cuarto de elipse
+KAPPA = 4 * (math.sqrt(2) - 1) / 3
+
+# Proporciones de los drawers de qrcode (en módulos)
+HUECO = 0.1          # GappedSquareModuleDrawer(size_ratio=0.8)
+MARGEN_BARRA = 0.1   # VerticalBarsDrawer / HorizontalBarsDrawer(shrink=0.8)
+
+ESTILOS_VECTORIALES = ('cuadrado', 'cuadrado_gap', 'circulo', 'redondeado',
+                       'barras_v', 'barras_h')
+GRADIENTES_VECTORIALES = ('radial', 'horizontal', 'vertical', 'cuadrado')
+
+# Tamaños de página en milímetros
+A4 = (210, 297)
+CARTA = (215.9, 279.4)
+PUNTOS_POR_MM = 72 / 25.4
+
+# Unidades por módulo de las coordenadas de los trazados PDF
+MILESIMAS = 1000
+
+
+def _num(valor):
+    """Formatea una coordenada con seis cifras significativas, sin ceros de sobra"""
+    return '%g' % valor
+
+
+def _color_svg(color):
+    """Convierte un color HTML/CSS o tupla en '#rrggbb' (None si es transparente)"""
+    if isinstance(color, str) and color.lower() == 'transparent':
+        return None
+    rgb = color if isinstance(color, tuple) else ImageColor.getrgb(color)
+    if len(rgb) == 4 and rgb[3] == 0:
+        return None
+    return '#{:02x}{:02x}{:02x}'.format(*rgb[:3])
+
+
+def _color_pdf(color):
+    """Convierte un color en 'r g b' con componentes 0-1 (None si es transparente)"""
+    hexadecimal = _color_svg(color)
+    if hexadecimal is None:
+        return None
+    return ' '.join(_num(int(hexadecimal[i:i + 2], 16) / 255) for i in (1, 3, 5))
+
+
+def rachas_horizontales(modulos):
+    """
+    Agrupa los módulos oscuros de cada fila en rachas
+
+    Args:
+        modulos: Matriz de módulos sin borde (qr.modules o array de NumPy)
+
+    Returns:
+        list: Tuplas (fila, columna inicial, longitud) de cada racha
+    """
+    matriz = np.asarray(modulos, dtype=bool)
+    relleno = np.zeros((matriz.shape[0], 1), dtype=np.int8)
+    cambios = np.diff(np.hstack([relleno, matriz.astype(np.int8), relleno]), axis=1)
+    filas_inicio, inicios = np.nonzero(cambios == 1)
+    _, fines = np.nonzero(cambios == -1)
+    return list(zip(filas_inicio.tolist(), inicios.tolist(), (fines - inicios).tolist()))
+
+
+def mascara_ojos(lado):
+    """Módulos de los tres patrones de posición, que siempre se dibujan cuadrados"""
+    ojos = np.zeros((lado, lado), dtype=bool)
+    ojos[:7, :7] = ojos[:7, lado - 7:] = ojos[lado - 7:, :7] = True
+    return ojos
+
+
+class TrazoSVG:
+    """Acumula un trazado en la sintaxis del atributo 'd' de SVG"""
+
+    def __init__(self):
+        self.partes = []
+        self.x = self.y = 0
+
+    def mover(self, x, y):
+        self.partes.append(f"M{_num(x)},{_num(y)}")
+        self.x, self.y = x, y
+
+    def linea(self, x, y):
+        if x == self.x and y == self.y:
+            return
+        if y == self.y:
+            self.partes.append(f"H{_num(x)}")
+        elif x == self.x:
+            self.partes.append(f"V{_num(y)}")
+        else:
+            self.partes.append(f"L{_num(x)},{_num(y)}")
+        self.x, self.y = x, y
+
+    def arco(self, dx, dy):
+        """Cuarto de elipse en sentido horario hasta (x + dx, y + dy)"""
+        self.x += dx
+        self.y += dy
+        self.partes.append(f"A{_num(abs(dx))},{_num(abs(dy))} 0 0 1 "
+                           f"{_num(self.x)},{_num(self.y)}")
+
+    def circulos(self, xs, ys):
+        """Círculos de diámetro un módulo con la esquina superior izquierda en (xs, ys)"""
+        self.partes.extend([f"M{_num(x)},{_num(y + 0.5)}a.5,.5 0 1 1 1,0a.5,.5 0 1 1 -1,0Z"
+                            for x, y in zip(xs.tolist(), ys.tolist())])
+
+    def cerrar(self):
+        self.partes.append("Z")
+
+    def texto(self):
+        return ''.join(self.partes)
+
+
+class TrazoPDF(TrazoSVG):
+    """
+    Acumula un trazado con los operadores de PDF (los arcos pasan a Béziers)
+
+    Las coordenadas se escriben como enteros en milésimas de módulo
+    (MILESIMAS), que ocupan menos y se formatean mucho más rápido que los
+    decimales; quien use el trazado debe escalarlo con 'cm'.
+    """
+
+    def mover(self, x, y):
+        self.partes.append("%d %d m" % (round(x * MILESIMAS), round(y * MILESIMAS)))
+        self.x, self.y = x, y
+
+    def linea(self, x, y):
+        if x == self.x and y == self.y:
+            return
+        self.partes.append("%d %d l" % (round(x * MILESIMAS), round(y * MILESIMAS)))
+        self.x, self.y = x, y
+
+    def arco(self, dx, dy):
+        x0, y0 = self.x, self.y
+        x1, y1 = x0 + dx, y0 + dy
+        # En sentido horario (eje y hacia abajo) la tangente inicial es
+        # horizontal cuando dx y dy tienen el mismo signo
+        if dx * dy > 0:
+            puntos = (x0 + KAPPA * dx, y0, x1, y1 - KAPPA * dy, x1, y1)
+        else:
+            puntos = (x0, y0 + KAPPA * dy, x1 - KAPPA * dx, y1, x1, y1)
+        self.partes.append("%d %d %d %d %d %d c" % tuple(round(v * MILESIMAS)
+                                                         for v in puntos))
+        self.x, self.y = x1, y1
+
+    def circulos(self, xs, ys):
+        # Las cuatro Béziers son siempre las mismas: se desplazan todas a la vez
+        origenes = np.stack([xs, ys], axis=-1)[:, np.newaxis, :]
+        puntos = np.rint((origenes + _PUNTOS_CIRCULO) * MILESIMAS).astype(np.int64)
+        plantilla = "%d %d m" + " %d %d %d %d %d %d c" * 4 + " h"
+        self.partes.extend([plantilla % tuple(circulo)
+                            for circulo in puntos.reshape(len(puntos), -1).tolist()])
+
+    def cerrar(self):
+        self.partes.append("h")
+
+    def texto(self):
+        return '\n'.join(self.partes)
+
+
+def _puntos_circulo():
+    """Inicio y puntos de las cuatro Béziers de un círculo de diámetro 1 en (0, 0)"""
+    x, y = 0, 0.5
+    puntos = [(x, y)]
+    for dx, dy in ((0.5, -0.5), (0.5, 0.5), (-0.5, 0.5), (-0.5, -0.5)):
+        x1, y1 = x + dx, y + dy
+        if dx * dy > 0:
+            puntos += [(x + KAPPA * dx, y), (x1, y1 - KAPPA * dy), (x1, y1)]
+        else:
+            puntos += [(x, y + KAPPA * dy), (x1 - KAPPA * dx, y1), (x1, y1)]
+        x, y = x1, y1
+    return np.array(puntos)
+
+
+_PUNTOS_CIRCULO = _puntos_circulo()
+
+
+def _rectangulos(trazo, rachas, borde):
+    for fila, columna, longitud in rachas:
+        x, y = columna + borde, fila + borde
+        trazo.mover(x, y)
+        trazo.linea(x + longitud, y)
+        trazo.linea(x + longitud, y + 1)
+        trazo.linea(x, y + 1)
+        trazo.cerrar()
+
+
+def _racha_redondeada(trazo, x, y, longitud, no, ne, se, so):
+    """Racha horizontal con las esquinas indicadas redondeadas (radio medio módulo)"""
+    r = 0.5
+    fin = x + longitud
+    trazo.mover(x + r if no else x, y)
+    trazo.linea(fin - r if ne else fin, y)
+    if ne:
+        trazo.arco(r, r)
+    trazo.linea(fin, y + 1 - r if se else y + 1)
+    if se:
+        trazo.arco(-r, r)
+    trazo.linea(x + r if so else x, y + 1)
+    if so:
+        trazo.arco(-r, -r)
+    trazo.linea(x, y + r if no else y)
+    if no:
+        trazo.arco(r, -r)
+    trazo.cerrar()
+
+
+def _barra_horizontal(trazo, x, y, longitud, izquierda, derecha):
+    """Barra de altura 0.8 con extremos semielípticos donde no hay vecino"""
+    arriba, abajo = y + MARGEN_BARRA, y + 1 - MARGEN_BARRA
+    rx, ry = 0.5, 0.5 - MARGEN_BARRA
+    fin = x + longitud
+    trazo.mover(x + rx if izquierda else x, arriba)
+    trazo.linea(fin - rx if derecha else fin, arriba)
+    if derecha:
+        trazo.arco(rx, ry)
+        trazo.arco(-rx, ry)
+    else:
+        trazo.linea(fin, abajo)
+    trazo.linea(x + rx if izquierda else x, abajo)
+    if izquierda:
+        trazo.arco(-rx, -ry)
+        trazo.arco(rx, -ry)
+    trazo.cerrar()
+
+
+def _barra_vertical(trazo, x, y, longitud, superior, inferior):
+    """Barra de anchura 0.8 con extremos semielípticos donde no hay vecino"""
+    izquierda, derecha = x + MARGEN_BARRA, x + 1 - MARGEN_BARRA
+    rx, ry = 0.5 - MARGEN_BARRA, 0.5
+    fin = y + longitud
+    if superior:
+        trazo.mover(izquierda, y + ry)
+        trazo.arco(rx, -ry)
+        trazo.arco(rx, ry)
+    else:
+        trazo.mover(izquierda, y)
+        trazo.linea(derecha, y)
+    if inferior:
+        trazo.linea(derecha, fin - ry)
+        trazo.arco(-rx, ry)
+        trazo.arco(-rx, -ry)
+    else:
+        trazo.linea(derecha, fin)
+        trazo.linea(izquierda, fin)
+    trazo.cerrar()
+
+
+def trazar_modulos(modulos, trazo, estilo_modulo='cuadrado', borde=4):
+    """
+    Dibuja los módulos oscuros en un trazo, en unidades de módulo
+
+    Reproduce la geometría de los drawers de qrcode: los patrones de
+    posición van siempre cuadrados (como en StyledPilImage) y las esquinas
+    y los extremos redondeados dependen de los vecinos N, E, S y O, igual
+    que en los drawers. Los módulos consecutivos se unen en una sola figura
+    por racha salvo en los estilos en que cada módulo va separado (círculos
+    y cuadrados con hueco).
+
+    Args:
+        modulos: Matriz de módulos sin borde (qr.modules, array de NumPy o
+                 MatrizQR.modulos())
+        trazo (TrazoSVG): Trazo donde dibujar (TrazoSVG o TrazoPDF)
+        estilo_modulo (str): Uno de ESTILOS_VECTORIALES
+        borde (int): Módulos de margen alrededor del código
+    """
+    if estilo_modulo not in ESTILOS_VECTORIALES:
+        raise ValueError(f"Estilo de módulo desconocido: {estilo_modulo!r}")
+    matriz = np.asarray(modulos, dtype=bool)
+    if estilo_modulo == 'cuadrado':
+        _rectangulos(trazo, rachas_horizontales(matriz), borde)
+        return
+
+    ojos = mascara_ojos(matriz.shape[0])
+    _rectangulos(trazo, rachas_horizontales(matriz & ojos), borde)
+    resto = matriz & ~ojos
+    vecinos = np.pad(matriz, 1)
+
+    def activo(fila, columna):
+        return bool(vecinos[fila + 1, columna + 1])
+
+    if estilo_modulo == 'cuadrado_gap':
+        lado = 1 - 2 * HUECO
+        filas, columnas = np.nonzero(resto)
+        for fila, columna in zip(filas.tolist(), columnas.tolist()):
+            x, y = columna + borde + HUECO, fila + borde + HUECO
+            trazo.mover(x, y)
+            trazo.linea(x + lado, y)
+            trazo.linea(x + lado, y + lado)
+            trazo.linea(x, y + lado)
+            trazo.cerrar()
+    elif estilo_modulo == 'circulo':
+        filas, columnas = np.nonzero(resto)
+        trazo.circulos(columnas + borde, filas + borde)
+    elif estilo_modulo == 'redondeado':
+        for fila, columna, longitud in rachas_horizontales(resto):
+            ultima = columna + longitud - 1
+            oeste, este = activo(fila, columna - 1), activo(fila, ultima + 1)
+            _racha_redondeada(trazo, columna + borde, fila + borde, longitud,
+                              not oeste and not activo(fila - 1, columna),
+                              not este and not activo(fila - 1, ultima),
+                              not este and not activo(fila + 1, ultima),
+                              not oeste and not activo(fila + 1, columna))
+    elif estilo_modulo == 'barras_h':
+        for fila, columna, longitud in rachas_horizontales(resto):
+            _barra_horizontal(trazo, columna + borde, fila + borde, longitud,
+                              not activo(fila, columna - 1),
+                              not activo(fila, columna + longitud))
+    else:
+        for columna, fila, longitud in rachas_horizontales(resto.T):
+            _barra_vertical(trazo, columna + borde, fila + borde, longitud,
+                            not activo(fila - 1, columna),
+                            not activo(fila + longitud, columna))
+
+
+def trazado_svg(modulos, borde=4, estilo_modulo='cuadrado'):
+    """Devuelve el atributo 'd' del trazado, en unidades de módulo"""
+    trazo = TrazoSVG()
+    trazar_modulos(modulos, trazo, estilo_modulo, borde)
+    return trazo.texto()
+
+
+def _ejes_gradiente(tipo_gradiente, lado):
+    """
+    Geometría de un gradiente sobre un código de lado módulos
+
+    Usa las mismas fórmulas que qr_rapido (y que qrcode): el radial llega al
+    color final en las esquinas y el cuadrado, que no existe como gradiente
+    en SVG ni en PDF, se compone de cuatro gradientes lineales recortados a
+    los triángulos que van del centro a cada lado.
+
+    Returns:
+        list: Tuplas (tipo, coordenadas, triángulo de recorte o None)
+    """
+    mitad = lado / 2
+    if tipo_gradiente == 'horizontal':
+        return [('lineal', (0, 0, lado, 0), None)]
+    if tipo_gradiente == 'vertical':
+        return [('lineal', (0, 0, 0, lado), None)]
+    if tipo_gradiente == 'radial':
+        return [('radial', (mitad, mitad, mitad * math.sqrt(2)), None)]
+    if tipo_gradiente == 'cuadrado':
+        esquinas = [(0, 0), (lado, 0), (lado, lado), (0, lado)]
+        lados = [(mitad, 0), (lado, mitad), (mitad, lado), (0, mitad)]
+        return [('lineal', (mitad, mitad) + lados[i],
+                 ((mitad, mitad), esquinas[i], esquinas[(i + 1) % 4]))
+                for i in range(4)]
+    raise ValueError(f"Tipo de gradiente desconocido: {tipo_gradiente!r}")
+
+
+def svg_qr(modulos, tamaño_caja=10, borde=4, color_frente="black", color_fondo="white",
+           estilo_modulo='cuadrado', tipo_gradiente=None, color_centro="blue",
+           color_borde="purple"):
+    """
+    Genera el SVG de un código QR
+
+    Args:
+        modulos: Matriz de módulos sin borde (qr.modules, array de NumPy o
+                 MatrizQR.modulos())
+        tamaño_caja (int): Píxeles por módulo del tamaño nominal del SVG
+        borde (int): Módulos de margen alrededor del código
+        color_frente (str): Color de los módulos (sin gradiente)
+        color_fondo (str): Color de fondo ('transparent' para omitirlo)
+        estilo_modulo (str): Uno de ESTILOS_VECTORIALES
+        tipo_gradiente (str): Uno de GRADIENTES_VECTORIALES, o None
+        color_centro (str): Color del centro/inicio del gradiente
+        color_borde (str): Color del borde/fin del gradiente
+
+    Returns:
+        str: Documento SVG
+    """
+    lado = len(modulos) + 2 * borde
+    pixeles = lado * tamaño_caja
+    # Los bordes rectos se ven mejor sin suavizado; las curvas, con él
+    nitidez = ' shape-rendering="crispEdges"' if estilo_modulo == 'cuadrado' else ''
+    partes = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        f'<svg xmlns="http://www.w3.org/2000/svg" '
+        f'xmlns:xlink="http://www.w3.org/1999/xlink" version="1.1" width="{pixeles}" '
+        f'height="{pixeles}" viewBox="0 0 {lado} {lado}"{nitidez}>',
+    ]
+    d = trazado_svg(modulos, borde, estilo_modulo)
+    fondo = _color_svg(color_fondo)
+    rect_fondo = f'<rect width="{lado}" height="{lado}" fill="{fondo}"/>' if fondo else ''
+
+    if tipo_gradiente is None:
+        partes.append(rect_fondo)
+        partes.append(f'<path fill="{_color_svg(color_frente)}" d="{d}"/>')
+    else:
+        paradas = (f'<stop offset="0" stop-color="{_color_svg(color_centro)}"/>'
+                   f'<stop offset="1" stop-color="{_color_svg(color_borde)}"/>')
+        definiciones, capas = [], []
+        ejes = _ejes_gradiente(tipo_gradiente, lado)
+        for i, (tipo, coordenadas, triangulo) in enumerate(ejes):
+            c = [_num(v) for v in coordenadas]
+            if tipo == 'lineal':
+                definiciones.append(
+                    f'<linearGradient id="g{i}" gradientUnits="userSpaceOnUse" '
+                    f'x1="{c[0]}" y1="{c[1]}" x2="{c[2]}" y2="{c[3]}">{paradas}'
+                    f'</linearGradient>')
+            else:
+                definiciones.append(
+                    f'<radialGradient id="g{i}" gradientUnits="userSpaceOnUse" '
+                    f'cx="{c[0]}" cy="{c[1]}" r="{c[2]}">{paradas}</radialGradient>')
+            if triangulo is None:
+                capas.append(f'<path fill="url(#g{i})" d="{d}"/>')
+            else:
+                puntos = ' '.join(f"{_num(x)},{_num(y)}" for x, y in triangulo)
+                definiciones.append(f'<clipPath id="t{i}"><polygon points="{puntos}"/>'
+                                    f'</clipPath>')
+                capas.append(f'<use xlink:href="#m" fill="url(#g{i})" clip-path="url(#t{i})"/>')
+        if len(ejes) > 1:
+            # El trazado se escribe una vez y se reutiliza en cada triángulo
+            definiciones.append(f'<path id="m" d="{d}"/>')
+        partes.append('<defs>' + ''.join(definiciones) + '</defs>')
+        partes.append(rect_fondo)
+        partes.extend(capas)
+    partes.append('</svg>\n')
+    return ''.join(partes)
+
+
+def _modulos_de(codigo):
+    """Acepta un MatrizQR, qr.modules o un array y devuelve la matriz de módulos"""
+    return codigo.modulos() if hasattr(codigo, 'modulos') else codigo
+
+
+class DocumentoPDF:
+    """
+    Documento PDF vectorial de una o varias páginas con códigos QR
+
+    Escribe el PDF directamente (sin dependencias): cada código es un
+    trazado relleno y los gradientes son sombreados nativos de PDF, así que
+    se imprimen nítidos a cualquier tamaño:
+
+        documento = DocumentoPDF()
+        documento.nueva_pagina(*A4)
+        documento.dibujar_qr(matriz, x=20, y=20, lado=80, estilo_modulo='circulo')
+        documento.guardar("etiquetas.pdf")
+    """
+
+    def __init__(self, compresion=6):
+        """
+        Args:
+            compresion (int): Nivel zlib del contenido de las páginas (0-9;
+                              0 lo deja sin comprimir). Los niveles bajos son
+                              bastante más rápidos en códigos grandes
+        """
+        self.compresion = compresion
+        self._paginas = []
+
+    def nueva_pagina(self, ancho_mm=A4[0], alto_mm=A4[1]):
+        """Añade una página vacía; los siguientes códigos se dibujan en ella"""
+        self._paginas.append({'ancho': ancho_mm * PUNTOS_POR_MM,
+                              'alto': alto_mm * PUNTOS_POR_MM,
+                              'contenido': [], 'sombreados': []})
+
+    @property
+    def paginas(self):
+        """Número de páginas del documento"""
+        return len(self._paginas)
+
+    def dibujar_qr(self, codigo, x, y, lado, borde=4, color_frente="black",
+                   color_fondo="white", estilo_modulo='cuadrado', tipo_gradiente=None,
+                   color_centro="blue", color_borde="purple"):
+        """
+        Dibuja un código en la página actual
+
+        Args:
+            codigo: MatrizQR, qr.modules o array de módulos sin borde
+            x (float): Distancia en mm desde el borde izquierdo de la página
+            y (float): Distancia en mm desde el borde superior de la página
+            lado (float): Lado del código en mm, borde incluido
+            (el resto de argumentos, como en svg_qr)
+        """
+        if not self._paginas:
+            self.nueva_pagina()
+        pagina = self._paginas[-1]
+        modulos = _modulos_de(codigo)
+        total = len(modulos) + 2 * borde
+        escala = lado * PUNTOS_POR_MM / total
+        # Unidades de módulo con el eje y hacia abajo, como en SVG
+        contenido = pagina['contenido']
+        contenido.append(f"q {_num(escala)} 0 0 {_num(-escala)} {_num(x * PUNTOS_POR_MM)} "
+                         f"{_num(pagina['alto'] - y * PUNTOS_POR_MM)} cm")
+        fondo = _color_pdf(color_fondo)
+        if fondo:
+            contenido.append(f"{fondo} rg 0 0 {total} {total} re f")
+
+        trazo = TrazoPDF()
+        trazar_modulos(modulos, trazo, estilo_modulo, borde)
+        trazado = trazo.texto()
+        # El trazado viene en milésimas de módulo (ver TrazoPDF)
+        milesimas = f"{_num(1 / MILESIMAS)} 0 0 {_num(1 / MILESIMAS)} 0 0 cm"
+        if tipo_gradiente is None:
+            contenido.append(f"q {milesimas}\n{_color_pdf(color_frente)} rg\n{trazado}\nf Q")
+        else:
+            funcion = (f"<< /FunctionType 2 /Domain [0 1] /C0 [{_color_pdf(color_centro)}] "
+                       f"/C1 [{_color_pdf(color_borde)}] /N 1 >>")
+            recortes = []
+            for tipo, coordenadas, triangulo in _ejes_gradiente(tipo_gradiente, total):
+                nombre = f"Sh{len(pagina['sombreados'])}"
+                if tipo == 'lineal':
+                    tipo_pdf, ejes = 2, coordenadas
+                else:
+                    cx, cy, radio = coordenadas
+                    tipo_pdf, ejes = 3, (cx, cy, 0, cx, cy, radio)
+                pagina['sombreados'].append(
+                    f"/{nombre} << /ShadingType {tipo_pdf} /ColorSpace /DeviceRGB "
+                    f"/Coords [{' '.join(_num(v) for v in ejes)}] /Function {funcion} "
+                    f"/Extend [true true] >>")
+                recortes.append(f"/{nombre} sh")
+                if triangulo is not None:
+                    (x0, y0), (x1, y1), (x2, y2) = triangulo
+                    recortes[-1] = (f"q {_num(x0)} {_num(y0)} m {_num(x1)} {_num(y1)} l "
+                                    f"{_num(x2)} {_num(y2)} l h W n /{nombre} sh Q")
+            # El trazado se escribe una vez como recorte y cada sombreado lo rellena
+            contenido.append(f"q {milesimas}\n{trazado}\nW n {MILESIMAS} 0 0 {MILESIMAS} 0 0 cm "
+                             + ' '.join(recortes) + " Q")
+        contenido.append("Q")
+
+    def contenido(self):
+        """Devuelve los bytes del documento PDF"""
+        objetos = [b"<< /Type /Catalog /Pages 2 0 R >>", None]
+        hijos = []
+        for pagina in self._paginas:
+            flujo = '\n'.join(pagina['contenido']).encode('latin-1')
+            filtro = b""
+            if self.compresion:
+                flujo = zlib.compress(flujo, self.compresion)
+                filtro = b" /Filter /FlateDecode"
+            objetos.append(b"<< /Length %d%s >>\nstream\n" % (len(flujo), filtro)
+                           + flujo + b"\nendstream")
+            recursos = ''
+            if pagina['sombreados']:
+                recursos = f" /Resources << /Shading << {' '.join(pagina['sombreados'])} >> >>"
+            objetos.append(
+                (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_num(pagina['ancho'])} "
+                 f"{_num(pagina['alto'])}] /Contents {len(objetos)} 0 R{recursos} >>"
+                 ).encode('latin-1'))
+            hijos.append(f"{len(objetos)} 0 R")
+        objetos[1] = (f"<< /Type /Pages /Kids [{' '.join(hijos)}] "
+                      f"/Count {len(hijos)} >>").encode('latin-1')
+
+        salida = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        posiciones = []
+        for numero, objeto in enumerate(objetos, 1):
+            posiciones.append(len(salida))
+            salida += b"%d 0 obj\n" % numero + objeto + b"\nendobj\n"
+        inicio_xref = len(salida)
+        salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+        for posicion in posiciones:
+            salida += b"%010d 00000 n \n" % posicion
+        salida += (b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                   % (len(objetos) + 1, inicio_xref))
+        return bytes(salida)
+
+    def guardar(self, destino):
+        """Escribe el documento en un archivo, objeto tipo archivo o buffer (ver qr_salida)"""
+        return escribir_bytes(self.contenido(), destino)
+
+
+def pdf_qr(codigos, destino=bytes, lado_mm=50, tamaño_pagina=A4, margen_mm=10,
+           separacion_mm=5, compresion=6, **estilo):
+    """
+    Genera un PDF con uno o muchos códigos en rejilla, en tantas páginas como haga falta
+
+    Args:
+        codigos: Un MatrizQR o array de módulos, o un iterable de códigos
+                 (MatrizQR, qr.modules o arrays)
+        destino: Ruta, objeto con write(), bytes o buffer (ver qr_salida)
+        lado_mm (float): Lado de cada código en mm, borde incluido
+        tamaño_pagina (tuple): (ancho, alto) en mm, o None para que cada
+                               página mida exactamente un código
+        margen_mm (float): Margen de la página en mm
+        separacion_mm (float): Espacio entre códigos en mm
+        compresion (int): Nivel zlib del contenido (ver DocumentoPDF)
+        **estilo: borde, colores, estilo_modulo y gradiente (ver svg_qr)
+
+    Returns:
+        Lo mismo que qr_salida.escribir_bytes
+    """
+    if hasattr(codigos, 'modulos') or (isinstance(codigos, np.ndarray) and codigos.ndim == 2):
+        codigos = [codigos]
+
+    documento = DocumentoPDF(compresion)
+    if tamaño_pagina is None:
+        for codigo in codigos:
+            documento.nueva_pagina(lado_mm, lado_mm)
+            documento.dibujar_qr(codigo, 0, 0, lado_mm, **estilo)
+        return documento.guardar(destino)
+
+    ancho, alto = tamaño_pagina
+    paso = lado_mm + separacion_mm
+    columnas = max(1, int((ancho - 2 * margen_mm + separacion_mm) // paso))
+    filas = max(1, int((alto - 2 * margen_mm + separacion_mm) // paso))
+    for indice, codigo in enumerate(codigos):
+        posicion = indice % (columnas * filas)
+        if posicion == 0:
+            documento.nueva_pagina(ancho, alto)
+        fila, columna = divmod(posicion, columnas)
+        documento.dibujar_qr(codigo, margen_mm + columna * paso, margen_mm + fila * paso,
+                             lado_mm, **estilo)
+    return documento.guardar(destino)
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Verificación de Códigos QR Generados
+Comprueba que una imagen ya dibujada sigue siendo legible: muestrea el
+centro de cada módulo, lo compara con la matriz codificada y cuenta los
+codewords dañados de cada bloque Reed-Solomon frente a los que puede
+corregir. Opcionalmente decodifica la imagen con un lector local
+"""
+
+import importlib.util
+import io
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+from qrcode import base
+
+from qr_codificador import plantilla_version
+from qr_matriz import MatrizQR, NOMBRES_CORRECCION
+
+
+# (versión, letra de corrección) -> codewords reservados contra falsas
+# lecturas, que no cuentan para la corrección (ISO/IEC 18004, tabla 9)
+CODEWORDS_RESERVADOS = {(1, 'L'): 3, (1, 'M'): 2, (1, 'Q'): 1, (1, 'H'): 1,
+                        (2, 'L'): 2, (3, 'L'): 1}
+
+# Errores que corrige cada copia BCH(15, 5) de la información de formato
+ERRORES_FORMATO = 3
+
+# Diferencia mínima de luminancia entre módulos claros y oscuros (0-1)
+CONTRASTE_MINIMO = 0.2
+
+
+class ResultadoVerificacion:
+    """Resultado de verificar la imagen de un código QR"""
+
+    __slots__ = ('legible', 'contraste', 'errores_modulos', 'errores_bloques',
+                 'capacidad_bloques', 'errores_formato', 'errores_buscadores',
+                 'cubiertos_logo', 'decodificado')
+
+    def __init__(self, legible, contraste, errores_modulos, errores_bloques, capacidad_bloques,
+                 errores_formato, errores_buscadores, cubiertos_logo=0, decodificado=None):
+        self.legible = legible
+        # Luminancia de los claros menos la de los oscuros; negativo si están invertidos
+        self.contraste = contraste
+        self.errores_modulos = errores_modulos
+        # Codewords dañados y corregibles de cada bloque Reed-Solomon
+        self.errores_bloques = errores_bloques
+        self.capacidad_bloques = capacidad_bloques
+        # Módulos erróneos de cada una de las dos copias del formato
+        self.errores_formato = errores_formato
+        self.errores_buscadores = errores_buscadores
+        self.cubiertos_logo = cubiertos_logo
+        # Texto leído por el decodificador, o None si no se decodificó
+        self.decodificado = decodificado
+
+    @property
+    def uso_correccion(self):
+        """Fracción de la corrección de errores consumida por el bloque más dañado"""
+        return max((errores / capacidad if capacidad else float(errores > 0))
+                   for errores, capacidad in zip(self.errores_bloques,
+                                                 self.capacidad_bloques))
+
+    def __repr__(self):
+        estado = "legible" if self.legible else "ilegible"
+        return (f"ResultadoVerificacion({estado}, módulos={self.errores_modulos}, "
+                f"corrección usada={self.uso_correccion:.0%})")
+
+    def __str__(self):
+        detalle = (f"{self.errores_modulos} módulos erróneos, "
+                   f"{self.uso_correccion:.0%} de la corrección usada")
+        if self.contraste < 0:
+            detalle += ", colores invertidos"
+        elif self.contraste < CONTRASTE_MINIMO:
+            detalle += f", contraste insuficiente ({self.contraste:.0%})"
+        if self.errores_buscadores:
+            detalle += f", {self.errores_buscadores} en los patrones de posición"
+        if min(self.errores_formato) > ERRORES_FORMATO:
+            detalle += ", formato ilegible"
+        if self.decodificado is False:
+            detalle += ", el decodificador no lo lee"
+        return detalle
+
+
+@lru_cache(maxsize=None)
+def bloques_de_codewords(version, correccion):
+    """
+    Bloque Reed-Solomon al que pertenece cada codeword intercalado
+
+    Returns:
+        tuple: (array con el bloque de cada codeword en el orden de colocación,
+                tupla con los codewords corregibles de cada bloque)
+    """
+    bloques_rs = base.rs_blocks(version, correccion)
+    bloque_de = []
+    for tamaños in ([b.data_count for b in bloques_rs],
+                    [b.total_count - b.data_count for b in bloques_rs]):
+        for i in range(max(tamaños)):
+            bloque_de.extend(n for n, tamaño in enumerate(tamaños) if i < tamaño)
+    reservados = CODEWORDS_RESERVADOS.get((version, NOMBRES_CORRECCION[correccion]), 0)
+    capacidad = tuple((b.total_count - b.data_count - reservados) // 2 for b in bloques_rs)
+    bloque_de = np.array(bloque_de, dtype=np.intp)
+    bloque_de.setflags(write=False)
+    return bloque_de, capacidad
+
+
+def _luminancia(img):
+    """Luminancia de la imagen como array, con la transparencia sobre blanco"""
+    if img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info:
+        fondo = Image.new('RGBA', img.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(fondo, img.convert('RGBA'))
+    return np.asarray(img.convert('L'))
+
+
+def muestrear_modulos(img, matriz, tamaño_caja=10, borde=4):
+    """
+    Lee el color del centro de cada módulo de la imagen
+
+    El umbral entre oscuro y claro es el punto medio entre la mediana de los
+    módulos que deberían ser oscuros y la de los claros, así que funciona
+    con cualquier pareja de colores; si los colores están invertidos se leen
+    igualmente y el contraste sale negativo.
+
+    Args:
+        img (PIL.Image): Imagen del código, con su borde
+        matriz (MatrizQR): Matriz con la que se dibujó
+        tamaño_caja (int): Píxeles por módulo de la imagen
+        borde (int): Módulos de margen
+
+    Returns:
+        tuple: (array (lado, lado) de bool, True en los módulos que se leen
+                oscuros, contraste entre -1 y 1)
+    """
+    centros = (borde + np.arange(matriz.lado)) * tamaño_caja + tamaño_caja // 2
+    if centros[-1] >= min(img.size):
+        raise ValueError(f"La imagen de {img.size[0]}x{img.size[1]} px no corresponde a un "
+                         f"código de {matriz.lado} módulos a {tamaño_caja} px por módulo")
+    muestras = _luminancia(img)[np.ix_(centros, centros)].astype(np.int16)
+    esperados = matriz.modulos()
+    oscuro = np.median(muestras[esperados]) if esperados.any() else 0
+    claro = np.median(muestras[~esperados]) if not esperados.all() else 255
+    umbral = (oscuro + claro) / 2
+    oscuros = muestras < umbral if oscuro <= claro else muestras > umbral
+    return oscuros, float(claro - oscuro) / 255
+
+
+@lru_cache(maxsize=256)
+def mascara_logo(lado, tamaño_caja=10, borde=4, proporcion=0.2):
+    """
+    Módulos cuyo centro queda bajo el logo de QRRenderer
+
+    El logo ocupa la proporción pedida del ancho de la imagen, centrado (ver
+    QRRenderer._pegar_logo).
+
+    Returns:
+        numpy.ndarray: Array (lado, lado) de bool de solo lectura
+    """
+    ancho = (lado + 2 * borde) * tamaño_caja
+    tamaño_logo = int(ancho * proporcion)
+    inicio = (ancho - tamaño_logo) // 2
+    centros = (borde + np.arange(lado)) * tamaño_caja + tamaño_caja // 2
+    dentro = (centros >= inicio) & (centros < inicio + tamaño_logo)
+    mascara = dentro[:, None] & dentro[None, :]
+    mascara.setflags(write=False)
+    return mascara
+
+
+def modulos_bajo_logo(lado, tamaño_caja=10, borde=4, proporcion=0.2):
+    """Cuenta los módulos que tapa el logo de QRRenderer (ver mascara_logo)"""
+    return int(np.count_nonzero(mascara_logo(lado, tamaño_caja, borde, proporcion)))
+
+
+def verificar_imagen(img, matriz, tamaño_caja=10, borde=4, decodificador=None,
+                     datos=None, con_logo=False, proporcion_logo=0.2):
+    """
+    Comprueba que la imagen de un código QR se puede leer
+
+    Es legible si los módulos oscuros lo son bastante más que los claros
+    (CONTRASTE_MINIMO), ningún bloque Reed-Solomon tiene más codewords
+    dañados de los que corrige, al menos una copia de la información de
+    formato se puede corregir y los tres patrones de posición están
+    intactos. Con un decodificador además tiene que leerse el texto esperado.
+
+    Args:
+        img (PIL.Image): Imagen del código, con su borde
+        matriz (MatrizQR): Matriz con la que se dibujó
+        tamaño_caja (int): Píxeles por módulo de la imagen
+        borde (int): Módulos de margen
+        decodificador (callable): Función imagen -> texto leído (o None si no
+                                  lo lee); ver DECODIFICADORES
+        datos (str): Texto que debe leer el decodificador; None acepta cualquiera
+        con_logo (bool): Contar los módulos que tapa el logo de QRRenderer
+        proporcion_logo (float): Fracción del ancho que ocupa el logo
+
+    Returns:
+        ResultadoVerificacion
+    """
+    oscuros, contraste = muestrear_modulos(img, matriz, tamaño_caja, borde)
+    erroneos = oscuros != matriz.modulos()
+    _, _, filas, columnas, formato = plantilla_version(matriz.version)
+
+    bloque_de, capacidad = bloques_de_codewords(matriz.version, matriz.correccion)
+    # El bit k de la secuencia de colocación pertenece al codeword k // 8;
+    # las casillas sobrantes tras el último codeword no llevan datos
+    bits_erroneos = np.flatnonzero(erroneos[filas, columnas])
+    codewords = np.unique(bits_erroneos // 8)
+    codewords = codewords[codewords < len(bloque_de)]
+    errores_bloques = np.bincount(bloque_de[codewords], minlength=len(capacidad))
+
+    errores_formato = tuple(int(np.count_nonzero(erroneos[posiciones[0], posiciones[1]]))
+                            for posiciones in formato)
+    lado = matriz.lado
+    errores_buscadores = int(np.count_nonzero(erroneos[:7, :7])
+                             + np.count_nonzero(erroneos[:7, lado - 7:])
+                             + np.count_nonzero(erroneos[lado - 7:, :7]))
+
+    legible = (contraste >= CONTRASTE_MINIMO
+               and all(errores <= limite for errores, limite in zip(errores_bloques, capacidad))
+               and min(errores_formato) <= ERRORES_FORMATO
+               and errores_buscadores == 0)
+    decodificado = None
+    if decodificador is not None:
+        leido = decodificador(img)
+        decodificado = leido is not None and (datos is None or leido == datos)
+        legible = legible and decodificado
+
+    return ResultadoVerificacion(
+        legible, contraste, int(np.count_nonzero(erroneos)), tuple(errores_bloques.tolist()), capacidad,
+        errores_formato, errores_buscadores,
+        modulos_bajo_logo(lado, tamaño_caja, borde, proporcion_logo) if con_logo else 0,
+        decodificado)
+
+
+def decodificar_opencv(img):
+    """Decodificador con OpenCV (opencv-python); devuelve el texto o None"""
+    import cv2
+    pixeles = np.asarray(img.convert('RGB'))[:, :, ::-1]
+    texto, _, _ = cv2.QRCodeDetector().detectAndDecode(pixeles)
+    return texto or None
+
+
+def decodificar_zbar(img):
+    """Decodificador con ZBar (pyzbar); devuelve el texto o None"""
+    from pyzbar.pyzbar import ZBarSymbol, decode
+    simbolos = decode(img.convert('L'), symbols=[ZBarSymbol.QRCODE])
+    return simbolos[0].data.decode('utf-8') if simbolos else None
+
+
+# Nombre -> decodificador local opcional (cada uno necesita su paquete)
+DECODIFICADORES = {
+    'opencv': decodificar_opencv,
+    'zbar': decodificar_zbar,
+}
+
+# Nombre -> (módulo que importa, paquete que lo instala)
+PAQUETES_DECODIFICADOR = {
+    'opencv': ('cv2', 'opencv-python'),
+    'zbar': ('pyzbar', 'pyzbar'),
+}
+
+
+def obtener_decodificador(decodificador):
+    """
+    Devuelve la función decodificadora a partir de su nombre, o la función tal cual
+
+    Raises:
+        ValueError: Si el nombre no está en DECODIFICADORES
+        ImportError: Si falta el paquete que necesita
+    """
+    if decodificador is None or callable(decodificador):
+        return decodificador
+    if decodificador not in DECODIFICADORES:
+        raise ValueError(f"Decodificador desconocido: {decodificador!r}")
+    modulo, paquete = PAQUETES_DECODIFICADOR[decodificador]
+    if importlib.util.find_spec(modulo) is None:
+        raise ImportError(f"El decodificador {decodificador!r} necesita el paquete "
+                          f"{paquete} (pip install {paquete})")
+    return DECODIFICADORES[decodificador]
+
+
+def verificar_trabajo(trabajo, contenido=None, decodificador=None):
+    """
+    Verifica la imagen que generó un trabajo de lote
+
+    Vuelve a codificar los datos con el perfil del generador del trabajo (ver
+    qr_entrada.renderer_para) y compara la matriz con la imagen escrita.
+
+    Args:
+        trabajo (dict): Trabajo tal como se pasó al generador
+        contenido (bytes): Imagen codificada; None la lee de nombre_archivo
+        decodificador: Función o nombre de DECODIFICADORES, o None
+
+    Returns:
+        ResultadoVerificacion, o None si la salida es vectorial (SVG o PDF)
+    """
+    from qr_entrada import renderer_para
+    from qr_lote import tipo_de
+    from qr_salida import formato_de
+
+    nombre = trabajo.get('nombre_archivo')
+    if isinstance(nombre, str) and formato_de(nombre) in ('SVG', 'PDF'):
+        return None
+    renderer = renderer_para(dict(trabajo, tipo=tipo_de(trabajo)))
+    datos = trabajo['datos']
+    matriz = datos if isinstance(datos, MatrizQR) else renderer.matriz(datos)
+    with Image.open(io.BytesIO(contenido) if contenido is not None else nombre) as img:
+        img.load()
+        return verificar_imagen(img, matriz, renderer.caja_imagen, renderer.borde,
+                                obtener_decodificador(decodificador),
+                                None if isinstance(datos, MatrizQR) else datos,
+                                con_logo=renderer.ruta_logo is not None,
+                                proporcion_logo=renderer.proporcion_de(matriz))